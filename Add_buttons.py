@@ -10,17 +10,13 @@ Program description here
 Version 0.0.1
 """
 
-import matplotlib.pyplot as plt
 from matplotlib.widgets import Button
-import sys
-# detect python version
-# if python 3 do this:
-if (sys.version_info > (3, 0)):
-    import tkinter
-    import tkinter.simpledialog as tksimpledialog
-else:
-    import Tkinter as tkinter
-    import tkSimpleDialog as tksimpledialog
+
+from . import Dialogs
+from . import Instrumentation
+from .Instrumentation import timed
+
+
 
 # =============================================================================
 # Define Class. Methods and Functions
@@ -71,6 +67,15 @@ class Add_Buttons(object):
                                "close" - when used with "OPTION" action will
                                close the plot after OPTION is clicked
 
+            recorder         - Instrumentation.Latency_Recorder (or True to
+                               create one), records the time of every button
+                               action, default None (no instrumentation)
+
+            input_provider   - where "UINPUT" values come from, an object
+                               with an ask(title, prompt, fmt, minval, maxval)
+                               method (see Dialogs), default None (shared
+                               tkinter dialogs)
+
         """
         # set supported actions (and link to function)
         self.actions = dict(NEXT=self.next,
@@ -88,6 +93,7 @@ class Add_Buttons(object):
         self.data = dict()
         # Deal with having no matplotlib axis
         if ax is None:
+            import matplotlib.pyplot as plt
             self.ax = plt.gca()
         else:
             self.ax = ax
@@ -99,6 +105,8 @@ class Add_Buttons(object):
         self.button_actions = kwargs.get('button_actions', ['CLOSE'])
         dparams = [dict()]*self.num_buttons
         self.button_params = kwargs.get('button_params', dparams)
+        self.recorder = Instrumentation.get_recorder(kwargs.get('recorder'))
+        self.input_provider = kwargs.get('input_provider', None)
         # check inputs are correct
         self.validate_inputs()
         # create buttons
@@ -168,14 +176,16 @@ class Add_Buttons(object):
             self.regions.append(r)
 
         # adjust the figure
-        plt.subplots_adjust(bottom=0.25)
+        fig = self.ax.figure
+        fig.subplots_adjust(bottom=0.25)
         # populate buttons
         for b in range(b_N):
-            axbutton = plt.axes(self.regions[b])
+            axbutton = fig.add_axes(self.regions[b])
             button = Button(axbutton, self.button_labels[b])
             button.on_clicked(self.actions[self.button_actions[b]])
             self.buttons.append(button)
 
+    @timed('next')
     def next(self, event):
         """
         Event for clicking a button with action "NEXT"
@@ -187,6 +197,7 @@ class Add_Buttons(object):
         """
         self.result = 1
 
+    @timed('previous')
     def previous(self, event):
         """
         Event for clicking a button with action "PREVIOUS"
@@ -198,6 +209,7 @@ class Add_Buttons(object):
         """
         self.result = -1
 
+    @timed('option')
     def option(self, event):
         """
         Event for clicking a button with action "OPTION"
@@ -217,8 +229,10 @@ class Add_Buttons(object):
             if func is not None:
                 func()
             if close:
+                import matplotlib.pyplot as plt
                 plt.close()
 
+    @timed('uinput')
     def uinput(self, event):
         pos = self.button_region(event)
         if pos is not None:
@@ -230,22 +244,12 @@ class Add_Buttons(object):
             minval = props.get('minval', None)
             maxval = props.get('maxval', None)
 
-            root = tkinter.Tk()
-            root.withdraw()
-            if fmt == int:
-                value = tksimpledialog.askinteger(title, startvalue,
-                                                  minvalue=minval,
-                                                  maxvalue=maxval)
-            elif fmt == float:
-                value = tksimpledialog.askfloat(title, startvalue,
-                                                minvalue=minval,
-                                                maxvalue=maxval)
-            else:
-                value = tksimpledialog.askstring(title, startvalue)
+            value = Dialogs.ask(title, startvalue, fmt=fmt, minval=minval,
+                                maxval=maxval, provider=self.input_provider)
             self.data[name] = value
-            root.destroy()
 
 
+    @timed('end')
     def end(self, event):
         """
         Event for clicking the finish button - closes the graph
@@ -253,6 +257,7 @@ class Add_Buttons(object):
         :param event: event passed to function
         :return:
         """
+        import matplotlib.pyplot as plt
         plt.close()
 
     def button_region(self, event):
@@ -260,9 +265,9 @@ class Add_Buttons(object):
             return None
         # get mouse click location in pixels
         x, y = event.x, event.y
-        # get the current canvas width and height (in pixels)
-        width = event.canvas.geometry().width()
-        height = event.canvas.geometry().height()
+        # get the current figure width and height (in pixels)
+        width = event.canvas.figure.bbox.width
+        height = event.canvas.figure.bbox.height
         # loop round each button region
         for r, rn in enumerate(self.regions):
             # convert region to pixels
@@ -282,6 +287,7 @@ class Add_Buttons(object):
 # Main code to test the rectangle selector
 if __name__ == '__main__':
     import numpy as np
+    import matplotlib.pyplot as plt
     # plt.close()
     # fig, frame = plt.subplots(ncols=1, nrows=1)
     # x = np.random.rand(100)
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Blitting helper shared by the interactive widgets: caches the background of
+an axes and redraws only a small set of animated artists on top of it
+instead of re-rendering the whole figure.
+
+Artists that change rarely but are too many to redraw on every frame (e.g.
+saved regions) can be added as layer artists: they are drawn once on top
+of the background and that image is cached too, so changing them costs
+one restore of the background, one draw of the layer and one blit, never
+a full canvas draw.
+
+Figure_Blit_Manager does the same for artists spread over several axes of
+one figure: one background, one restore and one blit per update.
+
+Version 0.0.1
+"""
+
+import time
+
+
+# =============================================================================
+# Define Class. Methods and Functions
+# =============================================================================
+class Blit_Manager(object):
+    def __init__(self, ax, artists=None, blit=True):
+        """
+        Manages fast redraws of a set of artists on a single axis
+
+        The axes background (everything but the managed artists) is cached
+        on every full draw of the canvas (draw_event) and dropped on resize,
+        so zooms, pans and resizes refresh the cache automatically (the
+        cache is also dropped as soon as the axis limits change). When the
+        canvas cannot blit, update() falls back to a full canvas redraw.
+
+        :param ax: matplotlib axis, the frame the artists live in
+        :param artists: list of matplotlib artists to manage (optional)
+        :param blit: bool, if False always use full canvas redraws
+        """
+        self.ax = ax
+        self.canvas = ax.figure.canvas
+        self.blit = bool(blit) and bool(self.canvas.supports_blit)
+        self.bbox = ax.bbox
+        self.artists = []
+        # artists drawn into the cached layer (see add_artist)
+        self.layer_artists = []
+        # the axes background, and the background with the layer drawn
+        self.base = None
+        self.background = None
+        # Instrumentation.Latency_Recorder (render times), set by the widget
+        self.recorder = None
+        if artists is not None:
+            for artist in artists:
+                self.add_artist(artist)
+        # Event handling
+        self.cids = [self.canvas.mpl_connect('draw_event', self.on_draw),
+                     self.canvas.mpl_connect('resize_event', self.on_resize)]
+        # zoom and pan change the axis limits
+        self.lim_cids = [ax.callbacks.connect('xlim_changed', self.on_resize),
+                         ax.callbacks.connect('ylim_changed', self.on_resize)]
+
+    def add_artist(self, artist, layer=False):
+        """
+        Adds an artist to the set redrawn by update()
+
+        :param artist: matplotlib artist (already added to self.ax)
+        :param layer: bool, if True the artist is drawn into the cached
+                      layer instead (redrawn by update_layer only)
+        :return:
+        """
+        if self.blit:
+            artist.set_animated(True)
+        if layer:
+            self.layer_artists.append(artist)
+        else:
+            self.artists.append(artist)
+
+    def on_draw(self, event):
+        """
+        Event for a full draw of the canvas - re-caches the axes background
+        and draws the (animated) managed artists on top of it
+
+        :param event: event passed to function
+        :return:
+        """
+        if not self.blit:
+            return
+        self.base = self.canvas.copy_from_bbox(self.bbox)
+        self.cache_layer()
+        self.draw_artists()
+
+    def cache_layer(self):
+        """
+        Draws the layer artists on the (restored) background and caches
+        the result as the background of update()
+
+        :return:
+        """
+        if len(self.layer_artists) == 0:
+            self.background = self.base
+            return
+        self.canvas.restore_region(self.base)
+        self.draw_artists(self.layer_artists)
+        self.background = self.canvas.copy_from_bbox(self.bbox)
+
+    def on_resize(self, event):
+        """
+        Event for resizing the canvas (or changing the axis limits) - the
+        cached background is stale
+
+        :param event: event passed to function
+        :return:
+        """
+        self.base = None
+        self.background = None
+
+    def draw_artists(self, artists=None):
+        """
+        Draws the managed artists onto the canvas renderer
+
+        :param artists: list of artists, default: the artists redrawn by
+                        update()
+        :return:
+        """
+        if artists is None:
+            artists = self.artists
+        for artist in artists:
+            artist.axes.draw_artist(artist)
+
+    def update(self):
+        """
+        Redraws the managed artists, blitting if possible, otherwise
+        redrawing the full canvas
+
+        :return:
+        """
+        start = time.perf_counter()
+        # fall back to a full redraw (no background yet: a full draw
+        # caches it via on_draw)
+        if not self.blit or self.background is None:
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self.background)
+            self.draw_artists()
+            self.canvas.blit(self.bbox)
+        if self.recorder is not None:
+            self.recorder.add_render(time.perf_counter() - start)
+
+    def update_layer(self):
+        """
+        Redraws the layer artists (after changing them) and the managed
+        artists, blitting if possible, otherwise redrawing the full canvas
+
+        :return:
+        """
+        if not self.blit or self.base is None:
+            self.update()
+            return
+        start = time.perf_counter()
+        self.cache_layer()
+        self.draw_artists()
+        self.canvas.blit(self.bbox)
+        if self.recorder is not None:
+            self.recorder.add_render(time.perf_counter() - start)
+
+    def draw(self):
+        """
+        Redraws the full canvas (needed when non-managed artists change),
+        the background is re-cached via on_draw
+
+        :return:
+        """
+        start = time.perf_counter()
+        self.canvas.draw()
+        if self.recorder is not None:
+            self.recorder.add_render(time.perf_counter() - start)
+
+    def disconnect(self):
+        """
+        Disconnects the draw, resize and axis limit events
+
+        :return:
+        """
+        for cid in self.cids:
+            self.canvas.mpl_disconnect(cid)
+        for cid in self.lim_cids:
+            self.ax.callbacks.disconnect(cid)
+        self.cids = []
+        self.lim_cids = []
+
+
+class Figure_Blit_Manager(Blit_Manager):
+    def __init__(self, axes, blit=True):
+        """
+        Manages fast redraws of artists spread over several axes of the same
+        figure, all redrawn in a single batched pass (one restore of the
+        figure background, one blit)
+
+        :param axes: list of matplotlib axes (of the same figure)
+        :param blit: bool, if False always use full canvas redraws
+        """
+        self.axes = list(axes)
+        Blit_Manager.__init__(self, self.axes[0], blit=blit)
+        # one background for the whole figure
+        self.bbox = self.ax.figure.bbox
+        # limits of any of the other axes changing also makes the
+        # background stale [(axis, cid)]
+        self.axes_cids = []
+        for ax in self.axes[1:]:
+            for name in ['xlim_changed', 'ylim_changed']:
+                cid = ax.callbacks.connect(name, self.on_resize)
+                self.axes_cids.append((ax, cid))
+
+    def disconnect(self):
+        Blit_Manager.disconnect(self)
+        for ax, cid in self.axes_cids:
+            ax.callbacks.disconnect(cid)
+        self.axes_cids = []
+
+
+# =============================================================================
+# End of code
+# =============================================================================
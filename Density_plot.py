@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Level-of-detail plotting of large data sets (to use under a selector)
+
+    - Density_Image    a scatter drawn as a binned density image. Counts
+                       are binned once into a pyramid of 2D histograms
+                       (each level 2x coarser), on zoom/pan only the
+                       visible part of the level matching the screen
+                       resolution is shown; past the finest level the
+                       visible points (found with the spatial index) are
+                       re-binned
+    - Decimated_Line   a (sorted) series drawn as min/max pairs per screen
+                       pixel, taken from a pyramid of block minima/maxima
+
+Redraw cost depends on the number of screen pixels, not on the number of
+points. Selectors still resolve against the full resolution data (pass the
+same x and y to Select_Rectange). Linear axes only.
+
+Version 0.0.1
+"""
+
+import numpy as np
+
+from . import Spatial_index
+from . import Instrumentation
+from .Instrumentation import timed
+
+# =============================================================================
+# Define variables
+# =============================================================================
+# number of bins (along each axis) of the finest density level
+DENSITY_BINS = 2048
+# coarsest density level (bins along each axis)
+MIN_BINS = 16
+# number of points binned at once
+CHUNK_SIZE = 2 ** 22
+
+
+# =============================================================================
+# Define Class. Methods and Functions
+# =============================================================================
+class Density_Image(object):
+    def __init__(self, ax, x, y, kwargs=None):
+        """
+        Draws the points (x, y) as a density image that is re-binned to
+        the screen resolution on zoom and pan
+
+        :param ax: matplotlib axis
+        :param x: numpy array, the x data
+        :param y: numpy array, the y data
+        :param kwargs: dictionary, key word arguments
+
+        Current allowed kwargs are:
+
+            - bins              int, bins (along each axis) of the finest
+                                level of the pyramid, default: 2048
+            - pixels_per_bin    float, screen pixels per bin, default: 1
+            - cmap              colour map, default: 'viridis'
+            - log               bool, if True (default) log colour scale
+            - zorder            int, zorder of the image, default: 0
+            - recorder          Instrumentation.Latency_Recorder (or True
+                                to create one), default: None
+        """
+        if kwargs is None:
+            kwargs = dict()
+        self.ax = ax
+        self.bins = int(kwargs.get('bins', DENSITY_BINS))
+        self.pixels_per_bin = kwargs.get('pixels_per_bin', 1.0)
+        self.recorder = Instrumentation.get_recorder(kwargs.get('recorder'))
+        self.x, self.y = np.asarray(x).ravel(), np.asarray(y).ravel()
+        if self.x.shape != self.y.shape:
+            raise ValueError("'x' and 'y' must be the same length")
+        self._index = None
+        # the data range (and the pyramid levels)
+        self.levels = []
+        self.build()
+        # the image
+        from matplotlib.colors import LogNorm, Normalize
+        norm = LogNorm() if kwargs.get('log', True) else Normalize()
+        self.image = ax.imshow(np.ma.masked_all((1, 1)), origin='lower',
+                               aspect='auto', interpolation='nearest',
+                               extent=self.extent, norm=norm,
+                               cmap=kwargs.get('cmap', 'viridis'),
+                               zorder=kwargs.get('zorder', 0))
+        ax.set_xlim(self.extent[0:2])
+        ax.set_ylim(self.extent[2:4])
+        self.view = None
+        self.update()
+        # re-bin on zoom, pan and resize
+        self.cids = [ax.callbacks.connect('xlim_changed', self.on_change),
+                     ax.callbacks.connect('ylim_changed', self.on_change)]
+        self.canvas_cid = ax.figure.canvas.mpl_connect('resize_event',
+                                                       self.on_change)
+
+    def build(self):
+        """
+        Bins the data into the pyramid of 2D histograms (done once)
+
+        :return:
+        """
+        finite = np.isfinite(self.x) & np.isfinite(self.y)
+        if not finite.any():
+            self.extent = (0.0, 1.0, 0.0, 1.0)
+        else:
+            xs, ys = self.x[finite], self.y[finite]
+            xmin, xmax = float(xs.min()), float(xs.max())
+            ymin, ymax = float(ys.min()), float(ys.max())
+            # a zero width range still needs a bin
+            xmax = xmax if xmax > xmin else xmin + 1.0
+            ymax = ymax if ymax > ymin else ymin + 1.0
+            self.extent = (xmin, xmax, ymin, ymax)
+        counts = _bin(self.x, self.y, self.extent, self.bins, self.bins)
+        self.levels = [counts]
+        while len(counts) > MIN_BINS and len(counts) % 2 == 0:
+            nx = len(counts) // 2
+            counts = counts.reshape(nx, 2, nx, 2).sum(axis=(1, 3))
+            self.levels.append(counts)
+
+    @property
+    def index(self):
+        """
+        The spatial index of the data (built when first zoomed past the
+        finest level)
+
+        :return: Spatial_index.Grid_Index
+        """
+        if self._index is None:
+            self._index = Spatial_index.Grid_Index(self.x, self.y)
+        return self._index
+
+    def on_change(self, event):
+        self.update()
+
+    @timed('rebin')
+    def update(self):
+        """
+        Shows the visible range at the screen resolution
+
+        :return:
+        """
+        x0, x1 = sorted(self.ax.get_xlim())
+        y0, y1 = sorted(self.ax.get_ylim())
+        bbox = self.ax.bbox
+        width = max(int(bbox.width / self.pixels_per_bin), 1)
+        height = max(int(bbox.height / self.pixels_per_bin), 1)
+        view = (x0, x1, y0, y1, width, height)
+        if view == self.view:
+            return
+        self.view = view
+        counts, extent = self.visible(x0, x1, y0, y1, width, height)
+        if counts.size == 0:
+            self.image.set_visible(False)
+            return
+        data = np.ma.masked_equal(counts.T, 0)
+        self.image.set_data(data)
+        self.image.set_extent(extent)
+        self.image.set_visible(True)
+        if data.count() > 0:
+            self.image.norm.vmin = None
+            self.image.norm.vmax = None
+            self.image.norm.autoscale_None(data)
+
+    def visible(self, x0, x1, y0, y1, width, height):
+        """
+        The counts of the visible range, from the coarsest level with at
+        least one bin per screen pixel (re-binned from the points if even
+        the finest level has less than one bin per 2 pixels)
+
+        :return counts, extent: numpy array (x bins, y bins) and the
+                                (x0, x1, y0, y1) they cover
+        """
+        xmin, xmax, ymin, ymax = self.extent
+        # clip to the data
+        x0, x1 = max(x0, xmin), min(x1, xmax)
+        y0, y1 = max(y0, ymin), min(y1, ymax)
+        if x1 <= x0 or y1 <= y0:
+            return np.zeros((0, 0)), self.extent
+        for level, counts in enumerate(self.levels[::-1]):
+            dx = (xmax - xmin) / counts.shape[0]
+            dy = (ymax - ymin) / counts.shape[1]
+            if (x1 - x0) / dx >= width and (y1 - y0) / dy >= height:
+                break
+        # the finest level is used down to 2 screen pixels per bin
+        if (level == len(self.levels) - 1 and
+                ((x1 - x0) / dx < width / 2 or (y1 - y0) / dy < height / 2)):
+            # zoomed in past the finest level: re-bin the visible points
+            found = self.index.query(x0, x1, y0, y1)
+            extent = (x0, x1, y0, y1)
+            counts = _bin(self.x[found], self.y[found], extent, width,
+                          height)
+            return counts, extent
+        i0 = int(np.floor((x0 - xmin) / dx))
+        i1 = int(np.ceil((x1 - xmin) / dx))
+        j0 = int(np.floor((y0 - ymin) / dy))
+        j1 = int(np.ceil((y1 - ymin) / dy))
+        extent = (xmin + i0 * dx, xmin + i1 * dx, ymin + j0 * dy,
+                  ymin + j1 * dy)
+        return counts[i0:i1, j0:j1], extent
+
+    def disconnect(self):
+        """
+        Stops re-binning on zoom and pan
+
+        :return:
+        """
+        for cid in self.cids:
+            self.ax.callbacks.disconnect(cid)
+        self.ax.figure.canvas.mpl_disconnect(self.canvas_cid)
+        self.cids = []
+
+
+class Decimated_Line(object):
+    def __init__(self, ax, x, y, kwargs=None):
+        """
+        Draws a series sorted in x as min/max pairs per screen pixel of the
+        visible range (so peaks are never lost)
+
+        :param ax: matplotlib axis
+        :param x: numpy array, the x data (sorted)
+        :param y: numpy array, the y data
+        :param kwargs: dictionary, key word arguments (any other keyword is
+                       passed to the matplotlib Line2D)
+
+        Current allowed kwargs are:
+
+            - points_per_pixel  float, points drawn per screen pixel
+                                (2 = one min/max pair), default: 2
+            - recorder          Instrumentation.Latency_Recorder (or True
+                                to create one), default: None
+        """
+        from matplotlib.lines import Line2D
+        if kwargs is None:
+            kwargs = dict()
+        kwargs = dict(kwargs)
+        self.ax = ax
+        self.points_per_pixel = kwargs.pop('points_per_pixel', 2)
+        self.recorder = Instrumentation.get_recorder(kwargs.pop('recorder',
+                                                                None))
+        self.x, self.y = np.asarray(x).ravel(), np.asarray(y).ravel()
+        if self.x.shape != self.y.shape:
+            raise ValueError("'x' and 'y' must be the same length")
+        if np.any(np.diff(self.x) < 0):
+            raise ValueError("'x' must be sorted")
+        # pyramid of (block start x, block minimum y, block maximum y) for
+        # blocks of 2, 4, 8, ... points
+        self.levels = []
+        self.build()
+        self.line = Line2D([], [], **kwargs)
+        ax.add_line(self.line)
+        if len(self.x) > 0:
+            finite = np.isfinite(self.y)
+            ymin = np.min(self.y[finite]) if finite.any() else 0.0
+            ymax = np.max(self.y[finite]) if finite.any() else 1.0
+            ax.update_datalim([(self.x[0], ymin), (self.x[-1], ymax)])
+            ax.autoscale_view()
+        self.view = None
+        self.update()
+        self.cids = [ax.callbacks.connect('xlim_changed', self.on_change)]
+        self.canvas_cid = ax.figure.canvas.mpl_connect('resize_event',
+                                                       self.on_change)
+
+    def build(self):
+        """
+        Computes the block minima/maxima of every level (done once)
+
+        :return:
+        """
+        xs, lows, highs = self.x, self.y, self.y
+        while len(xs) > 1:
+            # pad odd lengths with the last value
+            if len(xs) % 2:
+                xs = np.append(xs, xs[-1])
+                lows = np.append(lows, lows[-1])
+                highs = np.append(highs, highs[-1])
+            xs = xs[::2]
+            lows = np.fmin(lows[::2], lows[1::2])
+            highs = np.fmax(highs[::2], highs[1::2])
+            self.levels.append((xs, lows, highs))
+
+    def on_change(self, event):
+        self.update()
+
+    @timed('decimate')
+    def update(self):
+        """
+        Shows the visible range at the screen resolution
+
+        :return:
+        """
+        x0, x1 = sorted(self.ax.get_xlim())
+        width = max(int(self.ax.bbox.width * self.points_per_pixel / 2), 1)
+        view = (x0, x1, width)
+        if view == self.view:
+            return
+        self.view = view
+        # visible points (plus one either side so the line reaches the edge)
+        i0 = max(int(np.searchsorted(self.x, x0, side='left')) - 1, 0)
+        i1 = min(int(np.searchsorted(self.x, x1, side='right')) + 1,
+                 len(self.x))
+        if i1 - i0 <= 2 * width:
+            self.line.set_data(self.x[i0:i1], self.y[i0:i1])
+            return
+        # level with about one block per pixel
+        level = min(int(np.log2((i1 - i0) / width)), len(self.levels))
+        xs, lows, highs = self.levels[level - 1]
+        b0, b1 = i0 >> level, (i1 >> level) + 1
+        xs = np.repeat(xs[b0:b1], 2)
+        ys = np.column_stack([lows[b0:b1], highs[b0:b1]]).ravel()
+        self.line.set_data(xs, ys)
+
+    def disconnect(self):
+        """
+        Stops decimating on zoom and pan
+
+        :return:
+        """
+        for cid in self.cids:
+            self.ax.callbacks.disconnect(cid)
+        self.ax.figure.canvas.mpl_disconnect(self.canvas_cid)
+        self.cids = []
+
+
+def _bin(x, y, extent, nx, ny):
+    """
+    2D histogram of points (in chunks, so memory stays bounded)
+
+    :return counts: numpy array of ints, shape (nx, ny)
+    """
+    x0, x1, y0, y1 = extent
+    counts = np.zeros(nx * ny, dtype=np.int64)
+    for start in range(0, len(x), CHUNK_SIZE):
+        xc = x[start:start + CHUNK_SIZE]
+        yc = y[start:start + CHUNK_SIZE]
+        keep = (xc >= x0) & (xc <= x1) & (yc >= y0) & (yc <= y1)
+        xc, yc = xc[keep], yc[keep]
+        ix = np.minimum(((xc - x0) * (nx / (x1 - x0))).astype(np.int64),
+                        nx - 1)
+        iy = np.minimum(((yc - y0) * (ny / (y1 - y0))).astype(np.int64),
+                        ny - 1)
+        counts += np.bincount(ix * ny + iy, minlength=nx * ny)
+    return counts.reshape(nx, ny)
+
+
+def plot_density(x, y, ax=None, **kwargs):
+    """
+    Plots a large scatter as a level-of-detail density image
+
+    :param x: numpy array, the x data
+    :param y: numpy array, the y data
+    :param ax: matplotlib axis (frame), i.e. plt.subplot() plt.gca()
+    :param kwargs: key word arguments (see Density_Image)
+    :return: Density_Image instance
+    """
+    if ax is None:
+        import matplotlib.pyplot as plt
+        ax = plt.gca()
+    return Density_Image(ax, x, y, kwargs)
+
+
+def plot_decimated(x, y, ax=None, **kwargs):
+    """
+    Plots a long (sorted) series as a min/max decimated line
+
+    :param x: numpy array, the x data (sorted)
+    :param y: numpy array, the y data
+    :param ax: matplotlib axis (frame), i.e. plt.subplot() plt.gca()
+    :param kwargs: key word arguments (see Decimated_Line)
+    :return: Decimated_Line instance
+    """
+    if ax is None:
+        import matplotlib.pyplot as plt
+        ax = plt.gca()
+    return Decimated_Line(ax, x, y, kwargs)
+
+
+# =============================================================================
+# End of code
+# =============================================================================
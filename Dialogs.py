@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+User input dialogs for the widgets (tag names, UINPUT buttons)
+
+Prompts go through an input provider with an ask(title, prompt, fmt,
+minval, maxval) method:
+
+    - Tk_Input        tkinter dialogs sharing one hidden root window, created
+                      on the first prompt and reused for all later prompts
+                      (the default)
+    - Textbox_Input   a matplotlib TextBox on the figure (no tkinter)
+    - Scripted_Input  answers from a list (batch jobs and tests)
+
+Version 0.0.1
+"""
+
+import sys
+
+# =============================================================================
+# Define variables
+# =============================================================================
+# the provider used when a widget is not given one
+_DEFAULT_PROVIDER = None
+
+
+# =============================================================================
+# Define Class. Methods and Functions
+# =============================================================================
+def import_tkinter():
+    """
+    Imports tkinter (only when a dialog is needed)
+
+    :return tkinter, tksimpledialog: modules
+    """
+    # detect python version
+    # if python 3 do this:
+    if (sys.version_info > (3, 0)):
+        import tkinter
+        import tkinter.simpledialog as tksimpledialog
+    else:
+        import Tkinter as tkinter
+        import tkSimpleDialog as tksimpledialog
+    return tkinter, tksimpledialog
+
+
+class Tk_Input(object):
+    def __init__(self):
+        """
+        tkinter dialogs, all sharing one hidden root window (created when
+        first needed)
+        """
+        self.root = None
+
+    def get_root(self):
+        """
+        The hidden root window (created, or re-created if destroyed)
+
+        :return root: tkinter.Tk instance
+        """
+        tkinter, _ = import_tkinter()
+        if self.root is not None:
+            try:
+                self.root.winfo_exists()
+            except tkinter.TclError:
+                self.root = None
+        if self.root is None:
+            self.root = tkinter.Tk()
+            self.root.withdraw()
+        return self.root
+
+    def ask(self, title, prompt, fmt=None, minval=None, maxval=None):
+        """
+        Asks the user for a value
+
+        :param title: string, the dialog title
+        :param prompt: string, the dialog message
+        :param fmt: int, float or None (string)
+        :param minval: minimum value allowed (int and float only)
+        :param maxval: maximum value allowed (int and float only)
+        :return: the value entered (None if cancelled)
+        """
+        _, tksimpledialog = import_tkinter()
+        root = self.get_root()
+        if fmt == int:
+            return tksimpledialog.askinteger(title, prompt, parent=root,
+                                             minvalue=minval, maxvalue=maxval)
+        elif fmt == float:
+            return tksimpledialog.askfloat(title, prompt, parent=root,
+                                           minvalue=minval, maxvalue=maxval)
+        return tksimpledialog.askstring(title, prompt, parent=root)
+
+    def close(self):
+        """
+        Destroys the hidden root window
+
+        :return:
+        """
+        if self.root is not None:
+            try:
+                self.root.destroy()
+            except Exception:
+                pass
+            self.root = None
+
+
+class Scripted_Input(object):
+    def __init__(self, responses):
+        """
+        Answers prompts from a list of responses (in order), None once the
+        responses run out (as if the dialog was cancelled)
+
+        :param responses: iterable of responses
+        """
+        self.responses = iter(responses)
+        # the (title, prompt) of every prompt asked
+        self.prompts = []
+
+    def ask(self, title, prompt, fmt=None, minval=None, maxval=None):
+        self.prompts.append((title, prompt))
+        value = next(self.responses, None)
+        if value is None or fmt is None:
+            return value
+        value = fmt(value)
+        if minval is not None and value < minval:
+            return None
+        if maxval is not None and value > maxval:
+            return None
+        return value
+
+
+class Textbox_Input(object):
+    def __init__(self, fig=None, rect=(0.15, 0.92, 0.7, 0.05)):
+        """
+        Asks for values with a matplotlib TextBox on the figure (blocks in
+        the canvas event loop until the text is submitted, so needs an
+        interactive backend)
+
+        :param fig: matplotlib figure (default: the current figure when
+                    first asked)
+        :param rect: list, the [left, bottom, width, height] of the text box
+                     in figure coordinates
+        """
+        self.fig = fig
+        self.rect = rect
+        self.ax = None
+        self.textbox = None
+        self.value = None
+
+    def ask(self, title, prompt, fmt=None, minval=None, maxval=None):
+        from matplotlib.widgets import TextBox
+        if self.fig is None:
+            import matplotlib.pyplot as plt
+            self.fig = plt.gcf()
+        # create the text box once and reuse it
+        if self.textbox is None:
+            self.ax = self.fig.add_axes(self.rect)
+            self.textbox = TextBox(self.ax, '')
+            self.textbox.on_submit(self.submit)
+        self.ax.set_visible(True)
+        self.ax.set_title('{0}: {1}'.format(title, prompt), fontsize='small')
+        self.textbox.set_val('')
+        self.value = None
+        self.fig.canvas.draw_idle()
+        # wait for the text to be submitted
+        self.fig.canvas.start_event_loop(timeout=-1)
+        self.ax.set_visible(False)
+        self.fig.canvas.draw_idle()
+        # convert the value
+        if fmt is None or self.value is None:
+            return self.value
+        try:
+            value = fmt(self.value)
+        except ValueError:
+            return None
+        if minval is not None and value < minval:
+            return None
+        if maxval is not None and value > maxval:
+            return None
+        return value
+
+    def submit(self, text):
+        self.value = text
+        self.fig.canvas.stop_event_loop()
+
+
+def get_input_provider():
+    """
+    The default input provider (a shared Tk_Input unless set otherwise)
+
+    :return: input provider
+    """
+    global _DEFAULT_PROVIDER
+    if _DEFAULT_PROVIDER is None:
+        _DEFAULT_PROVIDER = Tk_Input()
+    return _DEFAULT_PROVIDER
+
+
+def set_input_provider(provider):
+    """
+    Sets the default input provider (used by widgets not given one)
+
+    :param provider: object with an ask(title, prompt, fmt, minval, maxval)
+                     method (None resets to the shared Tk_Input)
+    :return:
+    """
+    global _DEFAULT_PROVIDER
+    _DEFAULT_PROVIDER = provider
+
+
+def ask(title, prompt, fmt=None, minval=None, maxval=None, provider=None):
+    """
+    Asks the user for a value
+
+    :param title: string, the dialog title
+    :param prompt: string, the dialog message
+    :param fmt: int, float or None (string)
+    :param minval: minimum value allowed (int and float only)
+    :param maxval: maximum value allowed (int and float only)
+    :param provider: input provider (default: get_input_provider())
+    :return: the value entered (None if cancelled)
+    """
+    if provider is None:
+        provider = get_input_provider()
+    return provider.ask(title, prompt, fmt=fmt, minval=minval, maxval=maxval)
+
+
+# =============================================================================
+# End of code
+# =============================================================================
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Motion event coalescing shared by all widgets on a canvas.
+
+Raw motion_notify_events are not handed straight to the widgets: only the
+latest mouse position is processed, at most max_rate times per second, and
+any pending motion is flushed before a press/release (or any other
+non-motion event) is dispatched, so the final release is always handled
+exactly. Each motion callback keeps its own max_rate, so widgets sharing a
+canvas do not change each other's rate.
+
+Version 0.0.1
+"""
+
+import time
+import weakref
+
+# =============================================================================
+# Define variables
+# =============================================================================
+# default maximum number of motion events processed per second
+DEFAULT_MAX_RATE = 60.0
+# the motion event name (the only event that is throttled)
+MOTION_EVENT = 'motion_notify_event'
+# one throttle per canvas
+_THROTTLES = weakref.WeakKeyDictionary()
+
+
+# =============================================================================
+# Define Class. Methods and Functions
+# =============================================================================
+class Event_Throttle(object):
+    def __init__(self, canvas, max_rate=DEFAULT_MAX_RATE):
+        """
+        Dispatches canvas events to registered widget callbacks, dropping
+        stale intermediate motion events
+
+        :param canvas: matplotlib canvas to take events from
+        :param max_rate: float, default maximum number of motion events
+                         processed per second, for motion callbacks
+                         connected without their own rate (None or 0
+                         disables throttling)
+        """
+        self.canvas_ref = weakref.ref(canvas)
+        self.interval = 0.0
+        self.set_max_rate(max_rate)
+        # callbacks for each event name {event name: {cid: func}}
+        self.callbacks = dict()
+        # matplotlib connection ids for each event name
+        self.mpl_cids = dict()
+        self.next_cid = 0
+        # interval and last processing time of each motion callback
+        self.intervals = dict()
+        self.last_times = dict()
+        # latest motion event and the motion callbacks yet to process it
+        self.pending = None
+        self.waiting = set()
+        self.timer = None
+        # number of motion events dropped (superseded before processing)
+        self.dropped = 0
+
+    def set_max_rate(self, max_rate, cid=None):
+        """
+        Sets the maximum number of motion events processed per second
+
+        :param max_rate: float, rate in Hz (None or 0 disables throttling)
+        :param cid: int or None, the motion callback to set the rate of
+                    (None sets the default for callbacks connected later)
+        :return:
+        """
+        interval = _interval(max_rate)
+        if cid is None:
+            self.interval = interval
+        elif cid in self.intervals:
+            self.intervals[cid] = interval
+        else:
+            raise ValueError('No motion callback with cid={0}'.format(cid))
+
+    @property
+    def canvas(self):
+        return self.canvas_ref()
+
+    # -------------------------------------------------------------------------
+    # Registration
+    # -------------------------------------------------------------------------
+    def connect(self, event_name, func, max_rate=None):
+        """
+        Registers func to be called for event_name (like mpl_connect)
+
+        :param event_name: string, matplotlib event name
+        :param func: callable, called with the event
+        :param max_rate: float or None, maximum number of motion events
+                         passed to func per second (motion only, None uses
+                         the throttle's default, 0 disables throttling)
+        :return cid: int, connection id to use with disconnect
+        """
+        if event_name not in self.callbacks:
+            self.callbacks[event_name] = dict()
+            if event_name == MOTION_EVENT:
+                handler = self.on_motion
+            else:
+                # bind the name: matplotlib re-sends the motion event object
+                # as the axes_enter/leave_event (so event.name is wrong)
+                def handler(event, name=event_name):
+                    self.on_event(name, event)
+            self.mpl_cids[event_name] = self.canvas.mpl_connect(event_name,
+                                                                handler)
+        cid = self.next_cid
+        self.next_cid += 1
+        self.callbacks[event_name][cid] = func
+        if event_name == MOTION_EVENT:
+            if max_rate is None:
+                self.intervals[cid] = self.interval
+            else:
+                self.intervals[cid] = _interval(max_rate)
+            self.last_times[cid] = None
+        return cid
+
+    def disconnect(self, cid):
+        """
+        Removes the callback with connection id cid
+
+        :param cid: int, connection id returned by connect
+        :return:
+        """
+        for event_name in list(self.callbacks.keys()):
+            funcs = self.callbacks[event_name]
+            if cid not in funcs:
+                continue
+            del funcs[cid]
+            self.intervals.pop(cid, None)
+            self.last_times.pop(cid, None)
+            self.waiting.discard(cid)
+            # drop the matplotlib connection once nothing listens
+            if len(funcs) == 0:
+                del self.callbacks[event_name]
+                self.canvas.mpl_disconnect(self.mpl_cids.pop(event_name))
+            return
+
+    # -------------------------------------------------------------------------
+    # Dispatch
+    # -------------------------------------------------------------------------
+    def on_motion(self, event):
+        """
+        Event for a raw mouse motion - passed straight away to the motion
+        callbacks that last processed a motion long enough ago, the others
+        get it (or a newer motion replacing it) once their interval is over
+
+        :param event: event passed to function
+        :return:
+        """
+        if self.pending is not None and len(self.waiting) > 0:
+            self.dropped += 1
+        self.pending = event
+        self.waiting = set(self.callbacks.get(MOTION_EVENT, dict()))
+        self.process_due()
+
+    def on_event(self, event_name, event):
+        """
+        Event for any non-motion event - flushes the pending motion then
+        dispatches the event unthrottled
+
+        :param event_name: string, the event connected to
+        :param event: event passed to function
+        :return:
+        """
+        self.flush()
+        self.dispatch(event_name, event)
+
+    def on_timer(self):
+        """
+        Timer callback - processes the pending motion for the callbacks now
+        due
+
+        :return:
+        """
+        self.process_due()
+
+    def flush(self):
+        """
+        Processes the pending motion event immediately (if any) for every
+        callback that has not processed it yet
+
+        :return:
+        """
+        self.process(list(self.waiting))
+
+    def process_due(self):
+        """
+        Processes the pending motion for the callbacks whose interval is
+        over, and times the rest
+
+        :return:
+        """
+        now = time.perf_counter()
+        due, delays = [], []
+        for cid in self.waiting:
+            last = self.last_times[cid]
+            if last is None or now - last >= self.intervals[cid]:
+                due.append(cid)
+            else:
+                delays.append(self.intervals[cid] - (now - last))
+        self.process(due)
+        if len(delays) > 0:
+            self.start_timer(min(delays))
+
+    def process(self, cids):
+        """
+        Dispatches the pending motion event to some motion callbacks, the
+        interval of each starts once it has returned so slow callbacks
+        cannot build up a backlog
+
+        :param cids: list of ints, the motion callbacks
+        :return:
+        """
+        event = self.pending
+        funcs = self.callbacks.get(MOTION_EVENT, dict())
+        for cid in sorted(cids):
+            self.waiting.discard(cid)
+            # disconnected by an earlier callback
+            if cid not in funcs:
+                continue
+            funcs[cid](event)
+            self.last_times[cid] = time.perf_counter()
+        if len(self.waiting) == 0:
+            self.pending = None
+
+    def dispatch(self, event_name, event):
+        for func in list(self.callbacks.get(event_name, dict()).values()):
+            func(event)
+
+    def start_timer(self, delay):
+        """
+        Starts (or restarts) the single shot timer that processes the
+        pending motion event
+
+        :param delay: float, time in seconds
+        :return:
+        """
+        if self.timer is None:
+            self.timer = self.canvas.new_timer()
+            self.timer.single_shot = True
+            self.timer.add_callback(self.on_timer)
+        self.timer.stop()
+        self.timer.interval = max(int(delay * 1000), 1)
+        self.timer.start()
+
+
+def get_throttle(canvas, max_rate=None):
+    """
+    Gets the (shared) throttle for a canvas, creating it if needed
+
+    :param canvas: matplotlib canvas
+    :param max_rate: float, if not None sets the default maximum number of
+                     motion events processed per second (only used by
+                     callbacks connected afterwards without their own rate,
+                     widgets should pass max_rate to connect instead)
+    :return throttle: Event_Throttle instance
+    """
+    throttle = _THROTTLES.get(canvas, None)
+    if throttle is None:
+        throttle = Event_Throttle(canvas, DEFAULT_MAX_RATE)
+        _THROTTLES[canvas] = throttle
+    if max_rate is not None:
+        throttle.set_max_rate(max_rate)
+    return throttle
+
+
+def connect(canvas, event_name, func, max_rate=None):
+    """
+    Registers func for event_name through the shared throttle of a canvas
+
+    :param canvas: matplotlib canvas
+    :param event_name: string, matplotlib event name
+    :param func: callable, called with the event
+    :param max_rate: float, maximum number of motion events passed to func
+                     per second (None uses the default rate)
+    :return cid: int, connection id (use get_throttle(canvas).disconnect)
+    """
+    return get_throttle(canvas).connect(event_name, func, max_rate)
+
+
+def _interval(max_rate):
+    """
+    The minimum time between two motion events
+
+    :param max_rate: float, rate in Hz (None or 0 disables throttling)
+    :return: float, time in seconds
+    """
+    if max_rate is None or max_rate <= 0:
+        return 0.0
+    return 1.0 / float(max_rate)
+
+
+# =============================================================================
+# End of code
+# =============================================================================
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Opt-in latency instrumentation for the widget callbacks
+
+A Latency_Recorder given to a widget (kwarg 'recorder') records the wall
+time of each callback and the part of it spent rendering (canvas draws
+and blits) into a fixed size ring buffer per callback, plus a histogram
+(log spaced bins) over all events. Sinks (e.g. a metrics client) are
+called after every event and a profiler hook can wrap every callback.
+
+Widgets without a recorder pay only an attribute check per callback.
+
+Version 0.0.1
+"""
+
+import functools
+import time
+import numpy as np
+
+# =============================================================================
+# Define variables
+# =============================================================================
+# number of events kept per callback
+BUFFER_SIZE = 4096
+# histogram bin edges in seconds (1 microsecond to 100 seconds)
+BIN_EDGES = np.logspace(-6, 2, 33)
+# percentiles reported in summaries
+PERCENTILES = [50, 90, 99]
+
+
+# =============================================================================
+# Define Class. Methods and Functions
+# =============================================================================
+class Latency_Recorder(object):
+    def __init__(self, size=BUFFER_SIZE, sinks=None, profiler=None):
+        """
+        Records callback latencies
+
+        :param size: int, number of events kept (per callback name)
+        :param sinks: list of callables, each called as
+                      sink(name, wall, render) after every event
+        :param profiler: callable or None, called as profiler(name) for
+                         every callback, must return a context manager
+                         wrapping the callback (e.g. lambda name:
+                         cProfile.Profile() on python 3.8+)
+        """
+        self.size = int(size)
+        self.sinks = list(sinks) if sinks is not None else []
+        self.profiler = profiler
+        # ring buffers (wall, render) and histograms per callback name
+        self.buffers = dict()
+        self.positions = dict()
+        self.counts = dict()
+        self.histograms = dict()
+        # render time of the callbacks currently running (innermost last)
+        self._render_stack = []
+
+    def add_sink(self, sink):
+        """
+        Adds a sink, called as sink(name, wall, render) after every event
+
+        :param sink: callable
+        :return:
+        """
+        self.sinks.append(sink)
+
+    # -------------------------------------------------------------------------
+    # Recording
+    # -------------------------------------------------------------------------
+    def call(self, name, func, *args, **kwargs):
+        """
+        Calls func(*args, **kwargs) recording its wall and render time
+        under name
+
+        :return: the result of func
+        """
+        self._render_stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            if self.profiler is not None:
+                with self.profiler(name):
+                    return func(*args, **kwargs)
+            return func(*args, **kwargs)
+        finally:
+            wall = time.perf_counter() - start
+            render = self._render_stack.pop()
+            # the render time also counts for any enclosing callback
+            if len(self._render_stack) > 0:
+                self._render_stack[-1] += render
+            self.record(name, wall, render)
+
+    def add_render(self, seconds):
+        """
+        Adds render time to the callback currently running (if any)
+
+        :param seconds: float
+        :return:
+        """
+        if len(self._render_stack) > 0:
+            self._render_stack[-1] += seconds
+
+    def record(self, name, wall, render=0.0):
+        """
+        Records one event
+
+        :param name: string, the callback name
+        :param wall: float, wall time in seconds
+        :param render: float, render time in seconds
+        :return:
+        """
+        if name not in self.buffers:
+            self.buffers[name] = np.zeros((self.size, 2))
+            self.positions[name] = 0
+            self.counts[name] = 0
+            self.histograms[name] = np.zeros(len(BIN_EDGES) + 1, dtype=int)
+        pos = self.positions[name]
+        self.buffers[name][pos] = wall, render
+        self.positions[name] = (pos + 1) % self.size
+        self.counts[name] += 1
+        self.histograms[name][np.searchsorted(BIN_EDGES, wall)] += 1
+        for sink in self.sinks:
+            sink(name, wall, render)
+
+    # -------------------------------------------------------------------------
+    # Summaries
+    # -------------------------------------------------------------------------
+    def events(self, name):
+        """
+        The recorded events still in the ring buffer (oldest first)
+
+        :param name: string, the callback name
+        :return: numpy array, shape (N, 2), columns wall and render time
+        """
+        if name not in self.buffers:
+            return np.zeros((0, 2))
+        buffer, pos = self.buffers[name], self.positions[name]
+        if self.counts[name] < self.size:
+            return buffer[:pos].copy()
+        return np.concatenate([buffer[pos:], buffer[:pos]])
+
+    def summary(self, name=None):
+        """
+        Summary statistics of the recorded events
+
+        :param name: string, the callback name (if None all callbacks)
+        :return: dict (or dict of dicts keyed by callback name), with
+                 count, mean, max, p50/p90/p99 (wall times, from the ring
+                 buffer), render_mean and histogram (all events, bin
+                 edges in BIN_EDGES)
+        """
+        if name is None:
+            return dict((it, self.summary(it)) for it in self.buffers)
+        events = self.events(name)
+        summary = dict(count=self.counts.get(name, 0))
+        if len(events) == 0:
+            return summary
+        summary['mean'] = events[:, 0].mean()
+        summary['max'] = events[:, 0].max()
+        for pc in PERCENTILES:
+            summary['p{0}'.format(pc)] = np.percentile(events[:, 0], pc)
+        summary['render_mean'] = events[:, 1].mean()
+        summary['histogram'] = self.histograms[name].copy()
+        return summary
+
+    def reset(self):
+        """
+        Removes all recorded events
+
+        :return:
+        """
+        self.buffers = dict()
+        self.positions = dict()
+        self.counts = dict()
+        self.histograms = dict()
+
+
+def get_recorder(recorder):
+    """
+    Deals with the 'recorder' kwarg of the widgets
+
+    :param recorder: None/False (no instrumentation), True (a new
+                     Latency_Recorder) or a Latency_Recorder instance
+    :return: Latency_Recorder or None
+    """
+    if recorder is None or recorder is False:
+        return None
+    if recorder is True:
+        return Latency_Recorder()
+    return recorder
+
+
+def timed(name):
+    """
+    Decorator for widget callbacks: records the callback under name if the
+    widget has a recorder (self.recorder), otherwise just calls it
+
+    :param name: string, the name to record the callback under
+    :return: decorator
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            recorder = getattr(self, 'recorder', None)
+            if recorder is None:
+                return func(self, *args, **kwargs)
+            return recorder.call(name, func, self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# =============================================================================
+# End of code
+# =============================================================================
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Linked brushing: rectangles brushed in any of several panels (e.g. a
+corner plot of one catalogue) select rows of the shared data, and the
+selected rows are highlighted in every panel.
+
+All panels share one mask over the rows and one array of the selected
+rows (in the order they were selected). Each brush only touches the rows
+it affects (found with the spatial index of the panel it was drawn in),
+and all panels are redrawn together in one blitted pass.
+
+Version 0.0.1
+"""
+
+import numpy as np
+from matplotlib.patches import Rectangle
+from matplotlib.lines import Line2D
+
+from .Blit_manager import Figure_Blit_Manager
+from . import Event_throttle
+from . import Region_algebra
+from . import Spatial_index
+from . import Instrumentation
+from .Instrumentation import timed
+
+
+# =============================================================================
+# Define Class. Methods and Functions
+# =============================================================================
+class Linked_Brush(object):
+    def __init__(self, panels, kwargs=None):
+        """
+        Links rectangle brushing across several axes of one figure
+
+        Drag in any panel to add the rows inside the rectangle to the
+        selection (hold shift to subtract them, control to intersect the
+        selection with them), press escape to clear the selection
+
+        :param panels: list of (ax, x, y), the axes and the data plotted in
+                       each (x and y of every panel are columns of the same
+                       rows, i.e. all the same length)
+        :param kwargs: dictionary, key word arguments
+
+        Current allowed kwargs are:
+
+            - brush_color       colour of the brush rectangle, default: 'r'
+            - brush_alpha       float, alpha of the brush rectangle,
+                                default: 0.125
+            - highlight_color   colour of the selected points, default: 'r'
+            - highlight_size    float, marker size of the selected points,
+                                default: 3
+            - blit              bool, if True (default) only the brush and
+                                the selected points are redrawn
+            - max_rate          float, maximum number of mouse moves
+                                processed per second, default: 60
+            - recorder          Instrumentation.Latency_Recorder (or True
+                                to create one), default: None
+        """
+        if kwargs is None:
+            kwargs = dict()
+        if len(panels) == 0:
+            raise ValueError('Need at least one panel')
+        self.axes, self.xs, self.ys = [], [], []
+        for ax, x, y in panels:
+            x, y = np.asarray(x).ravel(), np.asarray(y).ravel()
+            if x.shape != y.shape:
+                raise ValueError("'x' and 'y' must be the same length")
+            self.axes.append(ax)
+            self.xs.append(x)
+            self.ys.append(y)
+        self.n = len(self.xs[0])
+        if any(len(x) != self.n for x in self.xs):
+            raise ValueError('All panels must have the same number of rows')
+        self.bprops = dict(color=kwargs.get('brush_color', 'r'),
+                           alpha=kwargs.get('brush_alpha', 0.125), zorder=5)
+        self.hprops = dict(color=kwargs.get('highlight_color', 'r'),
+                           markersize=kwargs.get('highlight_size', 3),
+                           marker='o', linestyle='none', zorder=4)
+        self.max_rate = kwargs.get('max_rate', Event_throttle.DEFAULT_MAX_RATE)
+        self.recorder = Instrumentation.get_recorder(kwargs.get('recorder'))
+        # spatial index of each panel (built when first brushed)
+        self._indexes = [None] * len(self.axes)
+        # shared selection: mask over the rows and the selected rows
+        self._live = np.zeros(self.n, dtype=bool)
+        self.rows = np.zeros(0, dtype=np.int64)
+        # brushed regions [(panel, x0, x1, y0, y1, op)]
+        self.regions = []
+        # the brush being drawn
+        self.panel = None
+        self.x0, self.y0 = None, None
+        self.operation = 'add'
+        # artists (one brush and one highlight per panel)
+        self.blitter = Figure_Blit_Manager(self.axes,
+                                           blit=kwargs.get('blit', True))
+        self.blitter.recorder = self.recorder
+        self.brushes, self.lines = [], []
+        for ax in self.axes:
+            brush = Rectangle((0, 0), 0, 0, visible=False, **self.bprops)
+            ax.add_patch(brush)
+            line = Line2D([], [], **self.hprops)
+            ax.add_line(line)
+            self.blitter.add_artist(brush)
+            self.blitter.add_artist(line)
+            self.brushes.append(brush)
+            self.lines.append(line)
+        # Event handling (through the shared motion throttle)
+        canvas = self.axes[0].figure.canvas
+        self.throttle = Event_throttle.get_throttle(canvas)
+        self.cids = [
+            self.throttle.connect('button_press_event', self.on_press),
+            self.throttle.connect('motion_notify_event', self.on_move,
+                                  self.max_rate),
+            self.throttle.connect('button_release_event', self.on_release),
+            self.throttle.connect('key_press_event', self.on_key)]
+
+    # -------------------------------------------------------------------------
+    # Mouse and key functions
+    # -------------------------------------------------------------------------
+    @timed('on_press')
+    def on_press(self, event):
+        """
+        Event for clicking in one of the panels (starts a brush)
+
+        :param event: event passed to function
+        :return:
+        """
+        if event.button != 1 or self.toolbar_active():
+            return
+        panel = self.panel_of(event.inaxes)
+        if panel is None:
+            return
+        self.panel = panel
+        self.x0, self.y0 = event.xdata, event.ydata
+        key = event.key or ''
+        if 'shift' in key:
+            self.operation = 'subtract'
+        elif 'control' in key or 'ctrl' in key:
+            self.operation = 'intersect'
+        else:
+            self.operation = 'add'
+
+    @timed('on_move')
+    def on_move(self, event):
+        """
+        Event for moving the mouse while brushing (redraws the brush)
+
+        :param event: event passed to function
+        :return:
+        """
+        if self.panel is None or event.inaxes is not self.axes[self.panel]:
+            return
+        brush = self.brushes[self.panel]
+        brush.set_xy((self.x0, self.y0))
+        brush.set_width(event.xdata - self.x0)
+        brush.set_height(event.ydata - self.y0)
+        brush.set_visible(True)
+        self.blitter.update()
+
+    @timed('on_release')
+    def on_release(self, event):
+        """
+        Event for releasing the mouse (applies the brush to the selection)
+
+        :param event: event passed to function
+        :return:
+        """
+        if self.panel is None:
+            return
+        panel, self.panel = self.panel, None
+        self.brushes[panel].set_visible(False)
+        if event.inaxes is not self.axes[panel]:
+            self.blitter.update()
+            return
+        self.brush(panel, self.x0, event.xdata, self.y0, event.ydata,
+                   self.operation)
+
+    def on_key(self, event):
+        """
+        Event for a key press (escape clears the selection)
+
+        :param event: event passed to function
+        :return:
+        """
+        if event.key == 'escape':
+            self.clear()
+
+    def panel_of(self, ax):
+        """
+        The panel drawn in an axis
+
+        :param ax: matplotlib axis (or None)
+        :return: int or None
+        """
+        for panel, pax in enumerate(self.axes):
+            if pax is ax:
+                return panel
+        return None
+
+    def toolbar_active(self):
+        """
+        Whether a toolbar mode (zoom, pan) is active
+
+        :return: bool
+        """
+        manager = self.axes[0].figure.canvas.manager
+        toolbar = getattr(manager, 'toolbar', None)
+        if toolbar is None:
+            return False
+        if hasattr(toolbar, '_active'):
+            return toolbar._active is not None
+        return bool(getattr(toolbar, 'mode', ''))
+
+    # -------------------------------------------------------------------------
+    # Selection functions
+    # -------------------------------------------------------------------------
+    def index(self, panel):
+        """
+        The spatial index of a panel's data (built on first use)
+
+        :param panel: int, the panel
+        :return: Spatial_index.Grid_Index
+        """
+        if self._indexes[panel] is None:
+            self._indexes[panel] = Spatial_index.Grid_Index(self.xs[panel],
+                                                            self.ys[panel])
+        return self._indexes[panel]
+
+    @timed('brush')
+    def brush(self, panel, x0, x1, y0, y1, op='add'):
+        """
+        Applies a rectangle in one panel to the shared selection, only the
+        rows inside it are touched, then redraws all panels in one pass
+
+        :param panel: int, the panel the rectangle is drawn in
+        :param x0: float, x start of the rectangle
+        :param x1: float, x end of the rectangle
+        :param y0: float, y start of the rectangle
+        :param y1: float, y end of the rectangle
+        :param op: string, 'add', 'subtract' or 'intersect'
+        :return:
+        """
+        if op not in Region_algebra.OPERATIONS:
+            raise ValueError("'op' must be one of: {0}".format(
+                ', '.join(Region_algebra.OPERATIONS)))
+        if None in (x0, x1, y0, y1) or x0 == x1 or y0 == y1:
+            self.blitter.update()
+            return
+        self.regions.append((panel, x0, x1, y0, y1, op))
+        found = self.index(panel).query(x0, x1, y0, y1)
+        if op == 'add':
+            new = found[~self._live[found]]
+            self._live[new] = True
+            self.rows = np.concatenate([self.rows, new])
+            self.update_lines(added=new)
+            return
+        if op == 'subtract':
+            self._live[found] = False
+            keep = self._live[self.rows]
+        else:
+            flag = np.zeros(self.n, dtype=bool)
+            flag[found] = True
+            keep = flag[self.rows]
+            self._live[self.rows[~keep]] = False
+        self.rows = self.rows[keep]
+        self.update_lines(keep=keep)
+
+    def update_lines(self, added=None, keep=None):
+        """
+        Updates the selected points drawn in every panel and redraws them
+        all in one blitted pass
+
+        :param added: numpy array of ints, rows newly selected (appended)
+        :param keep: numpy array of bools, which of the previously selected
+                     rows are still selected
+        :return:
+        """
+        for panel, line in enumerate(self.lines):
+            xs, ys = line.get_data()
+            if added is not None:
+                xs = np.concatenate([xs, self.xs[panel][added]])
+                ys = np.concatenate([ys, self.ys[panel][added]])
+            elif keep is not None:
+                xs, ys = np.asarray(xs)[keep], np.asarray(ys)[keep]
+            else:
+                xs, ys = self.xs[panel][self.rows], self.ys[panel][self.rows]
+            line.set_data(xs, ys)
+        self.blitter.update()
+
+    @timed('clear')
+    def clear(self):
+        """
+        Clears the selection (in every panel)
+
+        :return:
+        """
+        self._live[self.rows] = False
+        self.rows = np.zeros(0, dtype=np.int64)
+        self.regions = []
+        self.update_lines()
+
+    # -------------------------------------------------------------------------
+    # Selected rows
+    # -------------------------------------------------------------------------
+    @property
+    def mask(self):
+        """
+        The rows currently selected (read-only)
+
+        :return: numpy array of bools
+        """
+        live = self._live.view()
+        live.flags.writeable = False
+        return live
+
+    @property
+    def num_selected(self):
+        return len(self.rows)
+
+    def indices(self):
+        """
+        The rows currently selected
+
+        :return: numpy array of ints (sorted)
+        """
+        return np.sort(self.rows)
+
+    def disconnect(self):
+        """
+        Stops brushing (the selection is kept)
+
+        :return:
+        """
+        for cid in self.cids:
+            self.throttle.disconnect(cid)
+        self.blitter.disconnect()
+        self.cids = []
+
+
+def link_axes(axes, columns, pairs, **kwargs):
+    """
+    Links brushing across the panels of e.g. a corner plot
+
+    :param axes: list of matplotlib axes, one per pair
+    :param columns: dict (or structured array) of the data columns
+    :param pairs: list of (x column name, y column name), one per axis
+    :param kwargs: key word arguments (see Linked_Brush)
+    :return: Linked_Brush instance
+    """
+    if len(axes) != len(pairs):
+        raise ValueError("'axes' and 'pairs' must be the same length")
+    panels = [(ax, columns[xname], columns[yname])
+              for ax, (xname, yname) in zip(axes, pairs)]
+    return Linked_Brush(panels, kwargs)
+
+
+# =============================================================================
+# End of code
+# =============================================================================
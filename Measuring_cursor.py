@@ -14,9 +14,14 @@ Version 0.0.0
 """
 
 from __future__ import print_function
-import matplotlib.pyplot as plt
 import numpy as np
 
+from . import Event_throttle
+from .Blit_manager import Blit_Manager
+from . import Spatial_index
+from . import Instrumentation
+from .Instrumentation import timed
+
 # =============================================================================
 # Define variables
 # =============================================================================
@@ -41,6 +46,8 @@ class Cursor(object):
         self.display_x = kwargs.get('display_x', True)
         self.posx = kwargs.get('posx', 0.7)
         self.posy = kwargs.get('posy', 0.9)
+        self.blit = kwargs.get('blit', True)
+        self.recorder = Instrumentation.get_recorder(kwargs.get('recorder'))
 
         self.ax = ax
         self.lx = ax.axhline(color='k')  # the horiz line
@@ -49,14 +56,20 @@ class Cursor(object):
         # text location in axes coords
         self.txt = ax.text(self.posx, self.posy, '', transform=ax.transAxes)
 
+        # only redraw the lines and text on mouse moves
+        self.blitter = Blit_Manager(ax, [self.lx, self.ly, self.txt],
+                                    blit=self.blit)
+        self.blitter.recorder = self.recorder
+
+    @timed('mouse_move')
     def mouse_move(self, event):
         if not event.inaxes:
             return
 
         x, y = event.xdata, event.ydata
         # update the line positions
-        self.lx.set_ydata(y)
-        self.ly.set_xdata(x)
+        self.lx.set_ydata([y])
+        self.ly.set_xdata([x])
 
         if self.display_y and self.display_x:
             self.txt.set_text('x={0:.2f}, y={1:.2f}'.format(x, y))
@@ -64,25 +77,49 @@ class Cursor(object):
             self.txt.set_text('y={1:.2f}'.format(x, y))
         elif self.display_x:
             self.txt.set_text('x={0:.2f}'.format(x, y))
-        plt.draw()
+        self.blitter.update()
 
 
 class SnaptoCursor(object):
     """
     Like Cursor but the crosshair snaps to the nearest x,y point
-    For simplicity, I'm assuming x is sorted
+
+    With snap='x' (default) x must be sorted and the point nearest in x is
+    found by binary search, with snap='xy' the point nearest to the mouse
+    in display space is found with a spatial index (any ordering, works on
+    log and unequal-aspect axes)
     """
 
-    def __init__(self, ax, x, y):
+    def __init__(self, ax, x, y, kwargs=None):
+        # Deal with kwargs
+        if kwargs is None:
+            kwargs = dict()
+        self.blit = kwargs.get('blit', True)
+        self.recorder = Instrumentation.get_recorder(kwargs.get('recorder'))
+        self.snap = kwargs.get('snap', 'x')
+        if self.snap not in ['x', 'xy']:
+            raise ValueError("'snap' must be 'x' or 'xy'")
+
         self.ax = ax
         self.lx = ax.axhline(color='k')  # the horiz line
         self.ly = ax.axvline(color='k')  # the vert line
-        self.x = x
-        self.y = y
+        self.x = np.asarray(x)
+        self.y = np.asarray(y)
+        # spatial index (in axis scale space) for snap='xy', built now so
+        # the first move does not pay for it (rebuilt if the scales change)
+        self._index = None
+        self._index_scales = None
+        if self.snap == 'xy':
+            _ = self.index
         # text location in axes coords
         self.txt = ax.text(0.7, 0.9, '', transform=ax.transAxes)
 
+        # only redraw the lines and text on mouse moves
+        self.blitter = Blit_Manager(ax, [self.lx, self.ly, self.txt],
+                                    blit=self.blit)
+        self.blitter.recorder = self.recorder
 
+    @timed('mouse_move')
     def mouse_move(self, event):
 
         if not event.inaxes:
@@ -90,17 +127,70 @@ class SnaptoCursor(object):
 
         x, y = event.xdata, event.ydata
 
-        indx = np.searchsorted(self.x, [x])[0]
+        if self.snap == 'xy':
+            indx = self.nearest_xy(x, y)
+        else:
+            indx = self.nearest_x(x)
+        if indx is None:
+            return
 
         x = self.x[indx]
         y = self.y[indx]
         # update the line positions
-        self.lx.set_ydata(y)
-        self.ly.set_xdata(x)
+        self.lx.set_ydata([y])
+        self.ly.set_xdata([x])
 
         self.txt.set_text('x=%1.2f, y=%1.2f' % (x, y))
         # print('x=%1.2f, y=%1.2f' % (x, y))
-        plt.draw()
+        self.blitter.update()
+
+    def nearest_x(self, x):
+        """
+        Finds the point nearest in x (x data must be sorted)
+
+        :param x: float, x position in data coordinates
+        :return indx: int, index of the nearest point (None if no data)
+        """
+        if len(self.x) == 0:
+            return None
+        indx = int(np.searchsorted(self.x, x))
+        # keep within the data and pick the closer neighbour
+        if indx >= len(self.x):
+            return len(self.x) - 1
+        if indx > 0 and abs(x - self.x[indx - 1]) <= abs(self.x[indx] - x):
+            return indx - 1
+        return indx
+
+    def nearest_xy(self, x, y):
+        """
+        Finds the point nearest in display space
+
+        :param x: float, x position in data coordinates
+        :param y: float, y position in data coordinates
+        :return indx: int, index of the nearest point (None if no data)
+        """
+        # scale space (e.g. log10 for log axes) to display is linear
+        pos = self.ax.transScale.transform([[x, y]])[0]
+        trans = self.ax.transLimits + self.ax.transAxes
+        (ox, oy), (px, py) = trans.transform([[0, 0], [1, 1]])
+        return self.index.nearest(pos[0], pos[1], px - ox, py - oy)
+
+    @property
+    def index(self):
+        """
+        Spatial index of the data in axis scale space (rebuilt when the
+        axis scales change)
+
+        :return index: Spatial_index.Grid_Index instance
+        """
+        scales = (self.ax.get_xscale(), self.ax.get_yscale())
+        if self._index is None or self._index_scales != scales:
+            xy = np.column_stack([self.x.ravel(), self.y.ravel()])
+            with np.errstate(all='ignore'):
+                pos = self.ax.transScale.transform(xy)
+            self._index = Spatial_index.Grid_Index(pos[:, 0], pos[:, 1])
+            self._index_scales = scales
+        return self._index
 
 
 
@@ -115,6 +205,7 @@ class RegionSelect(object):
 
 
 if __name__ == '__main__':
+    import matplotlib.pyplot as plt
 
     fig, frame = plt.subplots(ncols=1, nrows=1)
 
@@ -141,13 +232,58 @@ def use_measurement_cursor(ax=None, **kwargs):
             - posy          float, default=0.9, location in plot between 0
                             and 1 on the y axis to display cursor
                             measurement text
+            - max_rate      float, default=60, maximum number of mouse
+                            moves processed per second
+            - blit          bool, default True, only redraw the cursor
+                            lines and text on mouse moves (full redraws
+                            on backends that cannot blit)
+            - recorder      Instrumentation.Latency_Recorder (or True to
+                            create one), records the time of every mouse
+                            move, default None (no instrumentation)
     :return:
     """
     if ax is None:
+        import matplotlib.pyplot as plt
         ax = plt.gca()
 
     cursor = Cursor(ax, kwargs)
-    plt.connect('motion_notify_event', cursor.mouse_move)
+    Event_throttle.connect(ax.figure.canvas, 'motion_notify_event',
+                           cursor.mouse_move, kwargs.get('max_rate', None))
+    return cursor
+
+
+def use_snapto_cursor(x, y, ax=None, **kwargs):
+    """
+    Use snap-to cursor (crosshair snaps to the nearest x, y point) on
+    matplotlib.pyplot.show
+
+    :param x: numpy array, the x data plotted (sorted if snap='x')
+    :param y: numpy array, the y data plotted
+    :param ax: matplotlib axis (frame), i.e. plt.subplot() plt.gca()
+    :param kwargs: dictionary, key word arguments
+
+        currently accepted keywords arguments are:
+
+            - max_rate      float, default=60, maximum number of mouse
+                            moves processed per second
+            - blit          bool, default True, only redraw the cursor
+                            lines and text on mouse moves (full redraws
+                            on backends that cannot blit)
+            - recorder      Instrumentation.Latency_Recorder (or True to
+                            create one), records the time of every mouse
+                            move, default None (no instrumentation)
+            - snap          string, default 'x', 'x' snaps to the point
+                            nearest in x (x must be sorted), 'xy' snaps to
+                            the point nearest in display space (any order)
+    :return:
+    """
+    if ax is None:
+        import matplotlib.pyplot as plt
+        ax = plt.gca()
+
+    cursor = SnaptoCursor(ax, x, y, kwargs)
+    Event_throttle.connect(ax.figure.canvas, 'motion_notify_event',
+                           cursor.mouse_move, kwargs.get('max_rate', None))
     return cursor
 
 # ----------------------------------------------------------------------
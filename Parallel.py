@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Parallel evaluation of region sets
+
+The data are split into chunks which are evaluated in a concurrent.futures
+process (or thread) pool. The arrays are never pickled:
+
+    - memmap arrays (np.memmap, np.load(mmap_mode='r')) are sent as
+      (file name, dtype, offset, shape) and each worker maps only its chunk
+    - other arrays are copied once into shared memory (process pools) or
+      used directly (thread pools, numpy releases the GIL)
+
+Chunk results come back in chunk order (masks as packed bits), so the
+result is deterministic and identical to Region_mask.region_mask.
+
+Version 0.0.1
+"""
+
+import mmap
+import os
+import numpy as np
+
+from . import Region_io
+from . import Region_mask
+from . import Streaming
+
+# =============================================================================
+# Define variables
+# =============================================================================
+# default number of points per chunk (a multiple of 8)
+CHUNK_SIZE = 2 ** 22
+# supported executors
+EXECUTORS = ['process', 'thread']
+
+
+# =============================================================================
+# Define Class. Methods and Functions
+# =============================================================================
+def parallel_mask(regions, x, y, workers=None, chunk_size=CHUNK_SIZE,
+                  executor='process', packed=False):
+    """
+    Creates a mask of the points in any of the regions, evaluating chunks
+    of the data in parallel
+
+    :param regions: the region set, a Region_store.Region_Store, anything
+                    with a store attribute (Select_Rectange,
+                    Saved_Selection) or a list/array of
+                    [x start, x end, y start, y end]
+    :param x: numpy array or memmap, the x data
+    :param y: numpy array or memmap, the y data
+    :param workers: int or None, number of workers (default os.cpu_count())
+    :param chunk_size: int, number of points per chunk
+    :param executor: 'process', 'thread' or a concurrent.futures.Executor
+                     (not shut down afterwards)
+    :param packed: bool, if True return a Region_io.Packed_Mask (n/8 bytes)
+                   instead of the mask
+    :return mask: numpy array of bools (or Region_io.Packed_Mask)
+    """
+    length = len(x)
+    bits = _run(regions, x, y, 'mask', workers, chunk_size, executor)
+    header = np.array([length], dtype='<u8').view(np.uint8)
+    result = Region_io.Packed_Mask(np.concatenate([header] + bits))
+    if packed:
+        return result
+    return result.to_bool()
+
+
+def parallel_indices(regions, x, y, workers=None, chunk_size=CHUNK_SIZE,
+                     executor='process'):
+    """
+    Finds the indices of the points in any of the regions, evaluating
+    chunks of the data in parallel
+
+    :param regions: the region set (see parallel_mask)
+    :param x: numpy array or memmap, the x data
+    :param y: numpy array or memmap, the y data
+    :param workers: int or None, number of workers (default os.cpu_count())
+    :param chunk_size: int, number of points per chunk
+    :param executor: 'process', 'thread' or a concurrent.futures.Executor
+    :return indices: numpy array of ints (sorted)
+    """
+    found = _run(regions, x, y, 'indices', workers, chunk_size, executor)
+    if len(found) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.concatenate(found)
+
+
+def _run(regions, x, y, kind, workers, chunk_size, executor):
+    """
+    Evaluates every chunk in the pool
+
+    :return: list of the chunk results, in chunk order
+    """
+    from concurrent import futures
+    if len(x) != len(y):
+        raise ValueError("'x' and 'y' must be the same length")
+    regions = Streaming.get_regions(regions)
+    chunk_size = max(8 * (int(chunk_size) // 8), 8)
+    starts = list(range(0, len(x), chunk_size))
+    if len(starts) == 0:
+        return []
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(min(int(workers), len(starts)), 1)
+    # the executor
+    own = not isinstance(executor, futures.Executor)
+    if own and executor == 'process':
+        pool = futures.ProcessPoolExecutor(max_workers=workers)
+    elif own and executor == 'thread':
+        pool = futures.ThreadPoolExecutor(max_workers=workers)
+    elif own:
+        raise ValueError("'executor' must be one of: "
+                         "{0}".format(', '.join(EXECUTORS)))
+    else:
+        pool = executor
+    threads = isinstance(pool, futures.ThreadPoolExecutor)
+    segments = []
+    try:
+        refs = []
+        for array in [x, y]:
+            ref, segment = _reference(array, threads)
+            refs.append(ref)
+            if segment is not None:
+                segments.append(segment)
+        stops = [min(start + chunk_size, len(x)) for start in starts]
+        jobs = [pool.submit(_evaluate_chunk, refs[0], refs[1], regions,
+                            start, stop, kind)
+                for start, stop in zip(starts, stops)]
+        # collected in submission order (deterministic)
+        return [job.result() for job in jobs]
+    finally:
+        if own:
+            pool.shutdown()
+        for segment in segments:
+            segment.close()
+            segment.unlink()
+
+
+def _reference(array, threads=False):
+    """
+    How a worker finds an array without it being pickled
+
+    :param array: numpy array or memmap
+    :param threads: bool, if True the workers share this process' memory
+    :return ref, segment: tuple describing the array, and the shared
+                          memory segment created for it (or None)
+    """
+    array = np.asarray(array).ravel()
+    mapped = _memmap_reference(array)
+    if mapped is not None:
+        return mapped, None
+    if threads:
+        return ('array', array), None
+    from multiprocessing import shared_memory
+    array = np.ascontiguousarray(array).ravel()
+    segment = shared_memory.SharedMemory(create=True,
+                                         size=max(array.nbytes, 1))
+    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)
+    shared[:] = array
+    del shared
+    return ('shared', segment.name, array.dtype.str, array.shape), segment
+
+
+def _memmap_reference(array):
+    """
+    (file name, dtype, offset, shape) of a 1D contiguous memmap (or a view
+    of one)
+
+    :param array: numpy array
+    :return: tuple or None if the array is not file backed
+    """
+    if array.ndim != 1 or not array.flags.c_contiguous:
+        return None
+    # find the memmap that owns the mmap
+    root = array
+    while root is not None and not isinstance(root.base, mmap.mmap):
+        root = root.base if isinstance(root.base, np.ndarray) else None
+    if not isinstance(root, np.memmap) or root.filename is None:
+        return None
+    start = array.__array_interface__['data'][0]
+    offset = root.offset + start - root.__array_interface__['data'][0]
+    return ('memmap', root.filename, array.dtype.str, offset, array.shape)
+
+
+def _attach(ref, start, stop):
+    """
+    The chunk [start, stop) of an array described by _reference
+
+    :return chunk, segment: numpy array, and the shared memory segment to
+                            close once done (or None)
+    """
+    if ref[0] == 'array':
+        return ref[1][start:stop], None
+    if ref[0] == 'memmap':
+        _, filename, dtype, offset, _ = ref
+        dtype = np.dtype(dtype)
+        chunk = np.memmap(filename, dtype=dtype, mode='r',
+                          offset=offset + start * dtype.itemsize,
+                          shape=(stop - start,))
+        return chunk, None
+    from multiprocessing import shared_memory
+    _, name, dtype, shape = ref
+    segment = shared_memory.SharedMemory(name=name)
+    array = np.ndarray(shape, dtype=dtype, buffer=segment.buf)
+    return array[start:stop], segment
+
+
+def _evaluate_chunk(xref, yref, regions, start, stop, kind):
+    """
+    Evaluates one chunk (run in the workers)
+
+    :return: packed bits of the chunk mask (kind='mask') or the indices
+             selected (kind='indices')
+    """
+    xc, xsegment = _attach(xref, start, stop)
+    yc, ysegment = _attach(yref, start, stop)
+    try:
+        mask = Region_mask.region_mask(xc, yc, regions)
+    finally:
+        # views must go before the shared memory is closed
+        del xc, yc
+        for segment in [xsegment, ysegment]:
+            if segment is not None:
+                segment.close()
+    if kind == 'indices':
+        return start + np.flatnonzero(mask)
+    return np.packbits(mask, bitorder='little')
+
+
+# =============================================================================
+# End of code
+# =============================================================================
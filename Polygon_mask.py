@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Vectorized selection masks for polygon (lasso) regions, given as an
+(M, 2) array of vertices (the polygon is closed automatically)
+
+Points are first filtered by the bounding box of the polygon, the
+remaining candidates are then tested with the even-odd crossing rule,
+each edge against only the run of candidates in its y range.
+
+Version 0.0.1
+"""
+
+import numpy as np
+
+# =============================================================================
+# Define functions
+# =============================================================================
+def normalise_polygon(verts):
+    """
+    Checks the vertices of a polygon
+
+    :param verts: list or array of (x, y) vertices
+    :return verts: numpy array, shape (M, 2), without a repeated closing
+                   vertex
+    """
+    verts = np.asarray(verts, dtype=float).reshape(-1, 2)
+    if len(verts) > 1 and np.all(verts[0] == verts[-1]):
+        verts = verts[:-1]
+    if len(verts) < 3:
+        raise ValueError('A polygon needs at least 3 vertices')
+    return verts
+
+
+def bounding_box(verts):
+    """
+    The bounding box of a polygon
+
+    :param verts: list or array of (x, y) vertices
+    :return: tuple of floats (x start, x end, y start, y end)
+    """
+    verts = np.asarray(verts, dtype=float).reshape(-1, 2)
+    (x0, y0), (x1, y1) = verts.min(axis=0), verts.max(axis=0)
+    return float(x0), float(x1), float(y0), float(y1)
+
+
+def points_in_polygon(x, y, verts):
+    """
+    Crossing test of points against a polygon (no bounding box filter)
+
+    The points are sorted by y once, so each edge is only tested against
+    the (contiguous) run of points inside its y range
+
+    :param x: numpy array, the x data
+    :param y: numpy array, the y data
+    :param verts: list or array of (x, y) vertices
+    :return mask: numpy array of bools, True if the point is inside
+    """
+    x, y = np.asarray(x).ravel(), np.asarray(y).ravel()
+    verts = normalise_polygon(verts)
+    # edges (x0, y0) -> (x1, y1)
+    ex0, ey0 = verts[:, 0], verts[:, 1]
+    ex1, ey1 = np.roll(ex0, -1), np.roll(ey0, -1)
+    # dx/dy of each edge (horizontal edges are never crossed)
+    flat = ey1 == ey0
+    slope = (ex1 - ex0) / np.where(flat, 1.0, ey1 - ey0)
+    # points with min(y0, y1) <= y < max(y0, y1) for each edge
+    order = np.argsort(y, kind='stable')
+    xs, ys = x[order], y[order]
+    lo = np.searchsorted(ys, np.minimum(ey0, ey1), side='left')
+    hi = np.searchsorted(ys, np.maximum(ey0, ey1), side='left')
+    # flip the parity of the points with a crossing to their right
+    inside = np.zeros(len(x), dtype=bool)
+    for edge in np.flatnonzero(hi > lo):
+        span = slice(lo[edge], hi[edge])
+        xcross = ex0[edge] + (ys[span] - ey0[edge]) * slope[edge]
+        inside[span] ^= xs[span] < xcross
+    mask = np.empty(len(x), dtype=bool)
+    mask[order] = inside
+    return mask
+
+
+def polygon_mask(x, y, verts):
+    """
+    Creates a mask of the points inside a polygon
+
+    :param x: numpy array, the x data
+    :param y: numpy array, the y data
+    :param verts: list or array of (x, y) vertices
+    :return mask: numpy array of bools, True if in the polygon
+    """
+    x, y = np.asarray(x).ravel(), np.asarray(y).ravel()
+    if x.shape != y.shape:
+        raise ValueError("'x' and 'y' must be the same length")
+    x0, x1, y0, y1 = bounding_box(verts)
+    mask = (x > x0) & (x < x1) & (y > y0) & (y < y1)
+    candidates = np.flatnonzero(mask)
+    mask[candidates] = points_in_polygon(x[candidates], y[candidates], verts)
+    return mask
+
+
+def polygon_indices(x, y, verts):
+    """
+    Finds the indices of the points inside a polygon
+
+    :param x: numpy array, the x data
+    :param y: numpy array, the y data
+    :param verts: list or array of (x, y) vertices
+    :return indices: numpy array of ints, indices of the points selected
+    """
+    return np.flatnonzero(polygon_mask(x, y, verts))
+
+
+# =============================================================================
+# End of code
+# =============================================================================
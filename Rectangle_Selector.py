@@ -10,28 +10,52 @@ Program description here
 Version 0.0.1
 """
 
-import matplotlib.pyplot as plt
-from matplotlib.patches import Rectangle
+import numpy as np
+from matplotlib.patches import Polygon, Rectangle
+from matplotlib.collections import PolyCollection
 from matplotlib.widgets import Button
-import tkinter
-import tkinter.simpledialog as tksimpledialog
+
+from .Blit_manager import Blit_Manager
+from . import Dialogs
+from . import Event_throttle
+from . import Polygon_mask
+from . import Region_io
+from . import Region_history
+from . import Region_mask
+from . import Region_stats
+from .Region_store import POLYGON_OP_ERROR, Region_Store
+from . import Spatial_index
+from . import Instrumentation
+from .Instrumentation import timed
 
 # =============================================================================
 # Define variables
 # =============================================================================
+# selection modes (axis-aligned rectangles, free-hand polygons, or x ranges
+# with no y bounds)
+MODES = ['rectangle', 'lasso', 'span']
+# number of regions listed by the live statistics
+MAX_STATS_LINES = 10
+# keys that undo and redo the last change to the regions
+UNDO_KEYS = ['ctrl+z', 'cmd+z']
+REDO_KEYS = ['ctrl+y', 'ctrl+Z', 'ctrl+shift+z', 'cmd+Z', 'cmd+shift+z']
 
 
 # =============================================================================
 # Define Class. Methods and Functions
 # =============================================================================
 class Select_Rectange(object):
-    def __init__(self, ax=None, kwargs=None):
+    def __init__(self, ax=None, kwargs=None, x=None, y=None):
         """
         Adds a select rectangle feature to any matplotlib axis, with select,
         clear all, and finish buttons
 
         :param ax: matplotlib axis, the frame to add the selector to
         :param kwargs: kwargs passed to the rectangle selector
+        :param x: numpy array, the x data plotted (optional), if given with
+                  y a spatial index is built here (see set_data) and used
+                  by mask/indices/labels when called without data
+        :param y: numpy array, the y data plotted (optional)
 
         Current allowed kwargs are:
 
@@ -59,9 +83,68 @@ class Select_Rectange(object):
         
             - finish_button_text   string, the finish button text
 
+            - blit                 bool, if True (default) only the selector
+                                   rectangle is redrawn while dragging
+                                   (falls back to full redraws on backends
+                                   that cannot blit)
+
+            - max_rate             float, maximum number of mouse moves
+                                   processed per second, default: 60
+
+            - live_count           bool, if True (default) and x/y are
+                                   given, shows the number of points inside
+                                   the rectangle while dragging
+                                   (approximate while moving, exact on
+                                   release)
+
+            - count_bins           int, number of bins (along each axis) of
+                                   the table used for the approximate
+                                   counts, default: 512
+
+            - recorder             Instrumentation.Latency_Recorder (or
+                                   True to create one), records the wall
+                                   and render time of every callback,
+                                   default: None (no instrumentation)
+
+            - input_provider       where tags come from, an object with an
+                                   ask(title, prompt, fmt, minval, maxval)
+                                   method (see Dialogs), default: None
+                                   (shared tkinter dialogs)
+
+            - mode                 string, 'rectangle' (default) to drag
+                                   rectangles, 'lasso' to draw free-hand
+                                   polygons or 'span' to select x ranges
+                                   (see set_mode)
+
+            - highlight            bool, if True and x/y are given, draws
+                                   the selected points (self.live_mask) as
+                                   regions are added and removed,
+                                   default: False
+
+            - highlight_color      colour of the highlighted points
+                                   default: 'r'
+
+            - highlight_size       float, marker size of the highlighted
+                                   points, default: 3
+
+            - live_stats           bool, if True and x/y are given, lists
+                                   the statistics of the last regions
+                                   (see statistics) in the figure,
+                                   default: False
+
+            - stats_values         numpy array, the values the live
+                                   statistics are computed on (one per
+                                   point), default: the y data
+
+            - max_history          int, number of changes (add, remove,
+                                   clear) that can be undone (ctrl+z) and
+                                   redone (ctrl+y), default: None (no
+                                   limit)
+
         """
         # Deal with having no matplotlib axis
         if ax is None:
+            import matplotlib.pyplot as plt
             self.ax = plt.gca()
         else:
             self.ax = ax
@@ -104,6 +187,26 @@ class Select_Rectange(object):
         self.tag_title = kwargs.get('tag_title', 'Name rectangle')
         self.tag_comment = kwargs.get('tag_comment',
                                       'Enter description for rectangle.')
+        self.blit = kwargs.get('blit', True)
+        self.max_rate = kwargs.get('max_rate', Event_throttle.DEFAULT_MAX_RATE)
+        self.live_count = kwargs.get('live_count', True)
+        self.count_bins = kwargs.get('count_bins', Spatial_index.SAT_BINS)
+        self.recorder = Instrumentation.get_recorder(kwargs.get('recorder'))
+        self.input_provider = kwargs.get('input_provider', None)
+        self.highlight = kwargs.get('highlight', False)
+        self.hprops = dict(color=kwargs.get('highlight_color', 'r'),
+                           markersize=kwargs.get('highlight_size', 3),
+                           marker='o', linestyle='none',
+                           zorder=self.srectprops['zorder'])
+        self.live_stats = kwargs.get('live_stats', False)
+        self.stats_values = kwargs.get('stats_values', None)
+        self.mode = kwargs.get('mode', 'rectangle')
+        # how the next region combines with the selection (set on press:
+        # shift = subtract, control = intersect)
+        self.operation = 'add'
+        if self.mode not in MODES:
+            raise ValueError("'mode' must be one of: "
+                             "{0}".format(', '.join(MODES)))
 
         # define default attributes
         self.x0 = None
@@ -111,30 +214,78 @@ class Select_Rectange(object):
         self.x1 = None
         self.y1 = None
         self.rect = None
+        # vertices of the lasso being drawn (lasso mode)
+        self.lasso_verts = []
+        self.lasso = None
         self.pressed = False
         self.in_main_axes = True
         self.regions = []
-        self.save_rectangles = []
-        self.data = []
-        self.tags = []
+        # selected regions (a.data and a.tags are read-only views of this)
+        self.store = Region_Store()
+        # changes to the regions (for undo/redo)
+        self.history = Region_history.Command_Log(kwargs.get('max_history'))
+        self.x = None
+        self.y = None
+        self._index = None
+        self._sat = None
+        # live mask of the selected points (built when first needed, then
+        # updated as regions are added and removed)
+        self._live = None
+        self.num_selected = 0
+        self.highlight_line = None
+        self._highlighted = None
+        # fast redraws of the selector rectangle (and, as a cached layer,
+        # of the saved regions)
+        self.blitter = Blit_Manager(self.ax, blit=self.blit)
+        self.blitter.recorder = self.recorder
+        self.set_data(x, y)
 
         # Set title
         self.ax.set_title(self.title)
 
+        # saved rectangles (one collection backed by a vertex array)
+        self.saved_verts = np.zeros((16, 4, 2))
+        self.num_saved = 0
+        self.saved_collection = PolyCollection([], **self.srectprops)
+        self.ax.add_collection(self.saved_collection, autolim=False)
+        # saved polygons (vertex counts differ, so a list of arrays)
+        self.saved_polys = []
+        self.saved_poly_collection = PolyCollection([], **self.srectprops)
+        self.ax.add_collection(self.saved_poly_collection, autolim=False)
+        self.blitter.add_artist(self.saved_collection, layer=True)
+        self.blitter.add_artist(self.saved_poly_collection, layer=True)
+
+        # live count of the points in the selector rectangle
+        self.count_text = self.ax.text(0.02, 0.98, '', va='top',
+                                       transform=self.ax.transAxes,
+                                       zorder=self.cprops['zorder'])
+        self.blitter.add_artist(self.count_text)
+        # live statistics of the regions
+        self.stats_text = self.ax.text(0.98, 0.98, '', va='top', ha='right',
+                                       fontsize='small',
+                                       transform=self.ax.transAxes,
+                                       zorder=self.cprops['zorder'])
+        self.blitter.add_artist(self.stats_text, layer=True)
+
         # create buttons
         self.create_buttons()
 
-        # Event handling
-        self.ax.figure.canvas.mpl_connect('button_press_event', self.on_press)
-        self.ax.figure.canvas.mpl_connect('motion_notify_event', self.on_move)
-        self.ax.figure.canvas.mpl_connect('button_release_event',
-                                          self.on_release)
-        self.ax.figure.canvas.mpl_connect('axes_enter_event', self.enter_axes)
-        self.ax.figure.canvas.mpl_connect('axes_leave_event', self.leave_axes)
+        # Event handling (through the shared motion throttle)
+        self.throttle = Event_throttle.get_throttle(self.ax.figure.canvas)
+        self.throttle.connect('button_press_event', self.on_press)
+        self.throttle.connect('motion_notify_event', self.on_move,
+                              self.max_rate)
+        self.throttle.connect('button_release_event', self.on_release)
+        self.throttle.connect('axes_enter_event', self.enter_axes)
+        self.throttle.connect('axes_leave_event', self.leave_axes)
+        self.throttle.connect('key_press_event', self.on_key)
+        # spans are drawn to the y limits
+        self.ax.callbacks.connect('ylim_changed', self.on_ylim_changed)
 
     # -------------------------------------------------------------------------
     # Mouse movement and click function
     # -------------------------------------------------------------------------
+    @timed('on_press')
     def on_press(self, event):
         """
         Event for clicking of the mouse in the main axis (ax) window (
@@ -147,14 +298,26 @@ class Select_Rectange(object):
         if not self.in_main_axes:
             return
         # if toolbar is active don't continue
-        if self.ax.figure.canvas.manager.toolbar._active is not None:
+        if self.toolbar_active():
+            return
+        # right click removes the (last added) region under the mouse
+        if event.button == 3:
+            row = self.region_at(event.xdata, event.ydata)
+            if row is not None:
+                self.remove_region(row)
             return
         # set the starting points from mouse location
         self.x0 = event.xdata
         self.y0 = event.ydata
+        if self.mode == 'span':
+            self.y0 = -np.inf
+        if self.mode == 'lasso':
+            self.lasso_verts = [(event.xdata, event.ydata)]
+        self.operation = self.key_operation(event.key)
         # highlight that we have started the selection rectangle
         self.pressed = True
 
+    @timed('on_move')
     def on_move(self, event):
         """
         Event for moving the mouse in the main axis (ax) window once a on_press
@@ -167,17 +330,26 @@ class Select_Rectange(object):
         if not self.in_main_axes:
             return
         # if toolbar is active don't continue
-        if self.ax.figure.canvas.manager.toolbar._active is not None:
+        if self.toolbar_active():
             return
         # do not draw if mouse has not been clicked
         if not self.pressed:
             return
+        # add a vertex to the lasso (only counted on release)
+        if self.mode == 'lasso':
+            if event.xdata is not None:
+                self.lasso_verts.append((event.xdata, event.ydata))
+            self.draw_current_lasso()
+            return
         # set the end points of the selection rectangle (whilst moving)
         self.x1 = event.xdata
-        self.y1 = event.ydata
+        self.y1 = np.inf if self.mode == 'span' else event.ydata
+        # update the (approximate) count of points selected
+        self.update_count(exact=False)
         # Redraw the rectangle selection
         self.draw_current_rec()
 
+    @timed('on_release')
     def on_release(self, event):
         """
         Event for clicking of the mouse in the main axis (ax) window (
@@ -190,24 +362,100 @@ class Select_Rectange(object):
         if not self.in_main_axes:
             return
         # if toolbar is active don't continue
-        if self.ax.figure.canvas.manager.toolbar._active is not None:
+        if self.toolbar_active():
             return
         # highlight that we have ended the selection rectangle
         self.pressed = False
+        # close the lasso
+        if self.mode == 'lasso':
+            if event.xdata is not None:
+                self.lasso_verts.append((event.xdata, event.ydata))
+            self.update_count(exact=True)
+            self.draw_current_lasso()
+            return
         # set the end points of the selection rectangle (whilst moving)
         self.x1 = event.xdata
-        self.y1 = event.ydata
+        self.y1 = np.inf if self.mode == 'span' else event.ydata
+        # update the (exact) count of points selected
+        self.update_count(exact=True)
         # Redraw the rectangle selection
         self.draw_current_rec()
 
+    def on_key(self, event):
+        """
+        Event for a key press in the main axis (ctrl+z undoes the last
+        change to the regions, ctrl+y redoes it)
+
+        :param event: event passed to function
+        :return:
+        """
+        if not self.in_main_axes:
+            return
+        if event.key in UNDO_KEYS:
+            self.undo()
+        elif event.key in REDO_KEYS:
+            self.redo()
+
+    def toolbar_active(self):
+        """
+        Whether a toolbar mode (zoom, pan) is active, False if the canvas
+        has no toolbar (e.g. non-interactive backends)
+
+        :return: bool
+        """
+        manager = self.ax.figure.canvas.manager
+        toolbar = getattr(manager, 'toolbar', None)
+        if toolbar is None:
+            return False
+        # older matplotlib versions use _active, newer use mode
+        if hasattr(toolbar, '_active'):
+            return toolbar._active is not None
+        return bool(getattr(toolbar, 'mode', ''))
+
+    def key_operation(self, key):
+        """
+        The set operation selected by the modifier key held while drawing
+        (lassos are always added, and rectangles can only be added once a
+        lasso is selected)
+
+        :param key: string or None, the key held (event.key)
+        :return: string, 'add', 'subtract' (shift) or 'intersect' (control)
+        """
+        key = key or ''
+        if self.mode == 'lasso':
+            return 'add'
+        if 'shift' in key:
+            return 'subtract'
+        if 'control' in key or 'ctrl' in key:
+            return 'intersect'
+        return 'add'
+
+    def set_mode(self, mode):
+        """
+        Switches between dragging rectangles, drawing lassos and selecting
+        x spans (regions already selected are kept)
+
+        :param mode: string, 'rectangle', 'lasso' or 'span'
+        :return:
+        """
+        if mode not in MODES:
+            raise ValueError("'mode' must be one of: "
+                             "{0}".format(', '.join(MODES)))
+        self.mode = mode
+        self.pressed = False
+        self.lasso_verts = []
+
     def leave_axes(self, event):
         """
-        Event for leaving an axes
+        Event for leaving an axis, if this is main axis then flag it as left
 
         :param event: event passed to function
         :return:
         """
-        self.in_main_axes = False
+        # Only the main window (leaving other axes, e.g. the buttons or a
+        # linked subplot, does not leave it)
+        if event.inaxes is self.ax:
+            self.in_main_axes = False
 
     def enter_axes(self, event):
         """
@@ -216,8 +464,9 @@ class Select_Rectange(object):
         :param event: event passed to function
         :return:
         """
-        # Only want to be entering the main window
-        if event.inaxes.axis() == self.ax.axis():
+        # Only want to be entering the main window (the same axes object,
+        # other axes may have the same limits)
+        if event.inaxes is self.ax:
             self.in_main_axes = True
 
     def create_buttons(self, N=3, width=0.2):
@@ -238,10 +487,11 @@ class Select_Rectange(object):
             start = (b + 1) * b_sep + b * b_length
             r = [start, 0.05, b_length, 0.075]
             self.regions.append(r)
-        plt.subplots_adjust(bottom=0.25)
-        self.axselect = plt.axes(self.regions[0])
-        self.axclear = plt.axes(self.regions[1])
-        self.axfinish = plt.axes(self.regions[2])
+        fig = self.ax.figure
+        fig.subplots_adjust(bottom=0.25)
+        self.axselect = fig.add_axes(self.regions[0])
+        self.axclear = fig.add_axes(self.regions[1])
+        self.axfinish = fig.add_axes(self.regions[2])
         self.bselect = Button(self.axselect, self.sbuttontext)
         self.bselect.on_clicked(self.select)
         self.bclear = Button(self.axclear, self.cbuttontext)
@@ -249,6 +499,7 @@ class Select_Rectange(object):
         self.bfinish = Button(self.axfinish, self.fbuttontext)
         self.bfinish.on_clicked(self.end)
 
+    @timed('select')
     def select(self, event):
         """
         Event for clicking the select button - selects the currently draw
@@ -258,15 +509,35 @@ class Select_Rectange(object):
         :param event: event passed to function
         :return:
         """
+        if self.mode == 'lasso':
+            if len(self.lasso_verts) < 3:
+                return
+            if self.store.contains_polygon(self.lasso_verts):
+                return
+            args = Polygon_mask.bounding_box(self.lasso_verts)
+            print('Polygon x=({0:.2f}, {1:.2f})  y=({2:.2f}, '
+                  '{3:.2f})'.format(*args))
+            self.record_points()
+            self.draw_saved_polygon()
+            return
         if self.x0 is None:
             return
         args = [self.x0, self.x1, self.y0, self.y1]
-        if args in self.data:
+        if self.operation != 'add' and self.store.has_polygons():
+            print(POLYGON_OP_ERROR.format(self.operation))
             return
-        print('Coords x=({0:.2f}, {1:.2f})  y=({2:.2f}, {3:.2f})'.format(*args))
+        if self.store.contains(*args, op=self.operation):
+            return
+        if self.operation != 'add':
+            print('{0}:'.format(self.operation.capitalize()))
+        if self.mode == 'span':
+            print('Span x=({0:.2f}, {1:.2f})'.format(*args))
+        else:
+            print('Coords x=({0:.2f}, {1:.2f})  y=({2:.2f}, {3:.2f})'.format(*args))
         self.record_points()
         self.draw_saved_rec()
 
+    @timed('clear')
     def clear(self, event):
         """
         Event for clicking the clear button - clears all rectangle selectors
@@ -275,25 +546,30 @@ class Select_Rectange(object):
         :param event: event passed to function
         :return:
         """
-        # Clear data
-        self.data = []
-        self.tags = []
+        # Clear data (the regions are kept in the history for undo)
+        if len(self.store) > 0:
+            self.history.push('clear', -1, self.store.copy())
+        self._clear_store()
         # if self.x0 is None then we don't need to clear (already clear)
         if self.x0 is None:
             return
-        # Clear canvas
-        start = (self.x0, self.y0)
-        width, height = self.x1 - self.x0, self.y1 - self.y0
-        for it in range(len(self.save_rectangles)):
-            self.save_rectangles[it].set_width(1.e-9)
-            self.save_rectangles[it].set_height(1.e-9)
-            self.save_rectangles[it].set_xy(start)
-            self.ax.add_patch(self.save_rectangles[it])
-        self.rect.set_width(1.e-9)
-        self.rect.set_height(1.e-9)
-        self.rect.set_xy(start)
-        self.ax.figure.canvas.draw()
+        # Clear canvas (remove the saved rectangle geometry)
+        self.num_saved = 0
+        self.saved_collection.set_verts(self.saved_verts[:0])
+        self.saved_polys = []
+        self.saved_poly_collection.set_verts(self.saved_polys)
+        if self.rect is not None:
+            self.rect.set_width(1.e-9)
+            self.rect.set_height(1.e-9)
+            self.rect.set_xy((self.x0, self.finite_y(self.y0)))
+        self.lasso_verts = []
+        if self.lasso is not None:
+            self.lasso.set_visible(False)
+        self.count_text.set_text('')
+        self.update_stats_text()
+        self.blitter.update_layer()
 
+    @timed('end')
     def end(self, event):
         """
         Event for clicking the finish button - closes the graph
@@ -301,6 +577,7 @@ class Select_Rectange(object):
         :param event: event passed to function
         :return:
         """
+        import matplotlib.pyplot as plt
         plt.close()
 
     # -------------------------------------------------------------------------
@@ -312,51 +589,760 @@ class Select_Rectange(object):
         :param self:
         :return:
         """
-        start = (self.x0, self.y0)
-        width, height = self.x1 - self.x0, self.y1 - self.y0
+        # spans are drawn to the y limits
+        y0, y1 = self.finite_y([self.y0, self.y1])
+        start = (self.x0, y0)
+        width, height = self.x1 - self.x0, y1 - y0
 
         if self.rect is None:
             self.rect = Rectangle(start, width, height, **self.cprops)
             self.ax.add_patch(self.rect)
+            self.blitter.add_artist(self.rect)
         else:
             self.rect.set_width(width)
             self.rect.set_height(height)
             self.rect.set_xy(start)
-            self.ax.figure.canvas.draw()
+        # only redraw the selector rectangle
+        self.blitter.update()
 
     def draw_saved_rec(self):
         """
-        Draws the saved rectangle using the corners (x0, y0) and (x1, y1)
+        Draws the saved rectangles, i.e. the canonical disjoint boxes of the
+        selection (so subtracted and intersected areas are shown as such)
 
         :param self:
         :return:
         """
-        start = (self.x0, self.y0)
-        width, height = self.x1 - self.x0, self.y1 - self.y0
-        Rec = Rectangle(start, width, height, **self.srectprops)
-        self.save_rectangles.append(Rec)
-        self.ax.add_patch(Rec)
-        self.rect.set_width(1.e-9)
-        self.rect.set_height(1.e-9)
-        self.rect.set_xy(start)
-        self.ax.figure.canvas.draw()
+        start = (self.x0, self.finite_y(self.y0))
+        self.set_saved_rects()
+        if self.rect is not None:
+            self.rect.set_width(1.e-9)
+            self.rect.set_height(1.e-9)
+            self.rect.set_xy(start)
+        self.count_text.set_text('')
+        self.update_stats_text()
+        self.blitter.update_layer()
+
+    def set_saved_rects(self):
+        """
+        Sets the saved rectangle artists from the canonical boxes (infinite
+        y edges, i.e. spans, are drawn to the y limits)
+
+        :return:
+        """
+        boxes = self.store.canonical()
+        # grow the vertex array if needed
+        if len(boxes) > len(self.saved_verts):
+            size = max(2 * len(self.saved_verts), len(boxes))
+            self.saved_verts = np.zeros((size, 4, 2))
+        x0, x1 = boxes[:, 0], boxes[:, 1]
+        y0, y1 = self.finite_y(boxes[:, 2]), self.finite_y(boxes[:, 3])
+        self.saved_verts[:len(boxes), :, 0] = np.column_stack([x0, x1, x1, x0])
+        self.saved_verts[:len(boxes), :, 1] = np.column_stack([y0, y0, y1, y1])
+        self.num_saved = len(boxes)
+        self.saved_collection.set_verts(self.saved_verts[:self.num_saved])
+
+    def finite_y(self, y):
+        """
+        Replaces infinite y values (span edges) by the y limits
+
+        :param y: float or numpy array
+        :return: float or numpy array
+        """
+        y = np.asarray(y, dtype=float)
+        if np.all(np.isfinite(y)):
+            return y if y.ndim else float(y)
+        ymin, ymax = sorted(self.ax.get_ylim())
+        y = np.where(y == -np.inf, ymin, np.where(y == np.inf, ymax, y))
+        return y if y.ndim else float(y)
+
+    def on_ylim_changed(self, ax):
+        """
+        Redraws the spans to the new y limits
+
+        :param ax: the matplotlib axis changed
+        :return:
+        """
+        boxes = self.store.canonical()
+        if np.any(np.isinf(boxes[:, 2:4])):
+            self.set_saved_rects()
+
+    def draw_current_lasso(self):
+        """
+        Draws the lasso being drawn through self.lasso_verts
+
+        :return:
+        """
+        if len(self.lasso_verts) == 0:
+            return
+        if self.lasso is None:
+            self.lasso = Polygon(self.lasso_verts, closed=True, **self.cprops)
+            self.ax.add_patch(self.lasso)
+            self.blitter.add_artist(self.lasso)
+        else:
+            self.lasso.set_xy(self.lasso_verts)
+        self.lasso.set_visible(True)
+        # only redraw the lasso
+        self.blitter.update()
+
+    def draw_saved_polygon(self):
+        """
+        Draws the saved polygon using the vertices in self.lasso_verts
+
+        :return:
+        """
+        self.set_saved_polygons()
+        self.lasso_verts = []
+        if self.lasso is not None:
+            self.lasso.set_visible(False)
+        self.count_text.set_text('')
+        self.update_stats_text()
+        self.blitter.update_layer()
+
+    def set_saved_polygons(self):
+        """
+        Sets the saved polygon artists from the stored polygons
+
+        :return:
+        """
+        self.saved_polys = [self.store.polygon(row) for row in
+                            sorted(self.store.polygon_rows())]
+        self.saved_poly_collection.set_verts(self.saved_polys)
 
     def record_points(self):
         """
-        Records the data of the selected rectangle to self.data
+        Records the data of the selected rectangle (or lasso) to self.data
 
         :return:
         """
-        self.data.append([self.x0, self.x1, self.y0, self.y1])
+        if self.mode == 'lasso':
+            row = self.store.add_polygon(self.lasso_verts)
+        else:
+            row = self.store.add(self.x0, self.x1, self.y0, self.y1,
+                                 op=self.operation)
+        if row is not None:
+            self.update_live(row)
         # start the tag
-        if self.tag:
-            self.tag_rectangle()
+        if self.tag and row is not None:
+            self.tag_rectangle(row)
+        if row is not None:
+            self.history.push('add', row, self.store.records[row].copy())
+
+    def tag_rectangle(self, row):
+        w = Dialogs.ask(self.tag_title, self.tag_comment,
+                        provider=self.input_provider)
+        self.store.set_tag(row, w)
+
+    @property
+    def data(self):
+        """
+        The selected regions, a read-only list view of
+        [x start, x end, y start, y end] (normalised so start < end, the
+        bounding box for lassos, see self.store.polygon(row))
+
+        :return: Region_store.Region_View
+        """
+        return self.store.data
+
+    @property
+    def tags(self):
+        """
+        The tags of the selected regions, a read-only list view (same
+        length as self.data, None where a region has no tag)
+
+        :return: Region_store.Region_View
+        """
+        return self.store.tags
+
+    def save_regions(self, filename):
+        """
+        Saves the selected regions (corners, tags and the axis limits and
+        scales) to a .npz file (load with Region_io.load_regions or
+        Region_replay.Saved_Selection.load)
+
+        :param filename: string, the file to save to
+        :return:
+        """
+        Region_io.save_regions(filename, self.store,
+                               Region_io.axes_metadata(self.ax))
+
+    def save_mask(self, filename, x=None, y=None, encoding='bitset'):
+        """
+        Saves the mask of the selected points in a compact encoding
+        (load with Region_io.load_mask)
+
+        :param filename: string, the file to save to (.npy)
+        :param x: numpy array, the x data (default: the selector's data)
+        :param y: numpy array, the y data
+        :param encoding: string, 'bitset' or 'rle'
+        :return:
+        """
+        Region_io.save_mask(filename, self.mask(x, y), encoding=encoding)
 
-    def tag_rectangle(self):
-        root = tkinter.Tk()
-        root.withdraw()
-        w = tksimpledialog.askstring(self.tag_title, self.tag_comment)
-        self.tags.append(w)
+    # -------------------------------------------------------------------------
+    # Live mask functions
+    # -------------------------------------------------------------------------
+    @property
+    def live_mask(self):
+        """
+        The points of the plotted data currently selected, kept up to date
+        as regions are added and removed (read-only, None if no data was
+        given)
+
+        :return: numpy array of bools
+        """
+        if self.x is None:
+            return None
+        if self._live is None:
+            self._live = self.mask()
+            self.num_selected = int(np.count_nonzero(self._live))
+        live = self._live.view()
+        live.flags.writeable = False
+        return live
+
+    def update_live(self, row):
+        """
+        Updates the live mask for a newly stored region, only the points
+        inside it are tested (with the spatial index)
+
+        Follows the same semantics as mask: subtractions and intersections
+        act on every selected point, which is right as the store refuses
+        them once a polygon is stored (see Region_store.Region_Store.add)
+
+        :param row: int, the row of the region in self.store
+        :return:
+        """
+        if self.x is None or self._live is None:
+            return
+        found = self._query(row)
+        op = self.store.records['op'][row]
+        if op == 0:
+            # newly selected points
+            found = found[~self._live[found]]
+            self._live[found] = True
+            self.num_selected += len(found)
+            self.update_highlight(added=found)
+            return
+        if op == 1:
+            self._live[found] = False
+        else:
+            keep = found[self._live[found]]
+            self._live[:] = False
+            self._live[keep] = True
+        self.num_selected = int(np.count_nonzero(self._live))
+        self.update_highlight()
+
+    def recheck_live(self, found):
+        """
+        Re-tests points against the stored regions (e.g. the points of a
+        removed region)
+
+        :param found: numpy array of ints, the indices of the points
+        :return:
+        """
+        if self.x is None or self._live is None:
+            return
+        before = int(np.count_nonzero(self._live[found]))
+        now = Region_mask.region_mask(self.x[found], self.y[found], self.store)
+        self._live[found] = now
+        self.num_selected += int(np.count_nonzero(now)) - before
+        self.update_highlight()
+
+    def update_highlight(self, added=None):
+        """
+        Draws the selected points (if highlight is on)
+
+        :param added: numpy array of ints, points newly selected (appended
+                      to the points drawn), if None the points drawn are
+                      taken from the live mask
+        :return:
+        """
+        if not self.highlight or self._live is None:
+            return
+        if added is None or self._highlighted is None:
+            self._highlighted = np.flatnonzero(self._live)
+        else:
+            self._highlighted = np.concatenate([self._highlighted, added])
+        xs, ys = self.x[self._highlighted], self.y[self._highlighted]
+        if self.highlight_line is None:
+            from matplotlib.lines import Line2D
+            self.highlight_line = Line2D(xs, ys, **self.hprops)
+            self.ax.add_line(self.highlight_line)
+            self.blitter.add_artist(self.highlight_line, layer=True)
+        else:
+            self.highlight_line.set_data(xs, ys)
+
+    def region_at(self, x, y):
+        """
+        The last stored region containing a point
+
+        :param x: float, the x position
+        :param y: float, the y position
+        :return row: int, the row in self.store (or None)
+        """
+        if x is None or y is None or len(self.store) == 0:
+            return None
+        x0, x1, y0, y1 = self.store.corners.T
+        inside = (x > x0) & (x < x1) & (y > y0) & (y < y1)
+        for row in np.flatnonzero(inside)[::-1]:
+            verts = self.store.polygon(row)
+            if verts is None:
+                return int(row)
+            if Polygon_mask.points_in_polygon([x], [y], verts)[0]:
+                return int(row)
+        return None
+
+    @timed('remove_region')
+    def remove_region(self, row):
+        """
+        Removes a stored region, only the points inside it are re-tested
+        for the live mask (all points for a removed intersection)
+
+        :param row: int, the row of the region in self.store
+        :return:
+        """
+        record = self._remove(row)
+        self.history.push('remove', row, record)
+        self.set_saved_polygons()
+        self.draw_saved_rec()
+
+    # -------------------------------------------------------------------------
+    # Undo and redo functions
+    # -------------------------------------------------------------------------
+    @timed('undo')
+    def undo(self, event=None):
+        """
+        Undoes the last change to the regions (add, remove or clear), the
+        live mask is updated for the points of the region changed only
+
+        :param event: event passed to function (not used)
+        :return:
+        """
+        command = self.history.undo()
+        if command is None:
+            return
+        kind, row, record = command
+        if kind == 'add':
+            self._remove(row)
+        elif kind == 'remove':
+            self._insert(row, record)
+        else:
+            self._restore(record)
+            record = None
+        self.redraw_regions(record)
+
+    @timed('redo')
+    def redo(self, event=None):
+        """
+        Redoes the last change undone
+
+        :param event: event passed to function (not used)
+        :return:
+        """
+        command = self.history.redo()
+        if command is None:
+            return
+        kind, row, record = command
+        if kind == 'add':
+            self._insert(row, record)
+        elif kind == 'remove':
+            self._remove(row)
+        else:
+            self._clear_store()
+            record = None
+        self.redraw_regions(record)
+
+    def redraw_regions(self, record=None):
+        """
+        Updates the saved region artist a change affected and redraws it
+        (the cached layer of saved regions is redrawn over the background
+        and blitted, no full canvas draw)
+
+        :param record: numpy structured scalar, the region added or removed
+                       (only its artist is updated), None to update both
+                       (e.g. after a clear)
+        :return:
+        """
+        if record is None or record['poly'] < 0:
+            self.set_saved_rects()
+        if record is None or record['poly'] >= 0:
+            self.set_saved_polygons()
+        self.count_text.set_text('')
+        self.update_stats_text()
+        self.blitter.update_layer()
+
+    def _remove(self, row):
+        """
+        Removes a region from the store and updates the live mask (not
+        logged)
+
+        :return record: the removed row
+        """
+        found = None
+        if self.x is not None and self._live is not None:
+            found = self._query(row)
+        record = self.store.remove(row)
+        if found is not None and record['op'] == 2:
+            self._recompute_live()
+        elif found is not None:
+            self.recheck_live(found)
+        return record
+
+    def _insert(self, row, record):
+        """
+        Puts a region back in the store and updates the live mask (not
+        logged)
+
+        :return:
+        """
+        if self.store.insert(row, record) is None:
+            return
+        if self.x is None or self._live is None:
+            return
+        if record['op'] == 2:
+            self._recompute_live()
+        else:
+            self.recheck_live(self._query(row))
+
+    def _restore(self, store):
+        """
+        Puts back the regions of a cleared store (not logged)
+
+        :return:
+        """
+        self.store.restore(store)
+        if self._live is not None:
+            self._recompute_live()
+
+    def _clear_store(self):
+        """
+        Removes all regions from the store and the live mask (not logged)
+
+        :return:
+        """
+        self.store.clear()
+        if self._live is not None:
+            self._live[:] = False
+            self.num_selected = 0
+            self.update_highlight()
+
+    def _recompute_live(self):
+        self._live = self.mask()
+        self.num_selected = int(np.count_nonzero(self._live))
+        self.update_highlight()
+
+    # -------------------------------------------------------------------------
+    # Data and index functions
+    # -------------------------------------------------------------------------
+    def set_data(self, x, y):
+        """
+        Sets the data plotted (used when mask/indices/labels are called
+        without data) and builds the spatial index (and, with live_count,
+        the summed-area table) now, so the first drag does not pay for them
+
+        :param x: numpy array, the x data plotted (or None)
+        :param y: numpy array, the y data plotted (or None)
+        :return:
+        """
+        if (x is None) != (y is None):
+            raise ValueError("Must define both 'x' and 'y' (or neither)")
+        if x is not None:
+            x, y = np.asarray(x).ravel(), np.asarray(y).ravel()
+            if x.shape != y.shape:
+                raise ValueError("'x' and 'y' must be the same length")
+        self.x, self.y = x, y
+        self._index = None
+        self._sat = None
+        if x is not None:
+            self._index = Spatial_index.Grid_Index(x, y)
+        if x is not None and self.live_count:
+            self._sat = Spatial_index.Summed_Area_Table(x, y, self.count_bins)
+        self._live = None
+        self._highlighted = None
+        # whether x is sorted (checked when first needed, see slices)
+        self._x_sorted = None
+        # cached region statistics {(id(values), percentiles):
+        # (values, value range, {region key: statistics})}
+        self._stats = dict()
+        if self.highlight and self.live_mask is not None:
+            # draw the points already selected
+            self.update_highlight()
+
+    @property
+    def index(self):
+        """
+        The spatial index of the plotted data (built by set_data)
+
+        :return index: Spatial_index.Grid_Index instance (or None if no
+                       data was given)
+        """
+        if self._index is None and self.x is not None:
+            self._index = Spatial_index.Grid_Index(self.x, self.y)
+        return self._index
+
+    @property
+    def sat(self):
+        """
+        The summed-area table of the plotted data (built by set_data, or
+        on first use if live_count is off)
+
+        :return sat: Spatial_index.Summed_Area_Table instance (or None if
+                     no data was given)
+        """
+        if self._sat is None and self.x is not None:
+            self._sat = Spatial_index.Summed_Area_Table(self.x, self.y,
+                                                        self.count_bins)
+        return self._sat
+
+    def update_count(self, exact=False):
+        """
+        Updates the live count of the points inside the selector rectangle
+        (or the lasso, counted on release only)
+
+        :param exact: bool, if True count using the spatial index, otherwise
+                      use the (O(1), approximate) summed-area table
+        :return:
+        """
+        if not self.live_count or self.x is None:
+            return
+        if self.mode == 'lasso':
+            if len(self.lasso_verts) >= 3:
+                count = len(self.index.query_polygon(self.lasso_verts))
+                self.count_text.set_text('N = {0}'.format(count))
+            return
+        if None in (self.x0, self.x1, self.y0, self.y1):
+            return
+        args = (self.x0, self.x1, self.y0, self.y1)
+        if exact:
+            self.count_text.set_text('N = {0}'.format(self.index.count(*args)))
+        else:
+            self.count_text.set_text('N ~ {0}'.format(self.sat.count(*args)))
+
+    def _use_index(self, x, y):
+        if x is None and y is None:
+            if self.x is None:
+                raise ValueError("No data given and no data set (use "
+                                 "set_data or x/y in the constructor)")
+            return True
+        return x is self.x and y is self.y
+
+    def _query(self, row):
+        """
+        The indices of the plotted points inside a stored region (using the
+        spatial index)
+
+        :param row: int, the row of the region in self.store
+        :return: numpy array of ints
+        """
+        verts = self.store.polygon(row)
+        if verts is None:
+            return self.index.query(*self.store.corners[row])
+        return self.index.query_polygon(verts)
+
+    # -------------------------------------------------------------------------
+    # Mask functions
+    # -------------------------------------------------------------------------
+    def mask(self, x=None, y=None):
+        """
+        Creates a mask of the points (x, y) inside the selection (the
+        regions with their set operations applied)
+
+        :param x: numpy array, the x data used in the plot (default is the
+                  data given to the selector)
+        :param y: numpy array, the y data used in the plot
+        :return mask: numpy array of bools, True if selected
+        """
+        if not self._use_index(x, y):
+            return Region_mask.region_mask(x, y, self.store)
+        mask = np.zeros(len(self.x), dtype=bool)
+        for found in self._query_units():
+            mask[found] = True
+        return mask
+
+    def indices(self, x=None, y=None):
+        """
+        Finds the indices of the points (x, y) inside the selection
+
+        :param x: numpy array, the x data used in the plot (default is the
+                  data given to the selector)
+        :param y: numpy array, the y data used in the plot
+        :return indices: numpy array of ints (sorted)
+        """
+        if not self._use_index(x, y):
+            return Region_mask.region_indices(x, y, self.store)
+        found = list(self._query_units())
+        if len(found) == 0:
+            return np.zeros(0, dtype=int)
+        return np.unique(np.concatenate(found))
+
+    def labels(self, x=None, y=None):
+        """
+        Finds which selected region each point (x, y) falls in
+
+        :param x: numpy array, the x data used in the plot (default is the
+                  data given to the selector)
+        :param y: numpy array, the y data used in the plot
+        :return labels: numpy array of ints, position in self.data of the
+                        first added rectangle each selected point falls in
+                        (-1 if not selected)
+        """
+        if not self._use_index(x, y):
+            return Region_mask.region_labels(x, y, self.store)
+        labels = np.full(len(self.x), -1, dtype=np.int64)
+        added = np.flatnonzero(self.store.records['op'] == 0)
+        # reverse order so the first rectangle wins
+        for r in added[::-1]:
+            labels[self._query(r)] = r
+        # points removed by subtractions/intersections
+        labels[~self.mask()] = -1
+        return labels
+
+    def canonical_regions(self):
+        """
+        The selected rectangles (set operations applied) as canonical
+        disjoint boxes (lasso regions are not included)
+
+        :return: numpy array, shape (K, 4), [x start, x end, y start, y end]
+        """
+        return self.store.canonical()
+
+    def slices(self, x=None):
+        """
+        Finds the points inside a selection made of x spans (span mode) as
+        contiguous slices, with two binary searches per span (no mask)
+
+        :param x: numpy array, the x data used in the plot, sorted in
+                  increasing order (default is the data given to the
+                  selector, checked once)
+        :return slices: list of slice objects, x[s] are the points of each
+                        disjoint span
+        """
+        if x is None:
+            if self.x is None:
+                raise ValueError("No data given and no data set (use "
+                                 "set_data or x/y in the constructor)")
+            if self._x_sorted is None:
+                self._x_sorted = bool(np.all(self.x[1:] >= self.x[:-1]))
+            if not self._x_sorted:
+                raise ValueError("'x' must be sorted to use slices")
+            x = self.x
+        return Region_mask.span_slices(x, self.store)
+
+    def views(self, array, x=None):
+        """
+        The selected part of a column of sorted data, as views (no copy)
+
+        :param array: numpy array, the same length as x (e.g. the flux of a
+                      light curve)
+        :param x: numpy array, the x data used in the plot, sorted (default
+                  is the data given to the selector)
+        :return: list of numpy arrays, one view per disjoint span
+        """
+        return [array[s] for s in self.slices(x)]
+
+    def populations(self, x=None, y=None):
+        """
+        Counts the selected points in each disjoint unit of the selection
+        (the canonical boxes, then the lassos), each point counted once
+
+        :param x: numpy array, the x data used in the plot (default is the
+                  data given to the selector)
+        :param y: numpy array, the y data used in the plot
+        :return counts: numpy array of ints (sums to the number of points
+                        selected)
+        """
+        if not self._use_index(x, y):
+            return Region_mask.region_populations(x, y, self.store)
+        taken = np.zeros(len(self.x), dtype=bool)
+        counts = []
+        for found in self._query_units():
+            found = found[~taken[found]]
+            taken[found] = True
+            counts.append(len(found))
+        return np.array(counts, dtype=np.int64)
+
+    def _query_units(self):
+        """
+        The indices of the plotted points inside each unit of the selection
+        (see Region_store.Region_Store.units), using the spatial index
+
+        :return: generator of numpy arrays of ints
+        """
+        corners, polygons = self.store.units()
+        for unit, rec in enumerate(corners):
+            if unit in polygons:
+                yield self.index.query_polygon(polygons[unit])
+            else:
+                yield self.index.query(*rec)
+
+    # -------------------------------------------------------------------------
+    # Statistics functions
+    # -------------------------------------------------------------------------
+    def statistics(self, values=None, percentiles=Region_stats.PERCENTILES):
+        """
+        Summary statistics (count, mean, min, max, median and percentiles)
+        of the plotted points inside each stored region, as drawn (regions
+        may overlap, set operations are not applied)
+
+        Statistics are cached per region (and values array): only regions
+        not seen before are computed, all in one grouped pass (see
+        Region_stats.group_statistics). The cache is dropped by set_data,
+        call it if the data change in place.
+
+        :param values: numpy array, the value of each plotted point
+                       (default: the y data)
+        :param percentiles: list of floats, percentiles given besides the
+                            median (approximate for regions of more than
+                            Region_stats.EXACT_MAX points)
+        :return stats: numpy structured array, one row per region (row of
+                       self.data), see Region_stats.stats_dtype
+        """
+        if self.x is None:
+            raise ValueError("No data set (use set_data or x/y in the "
+                             "constructor)")
+        if values is None:
+            values = self.y
+        ckey = (id(values), tuple(percentiles))
+        entry = self._stats.get(ckey)
+        if entry is None or entry[0] is not values:
+            array = np.asarray(values, dtype=float).ravel()
+            if len(array) != len(self.x):
+                raise ValueError("'values' must be the same length as the "
+                                 "data")
+            entry = (values, Region_stats.value_range(array), dict())
+            self._stats[ckey] = entry
+        values, vrange, cache = entry
+        keys = [self.store.row_key(row) for row in range(len(self.store))]
+        missing = [row for row, key in enumerate(keys) if key not in cache]
+        if len(missing) > 0:
+            members = [self._query(row) for row in missing]
+            new = Region_stats.group_statistics(values, members,
+                                                percentiles, vrange=vrange)
+            for row, stats in zip(missing, new):
+                cache[keys[row]] = stats
+        # forget removed regions
+        for key in set(cache) - set(keys):
+            del cache[key]
+        stats = np.zeros(len(keys), dtype=Region_stats.stats_dtype(
+            percentiles))
+        for row, key in enumerate(keys):
+            stats[row] = cache[key]
+        return stats
+
+    def update_stats_text(self):
+        """
+        Lists the statistics of the last regions in the figure (if
+        live_stats is on)
+
+        :return:
+        """
+        if not self.live_stats or self.x is None:
+            return
+        stats = self.statistics(self.stats_values)
+        lines = ['{0}: N={1} mean={2:.3g} median={3:.3g}'.format(
+                 row, rec['count'], rec['mean'], rec['median'])
+                 for row, rec in enumerate(stats)]
+        self.stats_text.set_text('\n'.join(lines[-MAX_STATS_LINES:]))
 
 
 # =============================================================================
@@ -364,13 +1350,13 @@ class Select_Rectange(object):
 # =============================================================================
 # Main code to test the rectangle selector
 if __name__ == '__main__':
-    import numpy as np
+    import matplotlib.pyplot as plt
     plt.close()
     fig, frame = plt.subplots(ncols=1, nrows=1)
     x = np.random.rand(100)
     y = np.random.rand(100)
     plt.scatter(x, y, color='k', marker='o', s=20)
-    a = Select_Rectange(frame)
+    a = Select_Rectange(frame, x=x, y=y)
     plt.show()
     plt.close()
     # ----------------------------------------------------------------------
@@ -380,10 +1366,10 @@ if __name__ == '__main__':
         # Print the data
         print ('Selected region {0} was:'.format(r))
         print('Coords x=({0:.2f}, {1:.2f})  y=({2:.2f}, {3:.2f})'.format(*rec))
-        
-        # select the data and plot it in red
-        mask = (x > rec[0]) & (x < rec[1]) & (y > rec[2]) & (y < rec[3])
-        plt.scatter(x[mask], y[mask], color='r', marker='o', s=20, label='Selected')
+
+    # select the data (all regions at once) and plot it in red
+    mask = a.mask()
+    plt.scatter(x[mask], y[mask], color='r', marker='o', s=20, label='Selected')
 
     plt.legend(loc=0)
     plt.show()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Set algebra (union, intersection, subtraction) of rectangle regions
+(x start, x end, y start, y end)
+
+Results are given as disjoint boxes (each point is inside at most one box,
+so masks never test a point twice and counts per box never double count).
+Rectangles are applied one at a time to the boxes so far, and only the
+boxes a rectangle overlaps are touched: subtracting a rectangle splits
+each box it overlaps into at most four pieces around it, intersecting
+clips the boxes to it and adding a rectangle subtracts it from the boxes
+then appends it whole (so adding disjoint rectangles gives them back
+unchanged). Nothing is rasterised, memory is O(boxes).
+
+As in Region_mask boxes are open (strict inequalities), but the edges the
+decomposition creates are not: a piece left when a rectangle is cut keeps
+the points on the cut (they are not inside the open rectangle), which is
+done by moving the cut edge one floating point step past it
+(numpy.nextafter). So a point strictly inside any added rectangle is
+always selected, exactly as when the rectangles are tested one by one.
+
+Version 0.0.1
+"""
+
+import numpy as np
+
+# =============================================================================
+# Define variables
+# =============================================================================
+# operations (the op of each row of a Region_store.Region_Store)
+OPERATIONS = ['add', 'subtract', 'intersect']
+
+
+# =============================================================================
+# Define functions
+# =============================================================================
+def _normalise(boxes):
+    boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+    xs = np.sort(boxes[:, 0:2], axis=1)
+    ys = np.sort(boxes[:, 2:4], axis=1)
+    return np.column_stack([xs, ys])
+
+
+def _ops(ops, nboxes):
+    ops = np.array([OPERATIONS.index(op) if isinstance(op, str) else op
+                    for op in ops], dtype=int).ravel()
+    if len(ops) != nboxes:
+        raise ValueError("'ops' must be the same length as 'boxes'")
+    return ops
+
+
+def apply(boxes, ops, start=None):
+    """
+    Combines rectangles in order, starting from the empty set (or start),
+    each one added to, subtracted from or intersected with the result so
+    far
+
+    :param boxes: list or array of [x start, x end, y start, y end]
+    :param ops: list of strings (see OPERATIONS) or array of ints (index in
+                OPERATIONS), the operation of each box
+    :param start: numpy array, shape (K, 4), disjoint boxes to start from
+                  (e.g. a previous result), default: none
+    :return boxes: numpy array, shape (K, 4), disjoint boxes
+    """
+    boxes = _normalise(boxes)
+    ops = _ops(ops, len(boxes))
+    result = np.zeros((0, 4)) if start is None else _normalise(start)
+    empty = ~_non_empty(boxes)
+    # intersecting with an empty box empties the result, start after the
+    # last one
+    last = np.flatnonzero(empty & (ops == 2))
+    if len(last) > 0:
+        result = np.zeros((0, 4))
+        boxes, ops, empty = (boxes[last[-1] + 1:], ops[last[-1] + 1:],
+                             empty[last[-1] + 1:])
+    # empty boxes add and subtract nothing
+    for box, op in zip(boxes[~empty], ops[~empty]):
+        if op == 0:
+            result = np.concatenate([_subtract_box(result, box), [box]])
+        elif op == 1:
+            result = _subtract_box(result, box)
+        else:
+            result = _intersect_box(result, box)
+    return result
+
+
+def apply_window(boxes, ops, result, window):
+    """
+    Updates the result of apply(boxes, ops) after rows that only affect
+    the points inside a window changed (rectangles added or subtracted
+    anywhere in the order, or removed): the result is only recomputed
+    inside the window
+
+    :param boxes: list or array of [x start, x end, y start, y end], all
+                  the rectangles (after the change)
+    :param ops: list of strings or array of ints, the operation of each box
+    :param result: numpy array, shape (K, 4), the disjoint boxes before the
+                   change
+    :param window: list or array [x start, x end, y start, y end], the
+                   rectangle changed
+    :return boxes: numpy array, shape (K, 4), disjoint boxes
+    """
+    window = _normalise(window)[0]
+    boxes = _normalise(boxes)
+    ops = _ops(ops, len(boxes))
+    # every rectangle clipped to the window (empty if outside it, zeroed so
+    # apply does not sort the crossed edges back into a box)
+    clipped = _clip(boxes, window)
+    clipped[~_non_empty(clipped)] = 0.0
+    inside = apply(clipped, ops)
+    return np.concatenate([_subtract_box(_normalise(result), window),
+                           inside])
+
+
+def decompose(boxes):
+    """
+    Disjoint boxes covering the union of rectangles
+
+    :param boxes: list or array of [x start, x end, y start, y end]
+    :return boxes: numpy array, shape (K, 4)
+    """
+    boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+    return apply(boxes, np.zeros(len(boxes), dtype=int))
+
+
+def union(a, b):
+    """
+    The points in a or b
+
+    :param a: list or array of [x start, x end, y start, y end]
+    :param b: list or array of [x start, x end, y start, y end]
+    :return boxes: numpy array, shape (K, 4), disjoint boxes
+    """
+    b = np.reshape(b, (-1, 4))
+    return apply(b, np.zeros(len(b), dtype=int), start=decompose(a))
+
+
+def intersect(a, b):
+    """
+    The points in both a and b
+
+    :param a: list or array of [x start, x end, y start, y end]
+    :param b: list or array of [x start, x end, y start, y end]
+    :return boxes: numpy array, shape (K, 4), disjoint boxes
+    """
+    a = decompose(a)
+    pieces = [_intersect_box(a, box) for box in decompose(b)]
+    if len(pieces) == 0:
+        return np.zeros((0, 4))
+    return np.concatenate(pieces)
+
+
+def subtract(a, b):
+    """
+    The points in a but not in b
+
+    :param a: list or array of [x start, x end, y start, y end]
+    :param b: list or array of [x start, x end, y start, y end]
+    :return boxes: numpy array, shape (K, 4), disjoint boxes
+    """
+    b = np.reshape(b, (-1, 4))
+    return apply(b, np.ones(len(b), dtype=int), start=decompose(a))
+
+
+def _non_empty(boxes):
+    """
+    Which boxes hold any point (open intervals holding a float)
+
+    :return: numpy array of bools
+    """
+    # the step past the largest float is inf (span edges), not an error
+    with np.errstate(over='ignore'):
+        return ((np.nextafter(boxes[:, 0], np.inf) < boxes[:, 1]) &
+                (np.nextafter(boxes[:, 2], np.inf) < boxes[:, 3]))
+
+
+def _clip(boxes, box):
+    """
+    The boxes clipped to a box (empty where they do not overlap it)
+
+    :return: numpy array, shape (K, 4)
+    """
+    return np.column_stack([np.maximum(boxes[:, 0], box[0]),
+                            np.minimum(boxes[:, 1], box[1]),
+                            np.maximum(boxes[:, 2], box[2]),
+                            np.minimum(boxes[:, 3], box[3])])
+
+
+def _overlaps(boxes, box):
+    """
+    Which boxes share points with a box
+
+    :return: numpy array of bools
+    """
+    return _non_empty(_clip(boxes, box))
+
+
+def _subtract_box(boxes, box):
+    """
+    The points of disjoint boxes outside an (open) box, each box it
+    overlaps split into the pieces left, right, below and above it (the
+    pieces keep the points on its edges)
+
+    :param boxes: numpy array, shape (K, 4), disjoint normalised boxes
+    :param box: numpy array, shape (4,), a normalised box
+    :return boxes: numpy array, shape (K', 4), disjoint boxes
+    """
+    hit = _overlaps(boxes, box)
+    if not hit.any():
+        return boxes
+    cut = boxes[hit]
+    x0, x1, y0, y1 = cut.T
+    # the cut edges, one step past the box edges (closed)
+    bx0, bx1 = np.nextafter(box[0], np.inf), np.nextafter(box[1], -np.inf)
+    by0, by1 = np.nextafter(box[2], np.inf), np.nextafter(box[3], -np.inf)
+    # x range of the middle column (inside the box)
+    mx0, mx1 = np.maximum(x0, box[0]), np.minimum(x1, box[1])
+    left = np.column_stack([x0, np.minimum(x1, bx0), y0, y1])
+    right = np.column_stack([np.maximum(x0, bx1), x1, y0, y1])
+    below = np.column_stack([mx0, mx1, y0, np.minimum(y1, by0)])
+    above = np.column_stack([mx0, mx1, np.maximum(y0, by1), y1])
+    pieces = np.concatenate([left, right, below, above])
+    return np.concatenate([boxes[~hit], pieces[_non_empty(pieces)]])
+
+
+def _intersect_box(boxes, box):
+    """
+    The points of disjoint boxes inside an (open) box, the boxes clipped
+    to it
+
+    :param boxes: numpy array, shape (K, 4), disjoint normalised boxes
+    :param box: numpy array, shape (4,), a normalised box
+    :return boxes: numpy array, shape (K', 4), disjoint boxes
+    """
+    clipped = _clip(boxes, box)
+    return clipped[_non_empty(clipped)]
+
+
+# =============================================================================
+# End of code
+# =============================================================================
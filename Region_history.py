@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Undo/redo history of the changes made to a Region_store.Region_Store
+
+Each change is logged as a small command, (kind, row, record): the row
+changed and the one region record added or removed (a structured scalar
+of Region_store.REGION_DTYPE), so the log grows by one record per change
+and never holds copies of the whole selection. Only clearing keeps the
+regions cleared (a copy of the store's records), as nothing else could
+bring them back.
+
+Commands are appended at the current position; undoing moves the position
+back (the commands stay in the log for redo) and a new change after an
+undo drops the commands that could have been redone.
+
+Version 0.0.1
+"""
+
+# =============================================================================
+# Define variables
+# =============================================================================
+# kinds of command
+COMMANDS = ['add', 'remove', 'clear']
+
+
+# =============================================================================
+# Define Class. Methods and Functions
+# =============================================================================
+class Command_Log(object):
+    def __init__(self, max_size=None):
+        """
+        Log of the changes made to a region store
+
+        :param max_size: int or None, maximum number of commands kept (the
+                         oldest are dropped), default: no limit
+        """
+        self.max_size = max_size
+        # [(kind, row, record)]
+        self.commands = []
+        # number of commands applied (commands[position:] can be redone)
+        self.position = 0
+
+    def __len__(self):
+        return len(self.commands)
+
+    def push(self, kind, row, record):
+        """
+        Logs a change
+
+        :param kind: string, 'add', 'remove' or 'clear'
+        :param row: int, the row added or removed (-1 for clear)
+        :param record: numpy structured scalar, the region added or removed
+                       (for clear, the Region_store.Region_Store cleared)
+        :return:
+        """
+        if kind not in COMMANDS:
+            raise ValueError("'kind' must be one of: "
+                             "{0}".format(', '.join(COMMANDS)))
+        del self.commands[self.position:]
+        self.commands.append((kind, row, record))
+        if self.max_size is not None and len(self.commands) > self.max_size:
+            del self.commands[:len(self.commands) - self.max_size]
+        self.position = len(self.commands)
+
+    def can_undo(self):
+        return self.position > 0
+
+    def can_redo(self):
+        return self.position < len(self.commands)
+
+    def undo(self):
+        """
+        Steps back over the last command applied
+
+        :return: tuple (kind, row, record) of the command to revert, or
+                 None if there is nothing to undo
+        """
+        if not self.can_undo():
+            return None
+        self.position -= 1
+        return self.commands[self.position]
+
+    def redo(self):
+        """
+        Steps forward over the next command undone
+
+        :return: tuple (kind, row, record) of the command to apply again, or
+                 None if there is nothing to redo
+        """
+        if not self.can_redo():
+            return None
+        self.position += 1
+        return self.commands[self.position - 1]
+
+    def reset(self):
+        """
+        Forgets all commands
+
+        :return:
+        """
+        self.commands = []
+        self.position = 0
+
+
+# =============================================================================
+# End of code
+# =============================================================================
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Saving and loading region sets and selection masks
+
+Region sets are saved as .npz files holding the structured region array
+(corners, tag index, timestamp, polygon index, set operation), the tag
+names, the polygon vertices (concatenated, with the offset of each polygon)
+and the axes the regions were drawn on (limits and scales).
+
+Selection masks are saved as .npy files in one of two compact encodings,
+both loadable with memory mapping (np.load(mmap_mode='r')):
+
+    - 'bitset'  uint8 array: 8 byte (little-endian uint64) length, then the
+                mask packed 8 points per byte (little bit order), i.e.
+                ~n/8 bytes for n points
+    - 'rle'     int64 array, shape (runs + 1, 2): first row (length, -1),
+                then the (start, stop) of each run of selected points, best
+                for masks made of a few contiguous runs
+
+Version 0.0.1
+"""
+
+import numpy as np
+
+from .Region_store import Region_Store
+
+# =============================================================================
+# Define variables
+# =============================================================================
+# supported mask encodings
+ENCODINGS = ['bitset', 'rle']
+# bytes used to store the mask length in front of a bitset
+HEADER_BYTES = 8
+# number of bits set in each byte value
+POPCOUNT = np.array([bin(it).count('1') for it in range(256)], dtype=np.uint8)
+
+
+# =============================================================================
+# Define Class. Methods and Functions
+# =============================================================================
+# -----------------------------------------------------------------------------
+# Region sets
+# -----------------------------------------------------------------------------
+def axes_metadata(ax):
+    """
+    The limits and scales of a matplotlib axis
+
+    :param ax: matplotlib axis
+    :return meta: dict, xlim, ylim, xscale, yscale
+    """
+    return dict(xlim=tuple(ax.get_xlim()), ylim=tuple(ax.get_ylim()),
+                xscale=ax.get_xscale(), yscale=ax.get_yscale())
+
+
+def save_regions(filename, store, meta=None):
+    """
+    Saves a region set to a .npz file
+
+    :param filename: string, the file to save to
+    :param store: Region_store.Region_Store, the regions
+    :param meta: dict or None, axes metadata (see axes_metadata), keys xlim,
+                 ylim, xscale, yscale (all optional)
+    :return:
+    """
+    if meta is None:
+        meta = dict()
+    arrays = dict(records=np.array(store.records),
+                  tag_names=np.array(store.tag_names, dtype=str))
+    # polygon vertices, polygon i is poly_verts[offsets[i]:offsets[i + 1]]
+    sizes = [len(verts) for verts in store.polygons]
+    arrays['poly_offsets'] = np.concatenate([[0], np.cumsum(sizes)])
+    arrays['poly_verts'] = np.zeros((0, 2))
+    if len(sizes) > 0:
+        arrays['poly_verts'] = np.concatenate(store.polygons)
+    for key in ['xlim', 'ylim']:
+        if meta.get(key, None) is not None:
+            arrays[key] = np.array(meta[key], dtype=float)
+    for key in ['xscale', 'yscale']:
+        if meta.get(key, None) is not None:
+            arrays[key] = np.array(meta[key], dtype=str)
+    np.savez(filename, **arrays)
+
+
+def load_regions(filename):
+    """
+    Loads a region set saved with save_regions
+
+    :param filename: string, the file to load
+    :return store, meta: Region_store.Region_Store and dict of the axes
+                         metadata saved with the regions
+    """
+    with np.load(filename, allow_pickle=False) as data:
+        tag_names = [str(it) for it in data['tag_names']]
+        polygons = []
+        if 'poly_offsets' in data:
+            offsets, verts = data['poly_offsets'], data['poly_verts']
+            polygons = [verts[offsets[it]:offsets[it + 1]]
+                        for it in range(len(offsets) - 1)]
+        store = Region_Store.from_records(data['records'], tag_names,
+                                          polygons)
+        meta = dict()
+        for key in ['xlim', 'ylim']:
+            if key in data:
+                meta[key] = tuple(data[key].tolist())
+        for key in ['xscale', 'yscale']:
+            if key in data:
+                meta[key] = str(data[key])
+    return store, meta
+
+
+# -----------------------------------------------------------------------------
+# Masks
+# -----------------------------------------------------------------------------
+class Packed_Mask(object):
+    def __init__(self, array):
+        """
+        A boolean mask stored 8 points per byte (bitset encoding)
+
+        :param array: numpy uint8 array (or memmap), HEADER_BYTES of length
+                      then the packed bits
+        """
+        self.array = array
+        self.length = int(np.asarray(array[:HEADER_BYTES]).view('<u8')[0])
+        self.bits = array[HEADER_BYTES:]
+
+    @classmethod
+    def from_bool(cls, mask):
+        """
+        Packs a boolean mask
+
+        :param mask: numpy array of bools
+        :return: Packed_Mask instance
+        """
+        mask = np.asarray(mask, dtype=bool).ravel()
+        header = np.array([len(mask)], dtype='<u8').view(np.uint8)
+        bits = np.packbits(mask, bitorder='little')
+        return cls(np.concatenate([header, bits]))
+
+    def __len__(self):
+        return self.length
+
+    def to_bool(self, start=0, stop=None):
+        """
+        Unpacks (part of) the mask
+
+        :param start: int, first point
+        :param stop: int, last point (exclusive), default the end
+        :return: numpy array of bools
+        """
+        start, stop, _ = slice(start, stop).indices(self.length)
+        if stop <= start:
+            return np.zeros(0, dtype=bool)
+        bits = np.asarray(self.bits[start // 8:(stop + 7) // 8])
+        mask = np.unpackbits(bits, bitorder='little').astype(bool)
+        return mask[start % 8:start % 8 + stop - start]
+
+    def count(self):
+        """
+        Number of points selected
+
+        :return: int
+        """
+        # bits beyond the length are always zero
+        return int(POPCOUNT[np.asarray(self.bits)].sum(dtype=np.int64))
+
+    def indices(self, chunk_size=2 ** 23):
+        """
+        Indices of the points selected (unpacked chunk by chunk)
+
+        :param chunk_size: int, points unpacked at once (multiple of 8)
+        :return: numpy array of ints
+        """
+        chunk_size = max(8 * (int(chunk_size) // 8), 8)
+        found = []
+        for start in range(0, self.length, chunk_size):
+            mask = self.to_bool(start, start + chunk_size)
+            found.append(start + np.flatnonzero(mask))
+        if len(found) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate(found)
+
+
+class RLE_Mask(object):
+    def __init__(self, array):
+        """
+        A boolean mask stored as runs of selected points (rle encoding)
+
+        :param array: numpy int64 array (or memmap), shape (runs + 1, 2),
+                      first row (length, -1), then (start, stop) of each run
+        """
+        self.array = array
+        self.length = int(array[0, 0])
+        self.runs = array[1:]
+
+    @classmethod
+    def from_bool(cls, mask):
+        """
+        Run-length encodes a boolean mask
+
+        :param mask: numpy array of bools
+        :return: RLE_Mask instance
+        """
+        mask = np.asarray(mask, dtype=bool).ravel()
+        edges = np.diff(mask.astype(np.int8), prepend=0, append=0)
+        starts = np.flatnonzero(edges == 1)
+        stops = np.flatnonzero(edges == -1)
+        array = np.empty((len(starts) + 1, 2), dtype=np.int64)
+        array[0] = len(mask), -1
+        array[1:, 0] = starts
+        array[1:, 1] = stops
+        return cls(array)
+
+    def __len__(self):
+        return self.length
+
+    def to_bool(self, start=0, stop=None):
+        """
+        Decodes (part of) the mask
+
+        :param start: int, first point
+        :param stop: int, last point (exclusive), default the end
+        :return: numpy array of bools
+        """
+        start, stop, _ = slice(start, stop).indices(self.length)
+        mask = np.zeros(max(stop - start, 0), dtype=bool)
+        runs = np.asarray(self.runs)
+        # only the runs overlapping [start, stop)
+        first = np.searchsorted(runs[:, 1], start, side='right')
+        last = np.searchsorted(runs[:, 0], stop, side='left')
+        for run_start, run_stop in runs[first:last]:
+            mask[max(run_start, start) - start:min(run_stop, stop) - start] = 1
+        return mask
+
+    def count(self):
+        """
+        Number of points selected
+
+        :return: int
+        """
+        runs = np.asarray(self.runs)
+        return int((runs[:, 1] - runs[:, 0]).sum())
+
+    def indices(self):
+        """
+        Indices of the points selected
+
+        :return: numpy array of ints
+        """
+        runs = np.asarray(self.runs)
+        lengths = runs[:, 1] - runs[:, 0]
+        # offset of each index from the start of its run
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) -
+                                                       lengths, lengths)
+        return np.repeat(runs[:, 0], lengths) + offsets
+
+
+def save_mask(filename, mask, encoding='bitset'):
+    """
+    Saves a boolean mask in a compact encoding (.npy file)
+
+    :param filename: string, the file to save to
+    :param mask: numpy array of bools (or a Packed_Mask / RLE_Mask)
+    :param encoding: string, 'bitset' or 'rle'
+    :return:
+    """
+    if encoding not in ENCODINGS:
+        raise ValueError("'encoding' must be one of: "
+                         "{0}".format(', '.join(ENCODINGS)))
+    if encoding == 'bitset' and isinstance(mask, Packed_Mask):
+        packed = mask
+    elif encoding == 'rle' and isinstance(mask, RLE_Mask):
+        packed = mask
+    else:
+        if isinstance(mask, (Packed_Mask, RLE_Mask)):
+            mask = mask.to_bool()
+        if encoding == 'bitset':
+            packed = Packed_Mask.from_bool(mask)
+        else:
+            packed = RLE_Mask.from_bool(mask)
+    np.save(filename, np.asarray(packed.array))
+
+
+def load_mask(filename, mmap=True):
+    """
+    Loads a mask saved with save_mask
+
+    :param filename: string, the file to load
+    :param mmap: bool, if True memory map the file (nothing is read until
+                 used)
+    :return: Packed_Mask or RLE_Mask instance (use to_bool() to unpack)
+    """
+    array = np.load(filename, mmap_mode='r' if mmap else None,
+                    allow_pickle=False)
+    if array.dtype == np.uint8:
+        return Packed_Mask(array)
+    return RLE_Mask(array)
+
+
+# =============================================================================
+# End of code
+# =============================================================================
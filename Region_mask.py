@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Vectorized selection masks for rectangle regions
+(x start, x end, y start, y end) as stored in Select_Rectange.data
+
+All regions are evaluated together in one batched numpy pass over the
+data (in chunks so memory stays bounded), regions drawn right-to-left or
+top-to-bottom are handled by normalising the corners first.
+
+The functions also accept a Region_store.Region_Store: its rectangles are
+evaluated as canonical disjoint boxes (with its set operations applied,
+see Region_algebra) and its polygon (lasso) regions by their bounding box,
+refined with Polygon_mask.
+
+Version 0.0.1
+"""
+
+import numpy as np
+
+from . import Polygon_mask
+
+# =============================================================================
+# Define variables
+# =============================================================================
+# maximum number of (point, region) comparisons held in memory at once
+MAX_BROADCAST = 2 ** 22
+
+
+# =============================================================================
+# Define functions
+# =============================================================================
+def normalise_regions(regions):
+    """
+    Normalises rectangle regions so that x start < x end and
+    y start < y end
+
+    :param regions: list or array of [x start, x end, y start, y end]
+    :return regions: numpy array, shape (N, 4), normalised regions
+    """
+    regions = np.asarray(regions, dtype=float).reshape(-1, 4)
+    xs = np.sort(regions[:, 0:2], axis=1)
+    ys = np.sort(regions[:, 2:4], axis=1)
+    return np.column_stack([xs, ys])
+
+
+def region_labels(x, y, regions):
+    """
+    Finds which region each point falls in (all regions in one pass)
+
+    :param x: numpy array, the x data
+    :param y: numpy array, the y data
+    :param regions: list or array of [x start, x end, y start, y end] (or
+                    a Region_store.Region_Store)
+    :return labels: numpy array of ints, the index of the first region each
+                    point falls in (-1 if in no region)
+    """
+    return _evaluate(x, y, regions, labels=True)
+
+
+def region_mask(x, y, regions):
+    """
+    Creates a mask of the points in any of the regions
+
+    :param x: numpy array, the x data
+    :param y: numpy array, the y data
+    :param regions: list or array of [x start, x end, y start, y end] (or
+                    a Region_store.Region_Store)
+    :return mask: numpy array of bools, True if point is in any region
+    """
+    return _evaluate(x, y, regions, labels=False)
+
+
+def region_indices(x, y, regions):
+    """
+    Finds the indices of the points in any of the regions
+
+    :param x: numpy array, the x data
+    :param y: numpy array, the y data
+    :param regions: list or array of [x start, x end, y start, y end] (or
+                    a Region_store.Region_Store)
+    :return indices: numpy array of ints, indices of the points selected
+    """
+    return np.flatnonzero(region_mask(x, y, regions))
+
+
+def region_populations(x, y, regions):
+    """
+    Counts the points in each region, each point counted once only (in the
+    first region it falls in)
+
+    :param x: numpy array, the x data
+    :param y: numpy array, the y data
+    :param regions: list or array of [x start, x end, y start, y end] (or
+                    a Region_store.Region_Store, counted per unit: its
+                    disjoint canonical boxes then its polygons, see
+                    Region_store.Region_Store.units)
+    :return counts: numpy array of ints, one per region (unit)
+    """
+    x, y = np.asarray(x).ravel(), np.asarray(y).ravel()
+    if x.shape != y.shape:
+        raise ValueError("'x' and 'y' must be the same length")
+    if hasattr(regions, 'units'):
+        corners, polygons = regions.units()
+    else:
+        corners, polygons = normalise_regions(regions), dict()
+    labels = _evaluate_boxes(x, y, corners, polygons, labels=True)
+    return np.bincount(labels[labels >= 0], minlength=len(corners))
+
+
+def span_slices(x, spans):
+    """
+    Finds the points inside x intervals of sorted data as contiguous slices
+    (two binary searches per span, no mask is built), so data[s] is a view
+    of the points selected
+
+    :param x: numpy array, the x data, sorted in increasing order (not
+              checked)
+    :param spans: list or array of [x start, x end] (or a
+                  Region_store.Region_Store made of spans only)
+    :return slices: list of slice objects, one per (non-empty) span
+    """
+    if hasattr(spans, 'spans'):
+        spans = spans.spans()
+    spans = np.sort(np.asarray(spans, dtype=float).reshape(-1, 2), axis=1)
+    # strictly inside, as region_mask
+    starts = np.searchsorted(x, spans[:, 0], side='right')
+    stops = np.searchsorted(x, spans[:, 1], side='left')
+    return [slice(int(start), int(stop)) for start, stop in
+            zip(starts, stops) if stop > start]
+
+
+def _evaluate(x, y, regions, labels=False):
+    x, y = np.asarray(x).ravel(), np.asarray(y).ravel()
+    if x.shape != y.shape:
+        raise ValueError("'x' and 'y' must be the same length")
+    if not hasattr(regions, 'units'):
+        return _evaluate_boxes(x, y, normalise_regions(regions), dict(),
+                               labels)
+    # a Region_Store: the mask comes from its disjoint units (set
+    # operations applied)
+    corners, polygons = regions.units()
+    mask = _evaluate_boxes(x, y, corners, polygons, labels=False)
+    if not labels:
+        return mask
+    # the first added region (row of the store) each selected point is in
+    rows = np.flatnonzero(regions.records['op'] == 0)
+    polygons = regions.polygon_rows()
+    polygons = {it: polygons[row] for it, row in enumerate(rows)
+                if row in polygons}
+    first = _evaluate_boxes(x, y, regions.corners[rows], polygons,
+                            labels=True)
+    out = np.full(len(x), -1, dtype=np.int64)
+    keep = mask & (first >= 0)
+    out[keep] = rows[first[keep]]
+    return out
+
+
+def _evaluate_boxes(x, y, regions, polygons, labels=False):
+    """
+    Evaluates normalised boxes, the boxes in polygons (dict {box: (M, 2)
+    vertices}) are refined with a crossing test
+    """
+    # storage
+    if labels:
+        out = np.full(len(x), -1, dtype=np.int64)
+    else:
+        out = np.zeros(len(x), dtype=bool)
+    if len(regions) == 0:
+        return out
+    x0, x1, y0, y1 = regions.T
+    # evaluate every region on a chunk of the data at once
+    chunk = max(MAX_BROADCAST // len(regions), 1)
+    for start in range(0, len(x), chunk):
+        xc = x[start:start + chunk, None]
+        yc = y[start:start + chunk, None]
+        inside = (xc > x0) & (xc < x1) & (yc > y0) & (yc < y1)
+        for r, verts in polygons.items():
+            candidates = np.flatnonzero(inside[:, r])
+            inside[candidates, r] = Polygon_mask.points_in_polygon(
+                xc[candidates, 0], yc[candidates, 0], verts)
+        if labels:
+            hit = inside.any(axis=1)
+            out[start:start + chunk][hit] = inside[hit].argmax(axis=1)
+        else:
+            out[start:start + chunk] = inside.any(axis=1)
+    return out
+
+
+# =============================================================================
+# End of code
+# =============================================================================
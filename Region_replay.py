@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Headless replay of saved selections
+
+A Saved_Selection holds a region set (corners plus tags), e.g. taken from
+a Select_Rectange session, and applies it to new data with the vectorized
+mask functions of Region_mask. No figure, buttons or event connections
+are created (matplotlib is not even imported), so the same selection
+definitions can drive batch pipelines.
+
+Version 0.0.1
+"""
+
+import numpy as np
+
+from . import Parallel
+from . import Region_io
+from . import Region_mask
+from . import Streaming
+from .Region_store import Region_Store
+
+# =============================================================================
+# Define variables
+# =============================================================================
+# default number of points evaluated per chunk
+CHUNK_SIZE = 2 ** 20
+
+
+# =============================================================================
+# Define Class. Methods and Functions
+# =============================================================================
+class Saved_Selection(object):
+    def __init__(self, regions=None, tags=None, meta=None):
+        """
+        A saved set of rectangle regions that can be applied to any data
+
+        :param regions: list or array of [x start, x end, y start, y end], or
+                        a Region_store.Region_Store (copied)
+        :param tags: list of strings (or None), the tag of each region
+                     (ignored if regions is a Region_Store)
+        :param meta: dict or None, the axes the regions were drawn on (see
+                     Region_io.axes_metadata)
+
+        Raises a ValueError if a region is given twice (the store keeps
+        each region once, so its second tag would be lost)
+        """
+        self.meta = dict() if meta is None else dict(meta)
+        if isinstance(regions, Region_Store):
+            self.store = regions.copy()
+            return
+        self.store = Region_Store()
+        if regions is None:
+            return
+        regions = np.asarray(regions, dtype=float).reshape(-1, 4)
+        if tags is None:
+            tags = [None] * len(regions)
+        if len(tags) != len(regions):
+            raise ValueError("'tags' must be the same length as 'regions'")
+        for it, (region, tag) in enumerate(zip(regions, tags)):
+            if self.store.add(*region, tag=tag) is None:
+                raise ValueError("Region {0} {1} is a duplicate of an "
+                                 "earlier region".format(it, list(region)))
+
+    @classmethod
+    def from_selector(cls, selector):
+        """
+        The regions (and tags) selected with a Select_Rectange
+
+        :param selector: Rectangle_Selector.Select_Rectange instance
+        :return: Saved_Selection instance
+        """
+        return cls(selector.store, meta=Region_io.axes_metadata(selector.ax))
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Loads a region set saved with save (or Select_Rectange.save_regions)
+
+        :param filename: string, the .npz file
+        :return: Saved_Selection instance
+        """
+        store, meta = Region_io.load_regions(filename)
+        selection = cls(meta=meta)
+        selection.store = store
+        return selection
+
+    def save(self, filename):
+        """
+        Saves the region set (corners, tags and axes metadata) to a .npz file
+
+        :param filename: string, the file to save to
+        :return:
+        """
+        Region_io.save_regions(filename, self.store, self.meta)
+
+    def __len__(self):
+        return len(self.store)
+
+    @property
+    def canonical(self):
+        """
+        The rectangles (set operations applied) as canonical disjoint boxes
+
+        :return: numpy array, shape (K, 4)
+        """
+        return self.store.canonical()
+
+    @property
+    def data(self):
+        """
+        The regions, a read-only list view of [x start, x end, y start,
+        y end]
+
+        :return: Region_store.Region_View
+        """
+        return self.store.data
+
+    @property
+    def tags(self):
+        """
+        The tags of the regions (None where a region has no tag)
+
+        :return: Region_store.Region_View
+        """
+        return self.store.tags
+
+    # -------------------------------------------------------------------------
+    # Applying the selection
+    # -------------------------------------------------------------------------
+    def mask(self, x, y, chunk_size=CHUNK_SIZE, workers=None,
+             executor='process'):
+        """
+        Creates a mask of the points inside any region
+
+        :param x: numpy array (or memmap), the x data
+        :param y: numpy array (or memmap), the y data
+        :param chunk_size: int, number of points evaluated at once
+        :param workers: int or None, if given evaluate the chunks in a pool
+                        of this many workers (see Parallel.parallel_mask)
+        :param executor: 'process' or 'thread', the pool used with workers
+        :return mask: numpy array of bools
+        """
+        if workers is not None:
+            return Parallel.parallel_mask(self.store, x, y, workers,
+                                          chunk_size, executor)
+        mask = np.zeros(len(x), dtype=bool)
+        for start, xc, yc in iter_slices(x, y, chunk_size):
+            mask[start:start + len(xc)] = Region_mask.region_mask(
+                xc, yc, self.store)
+        return mask
+
+    def labels(self, x, y, chunk_size=CHUNK_SIZE):
+        """
+        Finds which region each point falls in
+
+        :param x: numpy array (or memmap), the x data
+        :param y: numpy array (or memmap), the y data
+        :param chunk_size: int, number of points evaluated at once
+        :return labels: numpy array of ints, the first region each point
+                        falls in (-1 if none)
+        """
+        labels = np.full(len(x), -1, dtype=np.int64)
+        for start, xc, yc in iter_slices(x, y, chunk_size):
+            labels[start:start + len(xc)] = Region_mask.region_labels(
+                xc, yc, self.store)
+        return labels
+
+    def indices(self, x, y, chunk_size=CHUNK_SIZE, workers=None,
+                executor='process'):
+        """
+        Finds the indices of the points inside any region
+
+        :param x: numpy array (or memmap), the x data
+        :param y: numpy array (or memmap), the y data
+        :param chunk_size: int, number of points evaluated at once
+        :param workers: int or None, if given evaluate the chunks in a pool
+                        of this many workers (see Parallel.parallel_indices)
+        :param executor: 'process' or 'thread', the pool used with workers
+        :return indices: numpy array of ints
+        """
+        if workers is not None:
+            return Parallel.parallel_indices(self.store, x, y, workers,
+                                             chunk_size, executor)
+        found = [start + Region_mask.region_indices(xc, yc, self.store)
+                 for start, xc, yc in iter_slices(x, y, chunk_size)]
+        if len(found) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate(found)
+
+    def populations(self, x, y):
+        """
+        Counts the selected points in each disjoint unit of the selection
+        (the canonical boxes, then the polygons), each point counted once
+
+        :param x: numpy array, the x data
+        :param y: numpy array, the y data
+        :return counts: numpy array of ints
+        """
+        return Region_mask.region_populations(x, y, self.store)
+
+    def slices(self, x):
+        """
+        The points inside a selection made of x spans as contiguous slices
+        of sorted data (binary search, see Region_mask.span_slices)
+
+        :param x: numpy array (or memmap), the x data, sorted in increasing
+                  order
+        :return slices: list of slice objects
+        """
+        return Region_mask.span_slices(x, self.store)
+
+    def iter_masks(self, chunks):
+        """
+        Applies the selection to data given in chunks
+
+        :param chunks: iterable of (x, y) array pairs
+        :return: generator of numpy arrays of bools, the mask of each chunk
+        """
+        for xc, yc in chunks:
+            yield Region_mask.region_mask(xc, yc, self.store)
+
+    def iter_indices(self, source, chunk_size=CHUNK_SIZE):
+        """
+        The indices selected in each chunk of data too large for memory
+        (see Streaming.iter_indices)
+
+        :param source: tuple (x, y) of arrays or memmaps, or an iterable of
+                       (x, y) chunks
+        :param chunk_size: int, number of points evaluated at once
+        :return: generator of numpy arrays of ints
+        """
+        return Streaming.iter_indices(self.store, source, chunk_size)
+
+    def write_mask(self, filename, source, chunk_size=CHUNK_SIZE,
+                   length=None):
+        """
+        Writes the mask of data too large for memory to a packed bitset
+        .npy file chunk by chunk (see Streaming.write_mask)
+
+        :param filename: string, the file to write
+        :param source: tuple (x, y) of arrays or memmaps, or an iterable of
+                       (x, y) chunks
+        :param chunk_size: int, number of points evaluated at once
+        :param length: int or None, number of points (iterator sources)
+        :return: Region_io.Packed_Mask of the written file (memory mapped)
+        """
+        return Streaming.write_mask(filename, self.store, source,
+                                    chunk_size, length)
+
+
+def iter_slices(x, y, chunk_size=CHUNK_SIZE):
+    """
+    Walks through x and y in chunks
+
+    :param x: numpy array (or memmap), the x data
+    :param y: numpy array (or memmap), the y data
+    :param chunk_size: int, number of points per chunk
+    :return: generator of (start, x chunk, y chunk)
+    """
+    if len(x) != len(y):
+        raise ValueError("'x' and 'y' must be the same length")
+    chunk_size = max(int(chunk_size), 1)
+    for start in range(0, len(x), chunk_size):
+        yield start, x[start:start + chunk_size], y[start:start + chunk_size]
+
+
+# =============================================================================
+# End of code
+# =============================================================================
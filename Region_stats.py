@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Summary statistics of the points in each region
+
+The points of every region are given as one array of indices per region;
+all regions are reduced together in one vectorized pass over the
+concatenated members (grouped bincount / reduceat reductions). The median
+and percentiles of groups of up to EXACT_MAX points are exact (one sort of
+those groups' values, interpolated as numpy.percentile does); for larger
+groups they are read from a per-group histogram, costing O(points) not a
+sort, and lie in the bin holding the point of that rank, i.e. within one
+bin width ((max - min) / bins of the histogram range) of it.
+
+Version 0.0.1
+"""
+
+import numpy as np
+
+# =============================================================================
+# Define variables
+# =============================================================================
+# percentiles given besides the median
+PERCENTILES = (5, 95)
+# number of histogram bins used for the median and percentiles
+STATS_BINS = 1024
+# groups of up to this many points get exact medians and percentiles
+EXACT_MAX = 4096
+
+
+# =============================================================================
+# Define functions
+# =============================================================================
+def stats_dtype(percentiles=PERCENTILES):
+    """
+    The fields of a statistics row
+
+    :param percentiles: list of floats, the percentiles given
+    :return: numpy dtype
+    """
+    fields = [('count', 'i8'), ('mean', 'f8'), ('min', 'f8'), ('max', 'f8'),
+              ('median', 'f8')]
+    fields += [(percentile_name(q), 'f8') for q in percentiles]
+    return np.dtype(fields)
+
+
+def percentile_name(q):
+    """
+    The field name of a percentile (e.g. 'p5', 'p97.5')
+
+    :param q: float, the percentile
+    :return: string
+    """
+    return 'p{0:g}'.format(q)
+
+
+def value_range(values):
+    """
+    The range of the finite values (the histogram range)
+
+    :param values: numpy array
+    :return: tuple of floats (min, max)
+    """
+    values = np.asarray(values, dtype=float)
+    finite = values[np.isfinite(values)]
+    if len(finite) == 0:
+        return 0.0, 1.0
+    vmin, vmax = float(finite.min()), float(finite.max())
+    return vmin, (vmax if vmax > vmin else vmin + 1.0)
+
+
+def group_statistics(values, members, percentiles=PERCENTILES,
+                     bins=STATS_BINS, vrange=None, exact_max=EXACT_MAX):
+    """
+    Summary statistics of the values of each group of points (one pass
+    over all groups)
+
+    Non-finite values are ignored (not counted)
+
+    :param values: numpy array, the value of every point
+    :param members: list of numpy arrays of ints, the indices of the points
+                    in each group (groups may overlap)
+    :param percentiles: list of floats, percentiles given besides the median
+    :param bins: int, number of histogram bins (median/percentile accuracy
+                 of groups larger than exact_max)
+    :param vrange: tuple (min, max) of the histogram, default: the range of
+                   the values (give it to keep results comparable between
+                   calls)
+    :param exact_max: int, groups of up to this many (finite) points get
+                      exact medians and percentiles (as numpy.percentile)
+    :return stats: numpy structured array, one row per group (see
+                   stats_dtype), NaN for groups with no points
+    """
+    values = np.asarray(values, dtype=float).ravel()
+    ngroups = len(members)
+    stats = np.zeros(ngroups, dtype=stats_dtype(percentiles))
+    if ngroups == 0:
+        return stats
+    if vrange is None:
+        vrange = value_range(values)
+    # concatenated member values, groups are contiguous runs
+    found = np.concatenate([np.asarray(m, dtype=np.int64).ravel()
+                            for m in members])
+    groups = np.repeat(np.arange(ngroups), [len(m) for m in members])
+    vals = values[found]
+    finite = np.isfinite(vals)
+    if not finite.all():
+        vals, groups = vals[finite], groups[finite]
+    count = np.bincount(groups, minlength=ngroups)
+    total = np.bincount(groups, weights=vals, minlength=ngroups)
+    empty = count == 0
+    stats['count'] = count
+    with np.errstate(invalid='ignore', divide='ignore'):
+        stats['mean'] = total / count
+    # minimum and maximum of each (non-empty) run
+    starts = np.concatenate([[0], np.cumsum(count)[:-1]])
+    for name, func in [('min', np.minimum), ('max', np.maximum)]:
+        stats[name][empty] = np.nan
+        if len(vals) > 0:
+            stats[name][~empty] = func.reduceat(vals, starts[~empty])
+    # histogram of each group
+    vmin, vmax = vrange
+    width = (vmax - vmin) / bins
+    ibin = np.clip(((vals - vmin) / width).astype(np.int64), 0, bins - 1)
+    hist = np.bincount(groups * bins + ibin,
+                       minlength=ngroups * bins).reshape(ngroups, bins)
+    cdf = hist.cumsum(axis=1)
+    # small groups sorted (by group then value) for exact quantiles
+    exact = ~empty & (count <= exact_max)
+    small = exact[groups]
+    order = np.lexsort((vals[small], groups[small]))
+    svals = vals[small][order]
+    sstarts = np.concatenate([[0], np.cumsum(count[exact])[:-1]])
+    for name, q in [('median', 50)] + [(percentile_name(q), q)
+                                      for q in percentiles]:
+        stats[name] = _hist_quantile(hist, cdf, count, q / 100.0, vmin,
+                                     width)
+        stats[name] = np.clip(stats[name], stats['min'], stats['max'])
+        if len(svals) > 0:
+            stats[name][exact] = _sorted_quantile(svals, sstarts,
+                                                  count[exact], q / 100.0)
+        stats[name][empty] = np.nan
+    return stats
+
+
+def _sorted_quantile(svals, starts, count, q):
+    """
+    Quantile of each sorted run of values (linear between the closest
+    ranks, as numpy.percentile)
+
+    :return: numpy array of floats
+    """
+    pos = q * (count - 1)
+    lower = np.floor(pos).astype(np.int64)
+    upper = np.minimum(lower + 1, count - 1)
+    vlow, vup = svals[starts + lower], svals[starts + upper]
+    return vlow + (vup - vlow) * (pos - lower)
+
+
+def _hist_quantile(hist, cdf, count, q, vmin, width):
+    """
+    Quantile of each histogram row (linear within the bin)
+
+    :return: numpy array of floats
+    """
+    target = q * count
+    # first bin reaching the target
+    ibin = np.minimum((cdf < target[:, None]).sum(axis=1), hist.shape[1] - 1)
+    rows = np.arange(len(hist))
+    below = cdf[rows, ibin] - hist[rows, ibin]
+    inbin = np.maximum(hist[rows, ibin], 1)
+    frac = np.clip((target - below) / inbin, 0.0, 1.0)
+    return vmin + (ibin + frac) * width
+
+
+# =============================================================================
+# End of code
+# =============================================================================
@@ -0,0 +1,574 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Array backed storage of selected regions
+
+Regions are kept in a growable structured numpy array (one row per region:
+corners, tag index, polygon index and timestamp) so corners can be handed
+to the mask, export and statistics functions without copying. Polygon
+(lasso) regions store their bounding box as the corners and their
+vertices in Region_Store.polygons. Duplicates are detected with a set of
+the normalised corners (vertices for polygons). The tag names and polygon
+vertices are only ever appended to (not even clear resets them), so the
+indices in a row stay valid for any record taken from the store, e.g. by
+the undo log.
+
+Each rectangle is added to, subtracted from or intersected with the
+regions before it (its op), the resulting set is kept as disjoint boxes
+(see Region_algebra, updated for each change rather than rebuilt), which
+is what the masks evaluate.
+Polygons are always added, and once one is stored no rectangle may be
+subtracted or intersected (the canonical boxes do not cut polygons), so
+the selection is always the canonical boxes plus the polygons.
+
+Version 0.0.1
+"""
+
+import time
+try:
+    from collections.abc import Sequence
+except ImportError:
+    from collections import Sequence
+import numpy as np
+from numpy.lib import recfunctions
+
+from . import Polygon_mask
+from . import Region_algebra
+
+# =============================================================================
+# Define variables
+# =============================================================================
+# one row per region (tag is an index into Region_Store.tag_names, -1 = none,
+# poly is an index into Region_Store.polygons, -1 = rectangle, op is an
+# index into Region_algebra.OPERATIONS)
+REGION_DTYPE = np.dtype([('x0', 'f8'), ('x1', 'f8'), ('y0', 'f8'),
+                         ('y1', 'f8'), ('tag', 'i4'), ('time', 'f8'),
+                         ('poly', 'i4'), ('op', 'i1')])
+# the corner fields (in Select_Rectange.data order)
+CORNERS = ['x0', 'x1', 'y0', 'y1']
+# polygons are only ever added (see Region_Store.add)
+POLYGON_OP_ERROR = ("Cannot {0} a rectangle once lassos are selected "
+                    "(lassos are only added, remove them first)")
+
+
+# =============================================================================
+# Define Class. Methods and Functions
+# =============================================================================
+class Region_Store(object):
+    def __init__(self, capacity=16):
+        """
+        Growable store of rectangle regions
+
+        Corners are normalised on entry (x0 < x1 and y0 < y1)
+
+        :param capacity: int, initial number of rows allocated
+        """
+        self._records = np.zeros(max(int(capacity), 1), dtype=REGION_DTYPE)
+        self.size = 0
+        # unique tag strings (rows store the index into this list)
+        self.tag_names = []
+        self._tag_lookup = dict()
+        # vertices of the polygon regions ((M, 2) arrays)
+        self.polygons = []
+        # normalised corners of every stored region
+        self._keys = set()
+        # canonical disjoint boxes of the rectangles (None = out of date)
+        self._canonical = None
+
+    def __len__(self):
+        return self.size
+
+    # -------------------------------------------------------------------------
+    # Adding and removing regions
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def key(x0, x1, y0, y1):
+        """
+        Normalised corners of a region (used for duplicate detection)
+
+        :return key: tuple of floats (x start, x end, y start, y end)
+        """
+        x0, x1 = float(min(x0, x1)), float(max(x0, x1))
+        y0, y1 = float(min(y0, y1)), float(max(y0, y1))
+        return x0, x1, y0, y1
+
+    def contains(self, x0, x1, y0, y1, op='add'):
+        """
+        Whether a region with these corners (and operation) is already
+        stored (O(1))
+
+        :return: bool
+        """
+        return self._op_key(self.key(x0, x1, y0, y1), op) in self._keys
+
+    @staticmethod
+    def _op_key(key, op):
+        # added regions are keyed by their corners alone
+        if op in ('add', 0):
+            return key
+        if not isinstance(op, str):
+            op = Region_algebra.OPERATIONS[op]
+        return (op,) + key
+
+    def contains_polygon(self, verts):
+        """
+        Whether a polygon with these vertices is already stored (O(1))
+
+        :param verts: list or array of (x, y) vertices
+        :return: bool
+        """
+        verts = Polygon_mask.normalise_polygon(verts)
+        return tuple(verts.ravel().tolist()) in self._keys
+
+    def add(self, x0, x1, y0, y1, tag=None, timestamp=None, op='add'):
+        """
+        Adds a region to the store
+
+        :param x0: float, x start of the region
+        :param x1: float, x end of the region
+        :param y0: float, y start of the region
+        :param y1: float, y end of the region
+        :param tag: string or None, the tag of the region
+        :param timestamp: float, time the region was added (default now)
+        :param op: string, 'add', 'subtract' or 'intersect', how the region
+                   combines with the regions before it ('subtract' and
+                   'intersect' raise a ValueError once polygons are stored)
+        :return row: int, the row of the new region (or None if the region
+                     was already stored)
+        """
+        if op not in Region_algebra.OPERATIONS:
+            raise ValueError("'op' must be one of: {0}".format(
+                ', '.join(Region_algebra.OPERATIONS)))
+        if op != 'add' and self.has_polygons():
+            raise ValueError(POLYGON_OP_ERROR.format(op))
+        corners = self.key(x0, x1, y0, y1)
+        key = self._op_key(corners, op)
+        if key in self._keys:
+            return None
+        return self._append(key, corners, tag, timestamp, -1,
+                            Region_algebra.OPERATIONS.index(op))
+
+    def add_polygon(self, verts, tag=None, timestamp=None):
+        """
+        Adds a polygon (lasso) region to the store, its bounding box is
+        stored as the corners
+
+        :param verts: list or array of (x, y) vertices (at least 3)
+        :param tag: string or None, the tag of the region
+        :param timestamp: float, time the region was added (default now)
+        :return row: int, the row of the new region (or None if the polygon
+                     was already stored)
+        """
+        verts = Polygon_mask.normalise_polygon(verts).copy()
+        key = tuple(verts.ravel().tolist())
+        if key in self._keys:
+            return None
+        self.polygons.append(verts)
+        corners = Polygon_mask.bounding_box(verts)
+        return self._append(key, corners, tag, timestamp,
+                            len(self.polygons) - 1)
+
+    def _append(self, key, corners, tag, timestamp, poly, op=0):
+        self._grow()
+        if timestamp is None:
+            timestamp = time.time()
+        row = self.size
+        self._records[row] = corners + (self.tag_index(tag), timestamp, poly,
+                                        op)
+        self._keys.add(key)
+        self.size += 1
+        self._update_canonical(self._records[row], appended=True)
+        return row
+
+    def _update_canonical(self, record, appended=False):
+        """
+        Updates the cached disjoint boxes for a rectangle added, inserted or
+        removed, only the boxes it touches are recomputed (polygons do not
+        change them, a removed or inserted intersection changes the whole
+        selection so the cache is dropped)
+
+        :param record: numpy structured scalar, the row changed
+        :param appended: bool, True if the row was added last
+        :return:
+        """
+        if self._canonical is None or record['poly'] >= 0:
+            return
+        corners = [float(record[name]) for name in CORNERS]
+        if appended:
+            boxes = Region_algebra.apply([corners], [record['op']],
+                                         start=self._canonical)
+        elif record['op'] == 2:
+            self._canonical = None
+            return
+        else:
+            rect = self._records['poly'][:self.size] < 0
+            boxes = Region_algebra.apply_window(
+                self.corners[rect], self._records['op'][:self.size][rect],
+                self._canonical, corners)
+        boxes.flags.writeable = False
+        self._canonical = boxes
+
+    def _grow(self):
+        # grow the array if full
+        if self.size == len(self._records):
+            records = np.zeros(2 * len(self._records), dtype=REGION_DTYPE)
+            records[:self.size] = self._records[:self.size]
+            self._records = records
+
+    def insert(self, row, record):
+        """
+        Inserts a region at a row (the rows from it move down by one), e.g.
+        to put back a region returned by remove
+
+        :param row: int, the row to insert at (0 to len(self))
+        :param record: numpy structured scalar (dtype REGION_DTYPE), its
+                       polygon and tag indices must refer to this store
+        :return row: int, the row of the region (or None if the region was
+                     already stored)
+        """
+        if row < 0 or row > self.size:
+            raise IndexError("Row {0} out of range".format(row))
+        # no subtraction/intersection may follow a polygon (see add)
+        ops = [record['op']] if self.has_polygons(stop=row) else []
+        if record['poly'] >= 0:
+            ops = self._records['op'][row:self.size]
+        ops = [op for op in ops if op != 0]
+        if len(ops) > 0:
+            op = Region_algebra.OPERATIONS[ops[0]]
+            raise ValueError(POLYGON_OP_ERROR.format(op))
+        key = self._record_key(record)
+        if key in self._keys:
+            return None
+        self._grow()
+        self._records[row + 1:self.size + 1] = self._records[row:self.size]
+        self._records[row] = record
+        self._keys.add(key)
+        self.size += 1
+        self._update_canonical(record, appended=row == self.size - 1)
+        return row
+
+    def restore(self, other):
+        """
+        Replaces the regions by those of another store (e.g. a copy taken
+        before clear)
+
+        :param other: Region_Store instance, a copy of this store taken
+                      earlier (not modified)
+        :return:
+        """
+        other = other.copy()
+        self._records = other._records
+        self.size = other.size
+        self._keys = other._keys
+        self._canonical = other._canonical
+        # the tables are append only: a copy of this store holds a prefix
+        # of them, keep ours (records added since may refer to the rest)
+        for tag in other.tag_names[len(self.tag_names):]:
+            self.tag_index(tag)
+        self.polygons += other.polygons[len(self.polygons):]
+
+    def remove(self, row):
+        """
+        Removes a region (the rows after it move up by one)
+
+        :param row: int, the row of the region
+        :return record: numpy structured scalar, the removed row (its
+                        polygon, if any, stays in self.polygons)
+        """
+        if row < 0 or row >= self.size:
+            raise IndexError("Region {0} not in store".format(row))
+        record = self._records[row].copy()
+        self._keys.discard(self.row_key(row))
+        self._records[row:self.size - 1] = self._records[row + 1:self.size]
+        self.size -= 1
+        self._update_canonical(record)
+        return record
+
+    def row_key(self, row):
+        """
+        The key identifying a stored region (its normalised corners, or
+        vertices for polygons, with its operation), unchanged while the
+        region is stored
+
+        :param row: int, the row of the region
+        :return: tuple
+        """
+        return self._record_key(self._records[row])
+
+    def _record_key(self, record):
+        poly = record['poly']
+        if poly >= 0:
+            key = tuple(self.polygons[poly].ravel().tolist())
+        else:
+            key = tuple(float(record[name]) for name in CORNERS)
+        return self._op_key(key, record['op'])
+
+    def set_tag(self, row, tag):
+        """
+        Sets the tag of a stored region
+
+        :param row: int, the row of the region
+        :param tag: string or None, the tag
+        :return:
+        """
+        if row < 0 or row >= self.size:
+            raise IndexError("Region {0} not in store".format(row))
+        self._records['tag'][row] = self.tag_index(tag)
+
+    def tag_index(self, tag):
+        """
+        Index of a tag in self.tag_names (added if new), -1 for no tag
+
+        :param tag: string or None
+        :return: int
+        """
+        if tag is None:
+            return -1
+        if tag not in self._tag_lookup:
+            self._tag_lookup[tag] = len(self.tag_names)
+            self.tag_names.append(tag)
+        return self._tag_lookup[tag]
+
+    @classmethod
+    def from_records(cls, records, tag_names=None, polygons=None):
+        """
+        A store holding the given rows (e.g. loaded from a file)
+
+        :param records: numpy structured array with the fields of
+                        REGION_DTYPE (a missing poly field means all
+                        rectangles)
+        :param tag_names: list of strings, the names the tag indices refer to
+        :param polygons: list of (M, 2) arrays, the vertices the poly indices
+                         refer to
+        :return: Region_Store instance
+        """
+        store = cls(capacity=len(records))
+        store._records['poly'] = -1
+        for name in REGION_DTYPE.names:
+            if name in records.dtype.names:
+                store._records[name][:len(records)] = records[name]
+        store.size = len(records)
+        for tag in (tag_names or []):
+            store.tag_index(tag)
+        store.polygons = [np.asarray(verts, dtype=float).reshape(-1, 2)
+                          for verts in (polygons or [])]
+        poly = store._records['poly'][:store.size]
+        ops = store._records['op'][:store.size]
+        for row, key in enumerate(store.corners.tolist()):
+            if poly[row] >= 0:
+                key = store.polygons[poly[row]].ravel().tolist()
+            store._keys.add(store._op_key(tuple(key), ops[row]))
+        return store
+
+    def copy(self):
+        """
+        An independent copy of the store
+
+        :return: Region_Store instance
+        """
+        new = Region_Store(capacity=len(self._records))
+        new._records[:self.size] = self._records[:self.size]
+        new.size = self.size
+        new.tag_names = list(self.tag_names)
+        new._tag_lookup = dict(self._tag_lookup)
+        new.polygons = list(self.polygons)
+        new._keys = set(self._keys)
+        new._canonical = self._canonical
+        return new
+
+    def clear(self):
+        """
+        Removes all regions (the allocated array, tag names and polygon
+        vertices are kept, so records taken before clearing stay valid)
+
+        :return:
+        """
+        self.size = 0
+        self._keys = set()
+        self._canonical = None
+
+    # -------------------------------------------------------------------------
+    # Views
+    # -------------------------------------------------------------------------
+    @property
+    def records(self):
+        """
+        Read-only view of the stored rows (structured array)
+
+        :return: numpy structured array, dtype REGION_DTYPE
+        """
+        records = self._records[:self.size]
+        records.flags.writeable = False
+        return records
+
+    @property
+    def corners(self):
+        """
+        Read-only (zero-copy) view of the corners of the stored regions
+
+        :return: numpy array, shape (N, 4), (x start, x end, y start, y end)
+        """
+        corners = recfunctions.structured_to_unstructured(
+            self._records[CORNERS], copy=False)[:self.size]
+        corners.flags.writeable = False
+        return corners
+
+    def polygon(self, row):
+        """
+        The vertices of a stored polygon region
+
+        :param row: int, the row of the region
+        :return: numpy array, shape (M, 2) (or None for a rectangle)
+        """
+        index = self._records['poly'][row]
+        if index < 0:
+            return None
+        return self.polygons[index]
+
+    def has_polygons(self, stop=None):
+        """
+        Whether any polygon region is stored (before a row)
+
+        :param stop: int or None, only look at the rows before this one
+        :return: bool
+        """
+        stop = self.size if stop is None else min(stop, self.size)
+        return bool(np.any(self._records['poly'][:stop] >= 0))
+
+    def polygon_rows(self):
+        """
+        The polygon regions (used by the mask functions to refine their
+        bounding boxes)
+
+        :return: dict, {row: (M, 2) array of vertices}
+        """
+        poly = self._records['poly'][:self.size]
+        return {int(row): self.polygons[poly[row]]
+                for row in np.flatnonzero(poly >= 0)}
+
+    def canonical(self):
+        """
+        The rectangles, with their operations applied in order, as disjoint
+        boxes (see Region_algebra), built once then updated for each change
+        by recomputing only the boxes the changed rectangle touches
+
+        :return: numpy array, shape (K, 4), read-only
+        """
+        if self._canonical is None:
+            rect = self._records['poly'][:self.size] < 0
+            boxes = Region_algebra.apply(self.corners[rect],
+                                         self._records['op'][:self.size][rect])
+            boxes.flags.writeable = False
+            self._canonical = boxes
+        return self._canonical
+
+    def units(self):
+        """
+        The selection as the boxes the masks evaluate: the canonical boxes
+        then the bounding box of each polygon
+
+        :return corners, polygons: numpy array, shape (K, 4), and dict
+                                   {unit: (M, 2) vertices} of the units that
+                                   are polygons
+        """
+        boxes = self.canonical()
+        polygons = self.polygon_rows()
+        rows = sorted(polygons)
+        corners = np.concatenate([boxes, self.corners[rows]])
+        units = {len(boxes) + it: polygons[row] for it, row in enumerate(rows)}
+        return corners, units
+
+    def spans(self):
+        """
+        The selection as disjoint x intervals, for selections made only of
+        spans (regions with infinite y edges, see Select_Rectange span mode)
+
+        :return: numpy array, shape (K, 2), [x start, x end] (sorted)
+        """
+        boxes = self.canonical()
+        cond1 = self.has_polygons()
+        cond2 = np.any(np.isfinite(boxes[:, 2:4]))
+        if cond1 or cond2:
+            raise ValueError('Selection is not made of x spans only')
+        boxes = boxes[np.argsort(boxes[:, 0], kind='stable')]
+        return boxes[:, 0:2]
+
+    def tag(self, row):
+        """
+        The tag of a stored region
+
+        :param row: int, the row of the region
+        :return: string or None
+        """
+        index = self._records['tag'][row]
+        if index < 0:
+            return None
+        return self.tag_names[index]
+
+    @property
+    def data(self):
+        """
+        List view of the corners, as [x start, x end, y start, y end] lists
+
+        :return: Region_View
+        """
+        return Region_View(self, 'data')
+
+    @property
+    def tags(self):
+        """
+        List view of the tags (None where a region has no tag)
+
+        :return: Region_View
+        """
+        return Region_View(self, 'tags')
+
+
+class Region_View(Sequence):
+    def __init__(self, store, kind):
+        """
+        Read-only list view of a Region_Store (kept in sync with the store)
+
+        :param store: Region_Store instance
+        :param kind: string, 'data' for corner lists or 'tags' for tags
+        """
+        self.store = store
+        self.kind = kind
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[it] for it in range(*item.indices(len(self)))]
+        if item < 0:
+            item += len(self)
+        if item < 0 or item >= len(self):
+            raise IndexError('Region view index out of range')
+        if self.kind == 'tags':
+            return self.store.tag(item)
+        return [float(self.store._records[name][item]) for name in CORNERS]
+
+    def __eq__(self, other):
+        try:
+            return list(self) == list(other)
+        except TypeError:
+            return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+# =============================================================================
+# End of code
+# =============================================================================
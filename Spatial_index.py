@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Spatial index for rectangle queries on large point sets
+
+The points are bucketed into an adaptive grid: the rows are y quantiles
+(equal numbers of points) and each row is split into cells at the x
+quantiles of its own points, so every cell holds about the same number of
+points however clustered the data are (a dense clump gets small cells,
+empty space gets none). The points are stored sorted by cell (row by row,
+sorted by x within a row), so the cells of one row covered by a rectangle
+form one contiguous slice. A rectangle query only visits those slices and
+tests the candidates it finds, i.e. it costs O(rows + k) for k selected
+points (plus at most two boundary cells per row) rather than a full O(n)
+scan. Polygon queries refine the points found in the bounding box of the
+polygon.
+
+The only case the cells cannot split is many points with exactly the same
+coordinates (they are scanned together when a query edge lies on them).
+
+Version 0.0.1
+"""
+
+import numpy as np
+
+from . import Polygon_mask
+
+# =============================================================================
+# Define variables
+# =============================================================================
+# average number of points per grid cell
+POINTS_PER_CELL = 16
+# maximum number of grid cells
+MAX_CELLS = 2 ** 22
+# number of bins (along each axis) of the summed-area table
+SAT_BINS = 512
+
+
+# =============================================================================
+# Define Class. Methods and Functions
+# =============================================================================
+class Grid_Index(object):
+    def __init__(self, x, y, points_per_cell=POINTS_PER_CELL,
+                 max_cells=MAX_CELLS):
+        """
+        Builds an adaptive (quantile) grid index over the points (x, y)
+
+        Points with non-finite coordinates are never selected
+
+        :param x: numpy array, the x data
+        :param y: numpy array, the y data
+        :param points_per_cell: int, average number of points per cell
+        :param max_cells: int, maximum number of cells in the grid
+        """
+        x = np.asarray(x, dtype=float).ravel()
+        y = np.asarray(y, dtype=float).ravel()
+        if x.shape != y.shape:
+            raise ValueError("'x' and 'y' must be the same length")
+        self.n = len(x)
+        # only index finite points
+        finite = np.isfinite(x) & np.isfinite(y)
+        if finite.all():
+            positions = None
+        else:
+            positions = np.flatnonzero(finite)
+            x, y = x[positions], y[positions]
+        npoints = len(x)
+        # define the grid
+        if npoints == 0:
+            self.xmin, self.xmax, self.ymin, self.ymax = 0.0, 1.0, 0.0, 1.0
+        else:
+            self.xmin, self.xmax = float(x.min()), float(x.max())
+            self.ymin, self.ymax = float(y.min()), float(y.max())
+        ncells = int(np.clip(npoints // max(points_per_cell, 1), 1,
+                             max_cells))
+        self.ny = max(int(np.sqrt(ncells)), 1)
+        self.nx = max(ncells // self.ny, 1)
+        # rows: equal numbers of points in y order
+        row = np.empty(npoints, dtype=np.int64)
+        row[np.argsort(y, kind='stable')] = (np.arange(npoints) * self.ny //
+                                             max(npoints, 1))
+        # sort by row then x, the cells split each row at its x quantiles
+        order = np.lexsort((x, row))
+        row = row[order]
+        row_counts = np.bincount(row, minlength=self.ny)
+        row_starts = np.concatenate([[0], np.cumsum(row_counts)])
+        rank = np.arange(npoints) - row_starts[row]
+        col = rank * self.nx // np.maximum(row_counts[row], 1)
+        counts = np.bincount(row * self.nx + col,
+                             minlength=self.nx * self.ny)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        # sorted copies of the coordinates (candidates are contiguous)
+        self.xs = x[order]
+        self.ys = y[order]
+        if positions is not None:
+            order = positions[order]
+        # use the smallest integer type that can index the data
+        itype = np.int32 if self.n < 2 ** 31 else np.int64
+        self.order = order.astype(itype)
+        # y range of each row and x range of each cell (non-decreasing,
+        # empty ones take the range of their neighbours)
+        self.row_offsets = row_starts
+        self.row_ymin = _bounds(self.ys, row_starts, np.minimum)
+        self.row_ymax = _bounds(self.ys, row_starts, np.maximum)
+        shape = (self.ny, self.nx)
+        self.cell_xmin = _bounds(self.xs, self.offsets, np.minimum, shape)
+        self.cell_xmax = _bounds(self.xs, self.offsets, np.maximum, shape)
+
+    def query(self, x0, x1, y0, y1):
+        """
+        Finds the points strictly inside a rectangle
+
+        :param x0: float, x start of the rectangle
+        :param x1: float, x end of the rectangle
+        :param y0: float, y start of the rectangle
+        :param y1: float, y end of the rectangle
+        :return indices: numpy array of ints, the indices of the points
+                         inside the rectangle (in grid order, not sorted)
+        """
+        pos = self._candidates(x0, x1, y0, y1)
+        return self.order[pos]
+
+    def query_polygon(self, verts):
+        """
+        Finds the points inside a polygon (the points inside its bounding
+        box are found with the grid, then refined with a crossing test)
+
+        :param verts: list or array of (x, y) vertices
+        :return indices: numpy array of ints, the indices of the points
+                         inside the polygon (in grid order, not sorted)
+        """
+        pos = self._candidates(*Polygon_mask.bounding_box(verts))
+        keep = Polygon_mask.points_in_polygon(self.xs[pos], self.ys[pos],
+                                              verts)
+        return self.order[pos[keep]]
+
+    def _candidates(self, x0, x1, y0, y1):
+        """
+        Positions (in the sorted arrays) of the points strictly inside a
+        rectangle
+
+        :return pos: numpy array of ints
+        """
+        x0, x1 = min(x0, x1), max(x0, x1)
+        y0, y1 = min(y0, y1), max(y0, y1)
+        # rectangle does not overlap the data
+        cond1 = x1 < self.xmin or x0 > self.xmax
+        cond2 = y1 < self.ymin or y0 > self.ymax
+        if cond1 or cond2 or len(self.xs) == 0:
+            return np.zeros(0, dtype=np.int64)
+        # rows reaching into (y0, y1), then the cells of each reaching into
+        # (x0, x1) (one candidate slice per row)
+        rows = np.arange(np.searchsorted(self.row_ymax, y0, side='right'),
+                         np.searchsorted(self.row_ymin, y1, side='left'))
+        i0 = np.count_nonzero(self.cell_xmax[rows] <= x0, axis=1)
+        i1 = np.count_nonzero(self.cell_xmin[rows] < x1, axis=1)
+        starts = self.offsets[rows * self.nx + i0]
+        ends = self.offsets[rows * self.nx + i1]
+        pos = _ranges(starts, ends)
+        # exact test of the candidates
+        xs, ys = self.xs[pos], self.ys[pos]
+        keep = (xs > x0) & (xs < x1) & (ys > y0) & (ys < y1)
+        return pos[keep]
+
+    def count(self, x0, x1, y0, y1):
+        """
+        Counts the points strictly inside a rectangle
+
+        :return count: int
+        """
+        return len(self.query(x0, x1, y0, y1))
+
+    def nearest(self, x, y, wx=1.0, wy=1.0):
+        """
+        Finds the point nearest to (x, y), with distances measured as
+        sqrt((wx * dx)^2 + (wy * dy)^2)
+
+        Rows are searched in order of their distance from y until no
+        unsearched row can hold a nearer point; within a row (sorted by x)
+        only the points within reach in x of the nearest found are tested
+
+        :param x: float, x position
+        :param y: float, y position
+        :param wx: float, weight (scale) of x distances
+        :param wy: float, weight (scale) of y distances
+        :return index: int, the index of the nearest point (None if there
+                       are no finite points)
+        """
+        if len(self.xs) == 0:
+            return None
+        wx, wy = abs(wx), abs(wy)
+        # (weighted) distance from y to each row
+        dy2 = (wy * np.maximum(np.maximum(self.row_ymin - y,
+                                          y - self.row_ymax), 0.0)) ** 2
+        best, best_d2 = None, np.inf
+        for row in np.argsort(dy2, kind='stable'):
+            if dy2[row] >= best_d2:
+                break
+            start, end = self.row_offsets[row], self.row_offsets[row + 1]
+            xs, ys = self.xs[start:end], self.ys[start:end]
+            # the neighbours in x first, then every point within reach
+            mid = int(np.searchsorted(xs, x))
+            lo, hi = max(mid - POINTS_PER_CELL, 0), mid + POINTS_PER_CELL
+            for _ in range(2):
+                d2 = (wx * (xs[lo:hi] - x)) ** 2 + (wy * (ys[lo:hi] - y)) ** 2
+                if len(d2) > 0 and d2.min() < best_d2:
+                    it = int(np.argmin(d2))
+                    best, best_d2 = start + lo + it, d2[it]
+                if best is None or wx == 0:
+                    lo, hi = 0, len(xs)
+                    continue
+                reach = np.sqrt(max(best_d2 - dy2[row], 0.0)) / wx
+                lo = int(np.searchsorted(xs, x - reach, side='left'))
+                hi = int(np.searchsorted(xs, x + reach, side='right'))
+        return int(self.order[best])
+
+
+class Summed_Area_Table(object):
+    def __init__(self, x, y, bins=SAT_BINS):
+        """
+        Builds a summed-area table (2D cumulative histogram) of the points
+        (x, y), giving O(1) approximate counts of the points inside any
+        rectangle
+
+        Points are assumed to be spread uniformly within each bin, so counts
+        are exact for rectangles aligned to the bin edges and approximate
+        otherwise. Points with non-finite coordinates are not counted.
+
+        :param x: numpy array, the x data
+        :param y: numpy array, the y data
+        :param bins: int, number of bins along each axis
+        """
+        x = np.asarray(x, dtype=float).ravel()
+        y = np.asarray(y, dtype=float).ravel()
+        if x.shape != y.shape:
+            raise ValueError("'x' and 'y' must be the same length")
+        finite = np.isfinite(x) & np.isfinite(y)
+        if not finite.all():
+            x, y = x[finite], y[finite]
+        self.bins = int(bins)
+        # define the bins
+        if len(x) == 0:
+            self.xmin, self.xmax, self.ymin, self.ymax = 0.0, 1.0, 0.0, 1.0
+        else:
+            self.xmin, self.xmax = float(x.min()), float(x.max())
+            self.ymin, self.ymax = float(y.min()), float(y.max())
+        self.dx = (self.xmax - self.xmin) / self.bins or 1.0
+        self.dy = (self.ymax - self.ymin) / self.bins or 1.0
+        xrange = [self.xmin, self.xmin + self.bins * self.dx]
+        yrange = [self.ymin, self.ymin + self.bins * self.dy]
+        hist = np.histogram2d(x, y, bins=self.bins, range=[xrange, yrange])[0]
+        # table[i, j] = number of points in bins [0:i, 0:j]
+        self.table = np.zeros((self.bins + 1, self.bins + 1), dtype=np.int64)
+        self.table[1:, 1:] = hist.astype(np.int64).cumsum(0).cumsum(1)
+
+    def cumulative(self, x, y):
+        """
+        Approximate number of points with X < x and Y < y (bilinear
+        interpolation of the table)
+
+        :param x: float, x position
+        :param y: float, y position
+        :return count: float
+        """
+        fx = min(max((x - self.xmin) / self.dx, 0.0), float(self.bins))
+        fy = min(max((y - self.ymin) / self.dy, 0.0), float(self.bins))
+        i, j = min(int(fx), self.bins - 1), min(int(fy), self.bins - 1)
+        t, u = fx - i, fy - j
+        table = self.table
+        return ((1 - t) * (1 - u) * table[i, j] + t * (1 - u) * table[i + 1, j]
+                + (1 - t) * u * table[i, j + 1] + t * u * table[i + 1, j + 1])
+
+    def count(self, x0, x1, y0, y1):
+        """
+        Approximate number of points inside a rectangle (O(1))
+
+        :param x0: float, x start of the rectangle
+        :param x1: float, x end of the rectangle
+        :param y0: float, y start of the rectangle
+        :param y1: float, y end of the rectangle
+        :return count: int
+        """
+        x0, x1 = min(x0, x1), max(x0, x1)
+        y0, y1 = min(y0, y1), max(y0, y1)
+        count = (self.cumulative(x1, y1) - self.cumulative(x0, y1) -
+                 self.cumulative(x1, y0) + self.cumulative(x0, y0))
+        return int(round(count))
+
+
+def _bounds(values, offsets, func, shape=None):
+    """
+    The minimum (func=np.minimum) or maximum (np.maximum) of each run
+    values[offsets[i]:offsets[i + 1]], made non-decreasing (along the last
+    axis of shape): an empty run takes the bound of the next run (minimum)
+    or previous run (maximum)
+
+    :return bounds: numpy array of floats, one per run (reshaped to shape)
+    """
+    counts = np.diff(offsets)
+    full = counts > 0
+    fill = np.inf if func is np.minimum else -np.inf
+    bounds = np.full(len(counts), fill)
+    if full.any():
+        bounds[full] = func.reduceat(values, offsets[:-1][full])
+    if shape is not None:
+        bounds = bounds.reshape(shape)
+    if func is np.minimum:
+        return np.minimum.accumulate(bounds[..., ::-1], axis=-1)[..., ::-1]
+    return np.maximum.accumulate(bounds, axis=-1)
+
+
+def _ranges(starts, ends):
+    """
+    Concatenates np.arange(start, end) for each (start, end) pair without a
+    python loop
+
+    :param starts: numpy array of ints
+    :param ends: numpy array of ints
+    :return positions: numpy array of ints
+    """
+    lengths = ends - starts
+    keep = lengths > 0
+    starts, lengths = starts[keep], lengths[keep]
+    total = int(lengths.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    # step of 1 everywhere except at the start of each range
+    steps = np.ones(total, dtype=np.int64)
+    firsts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    steps[firsts] = starts - np.concatenate([[0], starts[:-1] +
+                                             lengths[:-1] - 1])
+    return np.cumsum(steps)
+
+
+# =============================================================================
+# End of code
+# =============================================================================
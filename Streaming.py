@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Out-of-core application of selections
+
+Applies a region set to data too large for memory (np.memmap columns, or
+an iterator giving the data in (x, y) chunks) one fixed-size chunk at a
+time, all regions being evaluated together for each chunk. Memory use is
+set by the chunk size, not by the size of the data:
+
+    - iter_indices  yields the indices selected in each chunk
+    - count         number of points selected
+    - write_mask    writes the mask to a .npy file as a packed bitset (see
+                    Region_io), chunk by chunk
+
+Version 0.0.1
+"""
+
+import os
+import numpy as np
+
+from . import Region_io
+from . import Region_mask
+from .Region_store import Region_Store
+
+# =============================================================================
+# Define variables
+# =============================================================================
+# default number of points evaluated per chunk (a multiple of 8, so chunks
+# pack into whole bytes)
+CHUNK_SIZE = 2 ** 20
+
+
+# =============================================================================
+# Define Class. Methods and Functions
+# =============================================================================
+def get_regions(regions):
+    """
+    The region set in a form Region_mask accepts
+
+    :param regions: Region_store.Region_Store, anything with a store
+                    attribute (Select_Rectange, Saved_Selection) or a
+                    list/array of [x start, x end, y start, y end]
+    :return regions: Region_store.Region_Store (may hold polygons) or
+                     numpy array, shape (N, 4)
+    """
+    store = getattr(regions, 'store', regions)
+    if isinstance(store, Region_Store):
+        return store
+    return Region_mask.normalise_regions(regions)
+
+
+def iter_chunks(source, chunk_size=CHUNK_SIZE):
+    """
+    Walks through the data in chunks
+
+    :param source: tuple (x, y) of numpy arrays or memmaps (sliced in chunks
+                   of chunk_size), or an iterable of (x, y) chunks (used as
+                   given)
+    :param chunk_size: int, number of points per chunk (array sources)
+    :return: generator of (start, x chunk, y chunk)
+    """
+    if isinstance(source, tuple) and len(source) == 2:
+        x, y = source
+        if len(x) != len(y):
+            raise ValueError("'x' and 'y' must be the same length")
+        chunk_size = max(int(chunk_size), 1)
+        for start in range(0, len(x), chunk_size):
+            yield (start, x[start:start + chunk_size],
+                   y[start:start + chunk_size])
+        return
+    start = 0
+    for xc, yc in source:
+        if len(xc) != len(yc):
+            raise ValueError("'x' and 'y' chunks must be the same length")
+        yield start, xc, yc
+        start += len(xc)
+
+
+def source_length(source):
+    """
+    Number of points in the data (None if given as an iterator of chunks)
+
+    :param source: see iter_chunks
+    :return: int or None
+    """
+    if isinstance(source, tuple) and len(source) == 2:
+        return len(source[0])
+    return None
+
+
+def iter_masks(regions, source, chunk_size=CHUNK_SIZE):
+    """
+    The mask of each chunk
+
+    :param regions: the region set (see get_regions)
+    :param source: the data (see iter_chunks)
+    :param chunk_size: int, number of points per chunk
+    :return: generator of (start, numpy array of bools)
+    """
+    regions = get_regions(regions)
+    for start, xc, yc in iter_chunks(source, chunk_size):
+        yield start, Region_mask.region_mask(xc, yc, regions)
+
+
+def iter_indices(regions, source, chunk_size=CHUNK_SIZE):
+    """
+    The indices selected in each chunk (indices into the whole data)
+
+    :param regions: the region set (see get_regions)
+    :param source: the data (see iter_chunks)
+    :param chunk_size: int, number of points per chunk
+    :return: generator of numpy arrays of ints
+    """
+    for start, mask in iter_masks(regions, source, chunk_size):
+        yield start + np.flatnonzero(mask)
+
+
+def count(regions, source, chunk_size=CHUNK_SIZE):
+    """
+    Number of points selected
+
+    :param regions: the region set (see get_regions)
+    :param source: the data (see iter_chunks)
+    :param chunk_size: int, number of points per chunk
+    :return: int
+    """
+    return sum(int(np.count_nonzero(mask))
+               for _, mask in iter_masks(regions, source, chunk_size))
+
+
+def iter_packed(masks):
+    """
+    Packs chunk masks into bytes (little bit order), carrying the bits that
+    do not fill a byte over to the next chunk
+
+    :param masks: iterable of numpy arrays of bools
+    :return: generator of numpy uint8 arrays
+    """
+    carry = np.zeros(0, dtype=bool)
+    for mask in masks:
+        if len(carry) > 0:
+            mask = np.concatenate([carry, mask])
+        cut = 8 * (len(mask) // 8)
+        carry = mask[cut:]
+        yield np.packbits(mask[:cut], bitorder='little')
+    if len(carry) > 0:
+        yield np.packbits(carry, bitorder='little')
+
+
+def write_mask(filename, regions, source, chunk_size=CHUNK_SIZE,
+               length=None):
+    """
+    Writes the mask of the selected points to a .npy file (Region_io
+    'bitset' encoding) one chunk at a time
+
+    :param filename: string, the file to write
+    :param regions: the region set (see get_regions)
+    :param source: the data (see iter_chunks)
+    :param chunk_size: int, number of points per chunk
+    :param length: int or None, number of points (only needed for iterator
+                   sources, if not given the bits are first written to a
+                   temporary file and copied once the length is known)
+    :return: Region_io.Packed_Mask of the written file (memory mapped)
+    """
+    if length is None:
+        length = source_length(source)
+    chunk_size = max(8 * (int(chunk_size) // 8), 8)
+    # number of points seen so far
+    seen = [0]
+
+    def masks():
+        for start, mask in iter_masks(regions, source, chunk_size):
+            seen[0] = start + len(mask)
+            yield mask
+
+    if length is not None:
+        _write_packed(filename, iter_packed(masks()), length)
+        return Region_io.load_mask(filename)
+    # unknown length: spill the bytes, then copy them behind the header
+    partname = filename + '.part'
+    try:
+        with open(partname, 'wb') as partfile:
+            for block in iter_packed(masks()):
+                partfile.write(block.tobytes())
+        with open(partname, 'rb') as partfile:
+            _write_packed(filename, _read_blocks(partfile, chunk_size // 8),
+                          seen[0])
+    finally:
+        if os.path.exists(partname):
+            os.remove(partname)
+    return Region_io.load_mask(filename)
+
+
+def _read_blocks(fileobj, blocksize):
+    """
+    Reads a binary file in blocks
+
+    :param fileobj: file opened in binary mode
+    :param blocksize: int, number of bytes per block
+    :return: generator of numpy uint8 arrays
+    """
+    while True:
+        block = fileobj.read(blocksize)
+        if len(block) == 0:
+            return
+        yield np.frombuffer(block, dtype=np.uint8)
+
+
+def _write_packed(filename, packed, length):
+    """
+    Writes packed bytes into a bitset .npy file of known length
+
+    :param filename: string, the file to write
+    :param packed: iterable of numpy uint8 arrays
+    :param length: int, number of points
+    :return:
+    """
+    nbytes = Region_io.HEADER_BYTES + (length + 7) // 8
+    array = np.lib.format.open_memmap(filename, mode='w+', dtype=np.uint8,
+                                      shape=(nbytes,))
+    array[:Region_io.HEADER_BYTES] = np.array([length], '<u8').view(np.uint8)
+    position = Region_io.HEADER_BYTES
+    for block in packed:
+        if position + len(block) > nbytes:
+            raise ValueError('Data longer than length={0}'.format(length))
+        array[position:position + len(block)] = block
+        position += len(block)
+    if position != nbytes:
+        raise ValueError('Data shorter than length={0}'.format(length))
+    array.flush()
+    del array
+
+
+# =============================================================================
+# End of code
+# =============================================================================
@@ -1,20 +1,76 @@
-from . import Add_buttons
-from . import Rectangle_Selector
+import importlib
 
 
 __author__ = "Neil Cook"
 __email__ = 'neil.james.cook@gmail.com'
 __version__ = '0.1'
-__all__ = ['Add_buttons', 'Rectangle_Selector']
+__all__ = ['Add_buttons', 'Density_plot', 'Linked_brushing', 'Parallel',
+           'Polygon_mask', 'Rectangle_Selector', 'Region_algebra',
+           'Region_io', 'Region_mask', 'Region_replay', 'Region_stats',
+           'Spatial_index', 'Streaming']
+
+# Submodules (and the aliases below) are only imported when first used, so
+# the non-GUI parts (masks, region stores, indexes) can be used without
+# importing pyplot or tkinter (and without selecting a backend)
+# {attribute: (submodule, name in submodule or None for the submodule)}
+_LAZY = dict()
+for _module in ['Add_buttons', 'Blit_manager', 'Density_plot', 'Dialogs',
+                'Event_throttle', 'Instrumentation', 'Linked_brushing',
+                'Measuring_cursor', 'Parallel', 'Polygon_mask',
+                'Rectangle_Selector', 'Region_algebra', 'Region_io',
+                'Region_history', 'Region_mask', 'Region_replay',
+                'Region_stats', 'Region_store', 'Spatial_index',
+                'Streaming']:
+    _LAZY[_module] = (_module, None)
 
 # =============================================================================
 # Rectangle Functions
 # =============================================================================
-SelectRectangle = Rectangle_Selector.Select_Rectange
+_LAZY['SelectRectangle'] = ('Rectangle_Selector', 'Select_Rectange')
+_LAZY['LinkedBrush'] = ('Linked_brushing', 'Linked_Brush')
+
+# =============================================================================
+# Mask Functions
+# =============================================================================
+_LAZY['region_mask'] = ('Region_mask', 'region_mask')
+_LAZY['region_indices'] = ('Region_mask', 'region_indices')
+_LAZY['region_labels'] = ('Region_mask', 'region_labels')
+_LAZY['polygon_mask'] = ('Polygon_mask', 'polygon_mask')
+_LAZY['region_populations'] = ('Region_mask', 'region_populations')
+_LAZY['span_slices'] = ('Region_mask', 'span_slices')
+_LAZY['SavedSelection'] = ('Region_replay', 'Saved_Selection')
+
+# =============================================================================
+# Index Functions
+# =============================================================================
+_LAZY['GridIndex'] = ('Spatial_index', 'Grid_Index')
+
+# =============================================================================
+# Plot Functions
+# =============================================================================
+_LAZY['plot_density'] = ('Density_plot', 'plot_density')
+_LAZY['plot_decimated'] = ('Density_plot', 'plot_decimated')
 
 # =============================================================================
 # Button Functions
 # =============================================================================
-AddButtons = Add_buttons.Add_Buttons
+_LAZY['AddButtons'] = ('Add_buttons', 'Add_Buttons')
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError("module {0!r} has no attribute "
+                             "{1!r}".format(__name__, name))
+    module_name, attribute = _LAZY[name]
+    module = importlib.import_module('.' + module_name, __name__)
+    if attribute is None:
+        value = module
+    else:
+        value = getattr(module, attribute)
+    # cache so __getattr__ is not called again
+    globals()[name] = value
+    return value
 
 
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Benchmark of the spatial index on uniform and clustered data
+
+Builds Spatial_index.Grid_Index over uniform points and over points with a
+dense clump (a fraction of them within a tiny radius), then times small
+rectangle queries inside the clump, large queries and nearest-point
+searches. The candidates scanned per query are reported besides the
+points found: with cells adapted to the data they stay close to the
+number found however clustered the data are.
+
+Usage:
+    python benchmarks/bench_index.py
+    python benchmarks/bench_index.py --sizes 1e5 1e6 --clump 0.05
+
+Version 0.0.1
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from bench_widgets import load_package
+
+# =============================================================================
+# Define variables
+# =============================================================================
+# default data sizes
+SIZES = [10 ** 5, 10 ** 6, 10 ** 7]
+# default fraction of the points in the clump
+CLUMP = 0.05
+# radius of the clump (the rest of the points are spread over [0, 1])
+CLUMP_RADIUS = 1e-4
+# number of queries timed per case
+QUERIES = 200
+
+
+# =============================================================================
+# Define functions
+# =============================================================================
+def make_data(size, clump, seed=42):
+    """
+    Uniform points with a fraction of them in a clump at (0.5, 0.5)
+
+    :param size: int, number of points
+    :param clump: float, fraction of the points in the clump
+    :param seed: int, random seed
+    :return x, y: numpy arrays
+    """
+    rng = np.random.RandomState(seed)
+    nclump = int(size * clump)
+    x = rng.uniform(size=size)
+    y = rng.uniform(size=size)
+    x[:nclump] = 0.5 + rng.normal(scale=CLUMP_RADIUS, size=nclump)
+    y[:nclump] = 0.5 + rng.normal(scale=CLUMP_RADIUS, size=nclump)
+    return x, y
+
+
+def time_queries(index, boxes):
+    """
+    Times rectangle queries
+
+    :return: tuple (median ms per query, mean points found, mean
+             candidates scanned)
+    """
+    times, found, scanned = [], [], []
+    for box in boxes:
+        start = time.perf_counter()
+        indices = index.query(*box)
+        times.append(time.perf_counter() - start)
+        found.append(len(indices))
+        # candidates: the cells visited (as in Grid_Index._candidates)
+        x0, x1, y0, y1 = box
+        rows = np.arange(np.searchsorted(index.row_ymax, y0, side='right'),
+                         np.searchsorted(index.row_ymin, y1, side='left'))
+        i0 = np.count_nonzero(index.cell_xmax[rows] <= x0, axis=1)
+        i1 = np.count_nonzero(index.cell_xmin[rows] < x1, axis=1)
+        lengths = (index.offsets[rows * index.nx + i1] -
+                   index.offsets[rows * index.nx + i0])
+        scanned.append(int(np.maximum(lengths, 0).sum()))
+    return 1e3 * np.median(times), np.mean(found), np.mean(scanned)
+
+
+def time_nearest(index, points):
+    """
+    Times nearest-point searches
+
+    :return: float, median ms per search
+    """
+    times = []
+    for px, py in points:
+        start = time.perf_counter()
+        index.nearest(px, py)
+        times.append(time.perf_counter() - start)
+    return 1e3 * np.median(times)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--sizes', nargs='+', type=float, default=SIZES,
+                        help='data sizes (number of points)')
+    parser.add_argument('--clump', type=float, default=CLUMP,
+                        help='fraction of the points in the clump')
+    parser.add_argument('--queries', type=int, default=QUERIES,
+                        help='queries timed per case')
+    params = parser.parse_args(args)
+    pkg = load_package()
+    rng = np.random.RandomState(1)
+    # tiny boxes inside the clump, large boxes anywhere
+    offsets = rng.uniform(-1, 1, size=(params.queries, 2)) * CLUMP_RADIUS
+    small = np.column_stack([0.5 + offsets[:, 0], 0.5 + offsets[:, 0] + 1e-5,
+                             0.5 + offsets[:, 1], 0.5 + offsets[:, 1] + 1e-5])
+    corner = rng.uniform(0, 0.7, size=(params.queries, 2))
+    large = np.column_stack([corner[:, 0], corner[:, 0] + 0.3,
+                             corner[:, 1], corner[:, 1] + 0.3])
+    near = 0.5 + rng.normal(scale=CLUMP_RADIUS, size=(params.queries, 2))
+    print('{0:>10s} {1:>9s} {2:>8s} {3:>10s} {4:>10s} {5:>10s} '
+          '{6:>10s}'.format('data', 'N', 'build s', 'query', 'ms',
+                            'found', 'scanned'))
+    for size in params.sizes:
+        for name, clump in [('uniform', 0.0), ('clustered', params.clump)]:
+            x, y = make_data(int(size), clump)
+            start = time.perf_counter()
+            index = pkg.Spatial_index.Grid_Index(x, y)
+            build = time.perf_counter() - start
+            rows = [('small', time_queries(index, small)),
+                    ('large', time_queries(index, large)),
+                    ('nearest', (time_nearest(index, near), np.nan, np.nan))]
+            for query, (ms, found, scanned) in rows:
+                print('{0:>10s} {1:9d} {2:8.3f} {3:>10s} {4:10.3f} '
+                      '{5:10.0f} {6:10.0f}'.format(name, int(size), build,
+                                                   query, ms, found,
+                                                   scanned))
+
+
+# =============================================================================
+# Start of code
+# =============================================================================
+if __name__ == '__main__':
+    main()
+
+# =============================================================================
+# End of code
+# =============================================================================
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Headless benchmark of the interactive widgets
+
+Runs on the Agg backend (no display needed) and feeds scripted mouse
+events (press, moves, release, button clicks) to Select_Rectange, Cursor,
+SnaptoCursor and Add_Buttons for a range of data sizes. For each widget
+and size reports per-event latency percentiles, the effective frames per
+second and the peak memory (numpy and python allocations) of the run.
+
+Motion throttling is switched off so every event reaches the widget (the
+numbers are the cost of the callbacks themselves). Anything the widgets
+print during the timed runs is discarded so it does not mix with the
+results table.
+
+Usage:
+    python benchmarks/bench_widgets.py
+    python benchmarks/bench_widgets.py --sizes 1e3 1e5 --moves 100
+
+Version 0.0.1
+"""
+
+import argparse
+import contextlib
+import gc
+import importlib.util
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.backend_bases import MouseEvent
+import numpy as np
+
+# =============================================================================
+# Define variables
+# =============================================================================
+# the package directory (the parent of this file)
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = 'matplotlib_select'
+# default data sizes
+SIZES = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]
+# default number of motion events per run
+MOVES = 50
+# default number of button clicks per run
+CLICKS = 10
+# latency percentiles reported
+PERCENTILES = [50, 90, 99]
+
+
+# =============================================================================
+# Define functions
+# =============================================================================
+def load_package():
+    """
+    Imports the package from PACKAGE_DIR (whatever the directory is called)
+
+    :return: module, the package
+    """
+    if PACKAGE_NAME in sys.modules:
+        return sys.modules[PACKAGE_NAME]
+    init = os.path.join(PACKAGE_DIR, '__init__.py')
+    spec = importlib.util.spec_from_file_location(
+        PACKAGE_NAME, init, submodule_search_locations=[PACKAGE_DIR])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[PACKAGE_NAME] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_data(size, sort=False, seed=42):
+    """
+    Random data for a benchmark run
+
+    :param size: int, number of points
+    :param sort: bool, if True x is sorted
+    :param seed: int, random seed
+    :return x, y: numpy arrays
+    """
+    rng = np.random.RandomState(seed)
+    x = rng.normal(size=size)
+    y = rng.normal(size=size)
+    if sort:
+        x = np.sort(x)
+    return x, y
+
+
+def send(canvas, name, x, y, button=None):
+    """
+    Sends a synthetic mouse event to the canvas and times its processing
+
+    :param canvas: matplotlib canvas
+    :param name: string, the event name
+    :param x: float, x position in display pixels
+    :param y: float, y position in display pixels
+    :param button: int or None, the mouse button
+    :return: float, time taken in seconds
+    """
+    event = MouseEvent(name, canvas, x, y, button=button)
+    start = time.perf_counter()
+    canvas.callbacks.process(name, event)
+    return time.perf_counter() - start
+
+
+def drag_path(ax, moves, offset=0.0):
+    """
+    Display positions of a diagonal drag across the middle of an axis
+
+    :param ax: matplotlib axis
+    :param moves: int, number of motion events
+    :param offset: float, shift of the drag (axes fraction, so successive
+                   drags select different rectangles)
+    :return: numpy array, shape (moves + 2, 2)
+    """
+    frac = np.linspace(0.2, 0.8, moves + 2)
+    return ax.transAxes.transform(np.column_stack([frac + offset,
+                                                   frac - offset]))
+
+
+def button_center(ax):
+    """
+    Display position of the center of a (button) axis
+
+    :param ax: matplotlib axis
+    :return: (float, float)
+    """
+    return tuple(ax.transAxes.transform([0.5, 0.5]))
+
+
+def click(canvas, pos):
+    """
+    Moves the mouse to pos (so axes enter/leave events fire) and clicks
+
+    :param canvas: matplotlib canvas
+    :param pos: (float, float), display position
+    :return: list of floats, time taken for each event in seconds
+    """
+    return [send(canvas, 'motion_notify_event', *pos),
+            send(canvas, 'button_press_event', *pos, button=1),
+            send(canvas, 'button_release_event', *pos, button=1)]
+
+
+# -----------------------------------------------------------------------------
+# Scenarios (each returns the list of per-event latencies in seconds)
+# -----------------------------------------------------------------------------
+def run_select_rectangle(pkg, size, moves, clicks):
+    fig, ax = plt.subplots()
+    x, y = make_data(size)
+    ax.scatter(x, y, s=1, color='k')
+    selector = pkg.SelectRectangle(ax, dict(max_rate=0), x=x, y=y)
+    fig.canvas.draw()
+    canvas = fig.canvas
+    times = []
+    for it in range(clicks):
+        path = drag_path(ax, moves, offset=0.1 * it / max(clicks, 1))
+        times.append(send(canvas, 'motion_notify_event', *path[0]))
+        times.append(send(canvas, 'button_press_event', *path[0], button=1))
+        for pos in path[1:-1]:
+            times.append(send(canvas, 'motion_notify_event', *pos))
+        times.append(send(canvas, 'button_release_event', *path[-1],
+                          button=1))
+        # click the select button then the clear button
+        times += click(canvas, button_center(selector.axselect))
+        # every drag must have been selected (not a stale rectangle)
+        corners = ax.transData.inverted().transform(path[[0, -1]])
+        if len(selector.data) != 1 or not np.allclose(
+                np.array(selector.data[0])[[0, 2]], np.min(corners, axis=0)):
+            raise RuntimeError('Drag {0} was not selected'.format(it))
+        times += click(canvas, button_center(selector.axclear))
+    plt.close(fig)
+    return times
+
+
+def run_cursor(pkg, size, moves, clicks):
+    from matplotlib_select import Measuring_cursor
+    fig, ax = plt.subplots()
+    x, y = make_data(size, sort=True)
+    ax.plot(x, y, color='k')
+    Measuring_cursor.use_measurement_cursor(ax, max_rate=0)
+    fig.canvas.draw()
+    times = [send(fig.canvas, 'motion_notify_event', *pos)
+             for _ in range(clicks) for pos in drag_path(ax, moves)]
+    plt.close(fig)
+    return times
+
+
+def run_snapto_cursor(pkg, size, moves, clicks, snap='x'):
+    from matplotlib_select import Measuring_cursor
+    fig, ax = plt.subplots()
+    x, y = make_data(size, sort=(snap == 'x'))
+    ax.plot(x, y, color='k')
+    Measuring_cursor.use_snapto_cursor(x, y, ax, max_rate=0, snap=snap)
+    fig.canvas.draw()
+    times = [send(fig.canvas, 'motion_notify_event', *pos)
+             for _ in range(clicks) for pos in drag_path(ax, moves)]
+    plt.close(fig)
+    return times
+
+
+def run_snapto_cursor_xy(pkg, size, moves, clicks):
+    return run_snapto_cursor(pkg, size, moves, clicks, snap='xy')
+
+
+def run_add_buttons(pkg, size, moves, clicks):
+    fig, ax = plt.subplots()
+    x, y = make_data(size)
+    ax.scatter(x, y, s=1, color='k')
+    buttons = pkg.AddButtons(ax=ax, button_labels=['A', 'Next'],
+                             button_actions=['OPTION', 'NEXT'],
+                             button_params=[dict(), dict()])
+    fig.canvas.draw()
+    times = []
+    for _ in range(clicks):
+        for button in buttons.buttons:
+            times += click(fig.canvas, button_center(button.ax))
+    plt.close(fig)
+    return times
+
+
+SCENARIOS = [('Select_Rectange', run_select_rectangle),
+             ('Cursor', run_cursor),
+             ('SnaptoCursor(x)', run_snapto_cursor),
+             ('SnaptoCursor(xy)', run_snapto_cursor_xy),
+             ('Add_Buttons', run_add_buttons)]
+
+
+# -----------------------------------------------------------------------------
+# Running and reporting
+# -----------------------------------------------------------------------------
+def measure(func, pkg, size, moves, clicks):
+    """
+    Runs a scenario twice: once for the latencies and once (under
+    tracemalloc, which slows allocations down) for the peak memory
+
+    :return: dict of results
+    """
+    # widgets print as they are used (e.g. the selected corners)
+    with contextlib.redirect_stdout(io.StringIO()):
+        gc.collect()
+        times = np.array(func(pkg, size, moves, clicks))
+        gc.collect()
+        tracemalloc.start()
+        func(pkg, size, moves, clicks)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    result = dict(events=len(times), mean=times.mean(), max=times.max(),
+                  fps=1.0 / times.mean(), peak=peak / 2 ** 20)
+    for pc in PERCENTILES:
+        result['p{0}'.format(pc)] = np.percentile(times, pc)
+    return result
+
+
+def format_row(name, size, result):
+    cols = ['{0:<18s}'.format(name), '{0:>10d}'.format(size),
+            '{0:>7d}'.format(result['events'])]
+    for pc in PERCENTILES:
+        cols.append('{0:>9.3f}'.format(1e3 * result['p{0}'.format(pc)]))
+    cols.append('{0:>9.3f}'.format(1e3 * result['max']))
+    cols.append('{0:>9.1f}'.format(result['fps']))
+    cols.append('{0:>9.1f}'.format(result['peak']))
+    return ' '.join(cols)
+
+
+def header():
+    cols = ['{0:<18s}'.format('widget'), '{0:>10s}'.format('N'),
+            '{0:>7s}'.format('events')]
+    for pc in PERCENTILES:
+        cols.append('{0:>9s}'.format('p{0} ms'.format(pc)))
+    cols += ['{0:>9s}'.format('max ms'), '{0:>9s}'.format('fps'),
+             '{0:>9s}'.format('peak MB')]
+    return ' '.join(cols)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--sizes', nargs='+', type=float, default=SIZES,
+                        help='data sizes (number of points)')
+    parser.add_argument('--moves', type=int, default=MOVES,
+                        help='motion events per drag')
+    parser.add_argument('--clicks', type=int, default=CLICKS,
+                        help='drags/clicks per run')
+    parser.add_argument('--widgets', nargs='+', default=None,
+                        help='only run these widgets')
+    parser.add_argument('--output', default=None,
+                        help='also write the results to this file')
+    params = parser.parse_args(args)
+    pkg = load_package()
+    lines = [header()]
+    print(lines[0])
+    for name, func in SCENARIOS:
+        if params.widgets is not None and name not in params.widgets:
+            continue
+        for size in params.sizes:
+            result = measure(func, pkg, int(size), params.moves,
+                             params.clicks)
+            lines.append(format_row(name, int(size), result))
+            print(lines[-1])
+            sys.stdout.flush()
+    if params.output is not None:
+        with open(params.output, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+
+# =============================================================================
+# Start of code
+# =============================================================================
+if __name__ == '__main__':
+    main()
+
+# =============================================================================
+# End of code
+# =============================================================================
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Test setup: the repository is the package, import it as matplotlib_select
+and draw on the (non-interactive) Agg backend
+
+Version 0.0.1
+"""
+
+import importlib.util
+import os
+import sys
+
+import matplotlib
+
+matplotlib.use('Agg')
+
+# =============================================================================
+# Define variables
+# =============================================================================
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if 'matplotlib_select' not in sys.modules:
+    _spec = importlib.util.spec_from_file_location(
+        'matplotlib_select', os.path.join(ROOT, '__init__.py'),
+        submodule_search_locations=[ROOT])
+    _module = importlib.util.module_from_spec(_spec)
+    sys.modules['matplotlib_select'] = _module
+    _spec.loader.exec_module(_module)
+
+# =============================================================================
+# End of code
+# =============================================================================
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Scripted mouse events for the widget tests (sent through the canvas, so
+matplotlib's own axes enter/leave handling runs as it would interactively)
+
+Version 0.0.1
+"""
+
+import matplotlib.pyplot as plt
+from matplotlib.backend_bases import MouseEvent
+
+from matplotlib_select.Rectangle_Selector import Select_Rectange
+
+
+# =============================================================================
+# Define functions
+# =============================================================================
+def send(ax, name, xdata, ydata, button=None, key=None):
+    """
+    Sends a mouse event at a data position of an axis
+
+    :param ax: matplotlib axis
+    :param name: string, the matplotlib event name
+    :param xdata: float, x position (data coordinates of ax)
+    :param ydata: float, y position (data coordinates of ax)
+    :param button: int or None, the mouse button
+    :param key: string or None, the key held
+    :return:
+    """
+    x, y = ax.transData.transform((xdata, ydata))
+    MouseEvent(name, ax.figure.canvas, x, y, button=button, key=key)._process()
+
+
+def drag(ax, x0, y0, x1, y1, key=None):
+    """
+    Moves to (x0, y0), then presses, drags to (x1, y1) and releases
+
+    :return:
+    """
+    send(ax, 'motion_notify_event', x0, y0)
+    send(ax, 'button_press_event', x0, y0, button=1, key=key)
+    send(ax, 'motion_notify_event', x1, y1, button=1, key=key)
+    send(ax, 'button_release_event', x1, y1, button=1, key=key)
+
+
+def click(ax):
+    """
+    Moves into an axis (e.g. a button) and clicks its centre
+
+    :return:
+    """
+    send(ax, 'motion_notify_event', 0.5, 0.5)
+    send(ax, 'button_press_event', 0.5, 0.5, button=1)
+    send(ax, 'button_release_event', 0.5, 0.5, button=1)
+
+
+def make_selector(x=None, y=None, **kwargs):
+    """
+    A Select_Rectange on a unit axis (no motion throttling), drawn
+
+    :param x: numpy array or None, the x data
+    :param y: numpy array or None, the y data
+    :param kwargs: key word arguments of Select_Rectange
+    :return: Rectangle_Selector.Select_Rectange instance
+    """
+    fig, ax = plt.subplots()
+    ax.set_xlim(0, 1)
+    ax.set_ylim(0, 1)
+    kwargs.setdefault('max_rate', 0)
+    selector = Select_Rectange(ax, kwargs, x=x, y=y)
+    fig.canvas.draw()
+    return selector
+
+
+def add_lasso(selector, verts):
+    """
+    Selects a lasso with these vertices (as if drawn then selected)
+
+    :return:
+    """
+    selector.lasso_verts = list(verts)
+    selector.select(None)
+
+
+# =============================================================================
+# End of code
+# =============================================================================
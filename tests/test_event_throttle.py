@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Tests of the shared event throttle
+
+Version 0.0.1
+"""
+
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.backend_bases import LocationEvent
+
+from matplotlib_select import Event_throttle
+from matplotlib_select.Rectangle_Selector import Select_Rectange
+
+from helpers import click, drag, send
+
+
+# =============================================================================
+# Define functions
+# =============================================================================
+def test_enter_event_dispatched_by_name():
+    fig, (ax1, ax2) = plt.subplots(ncols=2)
+    fig.canvas.draw()
+    throttle = Event_throttle.get_throttle(fig.canvas, 0)
+    calls = dict(move=[], enter=[])
+    throttle.connect('motion_notify_event', calls['move'].append)
+    throttle.connect('axes_enter_event', calls['enter'].append)
+    send(ax1, 'motion_notify_event', 0.5, 0.5)
+    send(ax2, 'motion_notify_event', 0.5, 0.5)
+    # one motion callback per motion, enter callbacks for each axes entered
+    assert len(calls['move']) == 2
+    assert [event.inaxes for event in calls['enter']] == [ax1, ax2]
+    plt.close(fig)
+
+
+def test_second_drag_after_clicking_a_button():
+    fig, ax = plt.subplots()
+    ax.set_xlim(0, 1)
+    ax.set_ylim(0, 1)
+    selector = Select_Rectange(ax, dict(max_rate=0))
+    fig.canvas.draw()
+    drag(ax, 0.1, 0.1, 0.3, 0.3)
+    click(selector.axselect)
+    # back into the main axes after leaving it for the button
+    drag(ax, 0.5, 0.5, 0.8, 0.7)
+    click(selector.axselect)
+    assert len(selector.data) == 2
+    assert np.allclose(selector.data[1], [0.5, 0.8, 0.5, 0.7])
+    plt.close(fig)
+
+
+def test_leaving_other_axes_keeps_main_axes():
+    fig, (ax, other) = plt.subplots(ncols=2)
+    selector = Select_Rectange(ax, dict(max_rate=0))
+    fig.canvas.draw()
+    send(ax, 'motion_notify_event', 0.5, 0.5)
+    assert selector.in_main_axes
+    # a leave event for another axes (e.g. a linked subplot)
+    x, y = other.transAxes.transform((0.5, 0.5))
+    event = LocationEvent('axes_leave_event', fig.canvas, x, y)
+    event.inaxes = other
+    fig.canvas.callbacks.process('axes_leave_event', event)
+    assert selector.in_main_axes
+    # leaving the main axes for a button
+    send(selector.axselect, 'motion_notify_event', 0.5, 0.5)
+    assert not selector.in_main_axes
+    plt.close(fig)
+
+
+def test_drag_after_clicking_a_button_first():
+    fig, ax = plt.subplots()
+    ax.set_xlim(0, 1)
+    ax.set_ylim(0, 1)
+    selector = Select_Rectange(ax, dict(max_rate=0))
+    fig.canvas.draw()
+    # a button click before any drag (the mouse comes from the button)
+    click(selector.axclear)
+    drag(ax, 0.2, 0.2, 0.6, 0.5)
+    click(selector.axselect)
+    assert len(selector.data) == 1
+    assert np.allclose(selector.data[0], [0.2, 0.6, 0.2, 0.5])
+    plt.close(fig)
+
+
+def test_widgets_keep_their_own_rate():
+    fig, ax = plt.subplots()
+    ax.set_xlim(0, 1)
+    ax.set_ylim(0, 1)
+    fig.canvas.draw()
+    throttle = Event_throttle.get_throttle(fig.canvas)
+    calls = dict(fast=[], slow=[])
+    throttle.connect('motion_notify_event', calls['fast'].append, 0)
+    slow = throttle.connect('motion_notify_event', calls['slow'].append,
+                            1e-3)
+    # a widget created later does not change the rates already set
+    Select_Rectange(ax, dict(max_rate=1e-3))
+    for it in range(5):
+        send(ax, 'motion_notify_event', 0.1 * it, 0.5)
+    assert len(calls['fast']) == 5
+    assert len(calls['slow']) == 1
+    # the latest motion is flushed before a press
+    send(ax, 'button_press_event', 0.4, 0.5, button=1)
+    assert len(calls['slow']) == 2
+    assert calls['slow'][-1] is calls['fast'][-1]
+    throttle.set_max_rate(0, cid=slow)
+    send(ax, 'motion_notify_event', 0.5, 0.5)
+    assert len(calls['slow']) == 3
+    plt.close(fig)
+
+
+# =============================================================================
+# End of code
+# =============================================================================
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Tests that the live mask follows the same selection as mask()
+
+Version 0.0.1
+"""
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from helpers import add_lasso, click, drag, make_selector
+
+
+# =============================================================================
+# Define functions
+# =============================================================================
+def check(selector):
+    mask = selector.mask()
+    assert np.array_equal(selector.live_mask, mask)
+    assert selector.num_selected == np.count_nonzero(mask)
+
+
+def select_rect(selector, x0, y0, x1, y1, key=None):
+    drag(selector.ax, x0, y0, x1, y1, key=key)
+    click(selector.axselect)
+
+
+def test_live_mask_matches_mask():
+    rng = np.random.default_rng(2)
+    x, y = rng.uniform(0, 1, (2, 20000))
+    selector = make_selector(x, y)
+    select_rect(selector, 0.1, 0.1, 0.6, 0.6)
+    check(selector)
+    select_rect(selector, 0.4, 0.4, 0.9, 0.9)
+    select_rect(selector, 0.3, 0.3, 0.5, 0.5, key='shift')
+    check(selector)
+    select_rect(selector, 0.2, 0.2, 0.8, 0.8, key='control')
+    check(selector)
+    # lassos, then operations that are refused while they are selected
+    selector.set_mode('lasso')
+    add_lasso(selector, [(0.0, 0.0), (0.5, 0.05), (0.25, 0.5)])
+    add_lasso(selector, [(0.5, 0.5), (1.0, 0.6), (0.8, 1.0)])
+    check(selector)
+    selector.set_mode('rectangle')
+    select_rect(selector, 0.0, 0.0, 0.7, 0.7, key='shift')
+    select_rect(selector, 0.1, 0.1, 0.4, 0.9, key='control')
+    check(selector)
+    select_rect(selector, 0.05, 0.6, 0.3, 0.95)
+    check(selector)
+    # removing, undoing and redoing
+    for row in [1, 2, 3]:
+        selector.remove_region(row)
+        check(selector)
+    for _ in range(4):
+        selector.undo()
+        check(selector)
+    for _ in range(2):
+        selector.redo()
+        check(selector)
+    selector.clear(None)
+    check(selector)
+    selector.undo()
+    check(selector)
+    plt.close(selector.ax.figure)
+
+
+# =============================================================================
+# End of code
+# =============================================================================
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Tests of the parallel mask and indices against the serial path
+
+Version 0.0.1
+"""
+
+import numpy as np
+import pytest
+
+from matplotlib_select import Parallel
+from matplotlib_select.Region_mask import region_indices, region_mask
+from matplotlib_select.Region_store import Region_Store
+
+
+# =============================================================================
+# Define functions
+# =============================================================================
+def make_data(size=10007, seed=3):
+    rng = np.random.default_rng(seed)
+    x, y = rng.uniform(size=(2, size))
+    x[:5] = np.nan
+    return x, y
+
+
+def make_store():
+    store = Region_Store()
+    store.add(0.1, 0.5, 0.1, 0.5)
+    store.add(0.4, 0.9, 0.3, 0.8)
+    store.add(0.2, 0.3, 0.2, 0.3, op='subtract')
+    store.add(0.6, 0.95, 0.05, 0.2)
+    return store
+
+
+def memmaps(tmp_path, x, y):
+    np.save(str(tmp_path / 'x.npy'), x)
+    y.tofile(str(tmp_path / 'y.bin'))
+    xm = np.load(str(tmp_path / 'x.npy'), mmap_mode='r')
+    ym = np.memmap(str(tmp_path / 'y.bin'), dtype=y.dtype, mode='r',
+                   shape=y.shape)
+    return xm, ym
+
+
+@pytest.mark.parametrize('executor', Parallel.EXECUTORS)
+@pytest.mark.parametrize('mapped', [False, True])
+def test_parallel_matches_region_mask(tmp_path, executor, mapped):
+    x, y = make_data()
+    store = make_store()
+    expected = region_mask(x, y, store)
+    if mapped:
+        x, y = memmaps(tmp_path, x, y)
+    # chunks that do not divide the data evenly
+    kwargs = dict(workers=2, chunk_size=1000, executor=executor)
+    mask = Parallel.parallel_mask(store, x, y, **kwargs)
+    assert mask.dtype == bool
+    assert np.array_equal(mask, expected)
+    packed = Parallel.parallel_mask(store, x, y, packed=True, **kwargs)
+    assert np.array_equal(packed.to_bool(), expected)
+    indices = Parallel.parallel_indices(store, x, y, **kwargs)
+    assert np.array_equal(indices, region_indices(x, y, store))
+
+
+def test_parallel_memmap_view(tmp_path):
+    x, y = make_data()
+    store = make_store()
+    xm, ym = memmaps(tmp_path, x, y)
+    # a slice of a memmap is still passed by file reference
+    mask = Parallel.parallel_mask(store, xm[1000:], ym[1000:], workers=2,
+                                  chunk_size=512, executor='thread')
+    assert np.array_equal(mask, region_mask(x[1000:], y[1000:], store))
+
+
+def test_parallel_empty_data():
+    x = np.zeros(0)
+    store = make_store()
+    assert len(Parallel.parallel_mask(store, x, x, executor='thread')) == 0
+    assert len(Parallel.parallel_indices(store, x, x,
+                                         executor='thread')) == 0
+
+
+# =============================================================================
+# End of code
+# =============================================================================
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Tests of the polygon (lasso) mask against matplotlib's Path
+
+Version 0.0.1
+"""
+
+import numpy as np
+import pytest
+from matplotlib.path import Path
+
+from matplotlib_select import Polygon_mask
+from matplotlib_select.Spatial_index import Grid_Index
+
+
+# =============================================================================
+# Define variables
+# =============================================================================
+POLYGONS = dict(
+    triangle=[(0.1, 0.1), (0.9, 0.2), (0.4, 0.8)],
+    # concave, with horizontal and vertical edges
+    comb=[(0.1, 0.1), (0.9, 0.1), (0.9, 0.9), (0.7, 0.9), (0.7, 0.3),
+          (0.5, 0.3), (0.5, 0.9), (0.3, 0.9), (0.3, 0.3), (0.1, 0.3)],
+    # self-intersecting (a bow tie), closed by a repeated vertex
+    bowtie=[(0.1, 0.1), (0.9, 0.9), (0.9, 0.1), (0.1, 0.9), (0.1, 0.1)])
+
+
+# =============================================================================
+# Define functions
+# =============================================================================
+def make_data(size=20000, seed=8):
+    rng = np.random.default_rng(seed)
+    x, y = rng.uniform(size=(2, size))
+    # points level with the vertices (where crossing tests can go wrong)
+    x[:200] = rng.uniform(size=200)
+    y[:200] = rng.choice([0.1, 0.2, 0.3, 0.8, 0.9], size=200)
+    x[200:210] = np.nan
+    return x, y
+
+
+def path_mask(x, y, verts):
+    path = Path(Polygon_mask.normalise_polygon(verts), closed=False)
+    mask = path.contains_points(np.column_stack([x, y]))
+    return mask & np.isfinite(x) & np.isfinite(y)
+
+
+def on_edges(x, y, verts, tol=1e-9):
+    # points (almost) on an edge, where the two tests may differ
+    verts = Polygon_mask.normalise_polygon(verts)
+    start, end = verts, np.roll(verts, -1, axis=0)
+    near = np.zeros(len(x), dtype=bool)
+    for (x0, y0), (x1, y1) in zip(start, end):
+        dx, dy = x1 - x0, y1 - y0
+        t = np.clip(((x - x0) * dx + (y - y0) * dy) / (dx ** 2 + dy ** 2),
+                    0, 1)
+        near |= np.hypot(x - x0 - t * dx, y - y0 - t * dy) < tol
+    return near
+
+
+@pytest.mark.parametrize('name', sorted(POLYGONS))
+def test_polygon_mask_matches_path(name):
+    verts = POLYGONS[name]
+    x, y = make_data()
+    expected = path_mask(x, y, verts)
+    keep = ~on_edges(x, y, verts)
+    mask = Polygon_mask.polygon_mask(x, y, verts)
+    assert expected.sum() > 0
+    assert np.array_equal(mask[keep], expected[keep])
+    indices = Polygon_mask.polygon_indices(x, y, verts)
+    assert np.array_equal(indices, np.flatnonzero(mask))
+
+
+@pytest.mark.parametrize('name', sorted(POLYGONS))
+def test_query_polygon_matches_path(name):
+    verts = POLYGONS[name]
+    x, y = make_data()
+    index = Grid_Index(x, y)
+    expected = path_mask(x, y, verts)
+    keep = ~on_edges(x, y, verts)
+    mask = np.zeros(len(x), dtype=bool)
+    mask[index.query_polygon(verts)] = True
+    assert np.array_equal(mask[keep], expected[keep])
+    # the grid and the direct mask agree everywhere
+    assert np.array_equal(mask, Polygon_mask.polygon_mask(x, y, verts))
+
+
+# =============================================================================
+# End of code
+# =============================================================================
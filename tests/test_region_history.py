@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Tests of undoing and redoing region changes
+
+Version 0.0.1
+"""
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from matplotlib_select import Dialogs
+
+from helpers import add_lasso, click, drag, make_selector
+
+
+# =============================================================================
+# Define functions
+# =============================================================================
+def test_tags_survive_undo_across_clear():
+    provider = Dialogs.Scripted_Input(['A', 'B', 'C'])
+    selector = make_selector(tag=True, input_provider=provider)
+    ax = selector.ax
+    drag(ax, 0.1, 0.1, 0.2, 0.2)
+    click(selector.axselect)
+    drag(ax, 0.3, 0.3, 0.4, 0.4)
+    click(selector.axselect)
+    click(selector.axclear)
+    drag(ax, 0.5, 0.5, 0.6, 0.6)
+    click(selector.axselect)
+    assert list(selector.tags) == ['C']
+    selector.undo()
+    selector.undo()
+    assert list(selector.tags) == ['A', 'B']
+    selector.redo()
+    selector.redo()
+    assert len(selector.tags) == 1
+    assert list(selector.tags) == ['C']
+    plt.close(selector.ax.figure)
+
+
+def test_lassos_survive_undo_across_clear():
+    selector = make_selector(mode='lasso')
+    first = [(0.1, 0.1), (0.4, 0.1), (0.25, 0.4)]
+    second = [(0.5, 0.5), (0.9, 0.5), (0.7, 0.9)]
+    add_lasso(selector, first)
+    selector.clear(None)
+    add_lasso(selector, second)
+    selector.undo()
+    selector.undo()
+    assert np.allclose(selector.store.polygon(0), first)
+    selector.redo()
+    selector.redo()
+    assert len(selector.data) == 1
+    assert np.allclose(selector.store.polygon(0), second)
+    plt.close(selector.ax.figure)
+
+
+def test_undo_redo_without_full_draw():
+    selector = make_selector()
+    ax = selector.ax
+    drag(ax, 0.1, 0.1, 0.3, 0.3)
+    click(selector.axselect)
+    selector.set_mode('lasso')
+    add_lasso(selector, [(0.5, 0.5), (0.9, 0.5), (0.7, 0.9)])
+    draws = []
+    canvas = ax.figure.canvas
+    canvas.draw = lambda *args, **kwargs: draws.append(1)
+    selector.undo()
+    assert len(selector.saved_poly_collection.get_paths()) == 0
+    assert selector.num_saved == 1
+    selector.undo()
+    assert selector.num_saved == 0
+    selector.redo()
+    selector.redo()
+    assert selector.num_saved == 1
+    assert len(selector.saved_poly_collection.get_paths()) == 1
+    # restored from the cached background and blitted
+    assert draws == []
+    assert selector.blitter.background is not None
+    plt.close(ax.figure)
+
+
+# =============================================================================
+# End of code
+# =============================================================================
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Tests of saving and loading region sets and masks
+
+Version 0.0.1
+"""
+
+import numpy as np
+import pytest
+
+from matplotlib_select import Region_io
+from matplotlib_select.Region_store import Region_Store
+
+
+# =============================================================================
+# Define variables
+# =============================================================================
+# lengths around the byte boundaries of the bitset encoding
+LENGTHS = [0, 1, 7, 8, 9, 63, 64, 65, 1001]
+ENCODINGS = [Region_io.Packed_Mask, Region_io.RLE_Mask]
+
+
+# =============================================================================
+# Define functions
+# =============================================================================
+def masks(length, seed=4):
+    rng = np.random.default_rng(seed + length)
+    yield np.zeros(length, dtype=bool)
+    yield np.ones(length, dtype=bool)
+    yield rng.uniform(size=length) < 0.3
+    # runs touching both ends
+    runs = np.zeros(length, dtype=bool)
+    runs[:length // 3] = True
+    runs[length - length // 4:] = True
+    yield runs
+
+
+@pytest.mark.parametrize('cls', ENCODINGS)
+@pytest.mark.parametrize('length', LENGTHS)
+def test_mask_encode_decode(cls, length):
+    for mask in masks(length):
+        encoded = cls.from_bool(mask)
+        assert len(encoded) == length
+        decoded = encoded.to_bool()
+        assert decoded.dtype == bool
+        assert np.array_equal(decoded, mask)
+        assert encoded.count() == np.count_nonzero(mask)
+        assert np.array_equal(encoded.indices(), np.flatnonzero(mask))
+        # partial decodes, not aligned to bytes
+        for start, stop in [(3, length - 2), (length // 2, None), (5, 5)]:
+            assert np.array_equal(encoded.to_bool(start, stop),
+                                  mask[start:stop])
+
+
+@pytest.mark.parametrize('encoding', Region_io.ENCODINGS)
+@pytest.mark.parametrize('mmap', [False, True])
+@pytest.mark.parametrize('length', LENGTHS)
+def test_mask_save_load(tmp_path, encoding, mmap, length):
+    for it, mask in enumerate(masks(length)):
+        filename = str(tmp_path / 'mask{0}.npy'.format(it))
+        Region_io.save_mask(filename, mask, encoding=encoding)
+        loaded = Region_io.load_mask(filename, mmap=mmap)
+        assert len(loaded) == length
+        assert np.array_equal(loaded.to_bool(), mask)
+        assert loaded.count() == np.count_nonzero(mask)
+
+
+def test_regions_save_load(tmp_path):
+    store = Region_Store()
+    store.add(0.1, 0.5, 0.2, 0.6, tag='A')
+    store.add(0.3, 0.4, 0.3, 0.4, op='subtract')
+    store.add(-np.inf, np.inf, 0.25, 0.55, tag='A', op='intersect')
+    store.add_polygon([(0.5, 0.5), (0.9, 0.5), (0.7, 0.9)], tag='B')
+    meta = dict(xlim=(0.0, 1.0), ylim=(1.0, 10.0), xscale='linear',
+                yscale='log')
+    filename = str(tmp_path / 'regions.npz')
+    Region_io.save_regions(filename, store, meta)
+    loaded, loaded_meta = Region_io.load_regions(filename)
+    assert loaded_meta == meta
+    assert len(loaded) == len(store)
+    assert list(loaded.data) == list(store.data)
+    assert list(loaded.tags) == ['A', None, 'A', 'B']
+    assert np.array_equal(loaded.records['op'], store.records['op'])
+    assert np.allclose(loaded.polygon(3), store.polygon(3))
+    assert np.array_equal(loaded.canonical(), store.canonical())
+
+
+def test_regions_save_load_empty(tmp_path):
+    filename = str(tmp_path / 'regions.npz')
+    Region_io.save_regions(filename, Region_Store())
+    loaded, meta = Region_io.load_regions(filename)
+    assert len(loaded) == 0
+    assert meta == dict()
+
+
+# =============================================================================
+# End of code
+# =============================================================================
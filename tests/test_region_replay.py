@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Tests of the headless saved selections
+
+Version 0.0.1
+"""
+
+import numpy as np
+import pytest
+
+from matplotlib_select.Region_replay import Saved_Selection
+
+
+# =============================================================================
+# Define functions
+# =============================================================================
+def test_regions_and_tags_kept_in_order():
+    regions = [[0.1, 0.5, 0.1, 0.5], [0.6, 0.9, 0.6, 0.9]]
+    selection = Saved_Selection(regions, tags=['A', 'B'])
+    assert len(selection) == 2
+    assert list(selection.tags) == ['A', 'B']
+    x = np.array([0.3, 0.7, 0.55])
+    assert np.array_equal(selection.mask(x, x), [True, True, False])
+
+
+@pytest.mark.parametrize('duplicate', [[0.1, 0.5, 0.1, 0.5],
+                                       [0.5, 0.1, 0.5, 0.1]])
+def test_duplicate_regions_raise(duplicate):
+    # the same region (drawn either way round) with another tag
+    regions = [[0.1, 0.5, 0.1, 0.5], [0.6, 0.9, 0.6, 0.9], duplicate]
+    with pytest.raises(ValueError, match='Region 2'):
+        Saved_Selection(regions, tags=['A', 'B', 'C'])
+    with pytest.raises(ValueError):
+        Saved_Selection(regions)
+
+
+# =============================================================================
+# End of code
+# =============================================================================
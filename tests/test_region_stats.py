@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Tests of the per-region summary statistics
+
+Version 0.0.1
+"""
+
+import numpy as np
+
+from matplotlib_select import Region_stats
+
+
+# =============================================================================
+# Define functions
+# =============================================================================
+def test_small_groups_match_percentile():
+    rng = np.random.default_rng(3)
+    values = rng.lognormal(size=2000)
+    values[::97] = np.nan
+    members = [rng.choice(2000, size, replace=False)
+               for size in [1, 2, 3, 7, 20, 150, 1500]] + [np.zeros(0, int)]
+    stats = Region_stats.group_statistics(values, members, (5, 50, 97.5))
+    for member, row in zip(members, stats):
+        finite = values[member][np.isfinite(values[member])]
+        assert row['count'] == len(finite)
+        if len(finite) == 0:
+            assert np.isnan(row['median'])
+            continue
+        for name, q in [('median', 50), ('p5', 5), ('p50', 50),
+                        ('p97.5', 97.5)]:
+            assert np.isclose(row[name], np.percentile(finite, q))
+
+
+def test_large_groups_within_one_bin():
+    rng = np.random.default_rng(4)
+    values = rng.normal(size=50000)
+    members = [np.arange(50000), np.arange(0, 50000, 3)]
+    bins = 256
+    stats = Region_stats.group_statistics(values, members, (5, 95),
+                                          bins=bins, exact_max=100)
+    vmin, vmax = Region_stats.value_range(values)
+    width = (vmax - vmin) / bins
+    for member, row in zip(members, stats):
+        for name, q in [('median', 50), ('p5', 5), ('p95', 95)]:
+            assert abs(row[name] - np.percentile(values[member], q)) <= width
+
+
+# =============================================================================
+# End of code
+# =============================================================================
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Tests of subtracting and intersecting regions
+
+Version 0.0.1
+"""
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+
+from matplotlib_select import Region_algebra
+from matplotlib_select import Region_mask
+from matplotlib_select.Region_store import Region_Store
+
+from helpers import add_lasso, click, drag, make_selector
+
+
+# =============================================================================
+# Define functions
+# =============================================================================
+def test_subtract_refused_over_lasso():
+    rng = np.random.default_rng(1)
+    x, y = rng.uniform(0, 1, (2, 5000))
+    selector = make_selector(x, y)
+    selector.set_mode('lasso')
+    add_lasso(selector, [(0.1, 0.1), (0.9, 0.1), (0.5, 0.9)])
+    before = selector.mask().copy()
+    selector.set_mode('rectangle')
+    drag(selector.ax, 0.3, 0.2, 0.7, 0.5, key='shift')
+    click(selector.axselect)
+    # the subtraction is not recorded, so nothing drifts apart
+    assert len(selector.data) == 1
+    assert np.array_equal(selector.mask(), before)
+    assert np.array_equal(selector.live_mask, before)
+    # once the lasso is gone subtracting works again
+    selector.undo()
+    drag(selector.ax, 0.2, 0.2, 0.8, 0.8)
+    click(selector.axselect)
+    drag(selector.ax, 0.3, 0.3, 0.5, 0.5, key='shift')
+    click(selector.axselect)
+    assert len(selector.data) == 2
+    plt.close(selector.ax.figure)
+
+
+def test_store_keeps_polygons_after_operations():
+    store = Region_Store()
+    store.add(0, 1, 0, 1)
+    store.add(0.2, 0.4, 0.2, 0.4, op='subtract')
+    store.add_polygon([(0, 0), (1, 0), (0.5, 1)])
+    with pytest.raises(ValueError):
+        store.add(0, 0.5, 0, 0.5, op='intersect')
+    # a polygon may not be put back before a subtraction either
+    record = store.remove(2)
+    with pytest.raises(ValueError):
+        store.insert(0, record)
+    assert store.insert(2, record) == 2
+
+
+def test_points_inside_drawn_rectangles_stay_selected():
+    store = Region_Store()
+    store.add(0, 2, 0, 2)
+    store.add(1, 3, 1, 3)
+    x = np.array([1.0, 1.0, 2.0, 1.5, 3.0])
+    y = np.array([0.5, 1.0, 1.5, 1.0, 3.0])
+    expected = Region_mask.region_mask(x, y, [[0, 2, 0, 2], [1, 3, 1, 3]])
+    assert list(expected) == [True, True, True, True, False]
+    assert np.array_equal(Region_mask.region_mask(x, y, store), expected)
+    # each point in exactly one unit
+    assert Region_mask.region_populations(x, y, store).sum() == 4
+
+
+def sequential_mask(x, y, boxes, ops):
+    mask = np.zeros(len(x), dtype=bool)
+    for box, op in zip(Region_mask.normalise_regions(boxes), ops):
+        inside = ((x > box[0]) & (x < box[1]) & (y > box[2]) &
+                  (y < box[3]))
+        if op == 0:
+            mask |= inside
+        elif op == 1:
+            mask &= ~inside
+        else:
+            mask &= inside
+    return mask
+
+
+def test_store_matches_rectangles_applied_in_order():
+    rng = np.random.default_rng(5)
+    # points on the grid of edges and between them
+    x, y = rng.integers(0, 20, (2, 4000)) / 2.0
+    store = Region_Store()
+    removed = []
+    for step in range(200):
+        if step % 5 == 3 and len(store) > 0:
+            row = int(rng.integers(len(store)))
+            removed.append((row, store.remove(row)))
+        elif step % 5 == 4 and len(removed) > 0:
+            row, record = removed.pop()
+            store.insert(min(row, len(store)), record)
+        else:
+            op = rng.choice(Region_algebra.OPERATIONS, p=[0.6, 0.3, 0.1])
+            store.add(*rng.integers(0, 10, 4), op=op)
+        expected = sequential_mask(x, y, store.corners, store.records['op'])
+        assert np.array_equal(Region_mask.region_mask(x, y, store),
+                              expected)
+    boxes = store.canonical()
+    inside = [Region_mask.region_mask(x, y, [box]) for box in boxes]
+    assert np.all(np.sum(inside, axis=0) <= 1)
+
+
+def test_disjoint_rectangles_kept_as_drawn():
+    edges = np.arange(2000) * 2.0
+    boxes = np.column_stack([edges, edges + 1, edges * 0, edges * 0 + 1])
+    assert len(Region_algebra.decompose(boxes)) == 2000
+
+
+# =============================================================================
+# End of code
+# =============================================================================
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Tests of the nearest point search against brute force in display space
+
+Version 0.0.1
+"""
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+from matplotlib.backend_bases import MouseEvent
+
+from matplotlib_select.Measuring_cursor import SnaptoCursor
+from matplotlib_select.Spatial_index import Grid_Index
+
+
+# =============================================================================
+# Define functions
+# =============================================================================
+def make_data(size=5000, seed=10):
+    rng = np.random.default_rng(seed)
+    # spread over decades in y, clumped in x
+    x = np.concatenate([rng.uniform(0.1, 10, size // 2),
+                        5 + rng.normal(scale=1e-3, size=size - size // 2)])
+    y = 10 ** rng.uniform(-2, 2, size)
+    # points not shown on log axes
+    x[:5], y[5:10] = -1.0, 0.0
+    x[10] = np.nan
+    return x, y
+
+
+def brute_force(ax, x, y, mx, my):
+    with np.errstate(all='ignore'):
+        pos = ax.transData.transform(np.column_stack([x, y]))
+    mouse = ax.transData.transform((mx, my))
+    d2 = ((pos - mouse) ** 2).sum(axis=1)
+    d2[~np.isfinite(d2)] = np.inf
+    return np.argmin(d2), d2
+
+
+def make_axis(xscale, yscale):
+    fig, ax = plt.subplots(figsize=(8, 3))
+    ax.set_xscale(xscale)
+    ax.set_yscale(yscale)
+    ax.set_xlim(0.1, 10)
+    ax.set_ylim(0.01, 100)
+    fig.canvas.draw()
+    return ax
+
+
+def mouse_positions(seed=11):
+    rng = np.random.default_rng(seed)
+    mx = np.concatenate([rng.uniform(0.1, 10, 40), [5.0, 5.0005]])
+    my = np.concatenate([10 ** rng.uniform(-2, 2, 40), [1.0, 30.0]])
+    return zip(mx, my)
+
+
+@pytest.mark.parametrize('xscale', ['linear', 'log'])
+@pytest.mark.parametrize('yscale', ['linear', 'log'])
+def test_snap_xy_matches_brute_force(xscale, yscale):
+    x, y = make_data()
+    ax = make_axis(xscale, yscale)
+    cursor = SnaptoCursor(ax, x, y, dict(snap='xy'))
+    for mx, my in mouse_positions():
+        expected, d2 = brute_force(ax, x, y, mx, my)
+        found = cursor.nearest_xy(mx, my)
+        # the same point (or one as near)
+        assert np.isclose(d2[found], d2[expected], rtol=1e-9, atol=0)
+        # the crosshair moves to it
+        px, py = ax.transData.transform((mx, my))
+        cursor.mouse_move(MouseEvent('motion_notify_event',
+                                     ax.figure.canvas, px, py))
+        assert cursor.ly.get_xdata()[0] == x[found]
+        assert cursor.lx.get_ydata()[0] == y[found]
+    plt.close(ax.figure)
+
+
+def test_nearest_weighted_matches_brute_force():
+    x, y = make_data()
+    index = Grid_Index(x, y)
+    rng = np.random.default_rng(12)
+    finite = np.isfinite(x) & np.isfinite(y)
+    for wx, wy in [(1.0, 1.0), (100.0, 1.0), (1.0, 1e-3), (-2.0, 3.0)]:
+        for px, py in rng.uniform(-1, 12, (20, 2)):
+            d2 = (wx * (x - px)) ** 2 + (wy * (y - py)) ** 2
+            d2[~finite] = np.inf
+            found = index.nearest(px, py, wx, wy)
+            assert np.isclose(d2[found], d2.min(), rtol=1e-9, atol=0)
+
+
+# =============================================================================
+# End of code
+# =============================================================================
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Tests that the span slices select the same points as the mask
+
+Version 0.0.1
+"""
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from matplotlib_select.Region_mask import region_mask, span_slices
+from matplotlib_select.Region_store import Region_Store
+
+from helpers import click, drag, make_selector
+
+
+# =============================================================================
+# Define functions
+# =============================================================================
+def sorted_data(size=5000, seed=9):
+    rng = np.random.default_rng(seed)
+    x = np.sort(rng.uniform(size=size))
+    # repeated values and points exactly on the span edges
+    x[1000:1010] = x[1000]
+    x = np.sort(np.concatenate([x, [0.2, 0.4, 0.4, 0.5, 0.6, 0.7]]))
+    y = rng.uniform(size=len(x))
+    return x, y
+
+
+def flat_slices(slices):
+    if len(slices) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.concatenate([np.arange(s.start, s.stop) for s in slices])
+
+
+def test_span_slices_match_mask():
+    x, y = sorted_data()
+    store = Region_Store()
+    # adjacent spans (sharing the edge at 0.4), then overlapping spans
+    store.add(0.2, 0.4, -np.inf, np.inf)
+    store.add(0.4, 0.5, -np.inf, np.inf)
+    store.add(0.45, 0.6, -np.inf, np.inf)
+    store.add(0.7, 0.55, -np.inf, np.inf)
+    store.add(0.3, 0.35, -np.inf, np.inf, op='subtract')
+    slices = span_slices(x, store)
+    mask = region_mask(x, y, store)
+    assert np.array_equal(flat_slices(slices), np.flatnonzero(mask))
+    # disjoint, sorted and non-empty
+    starts = [s.start for s in slices]
+    stops = [s.stop for s in slices]
+    assert np.all(np.array(starts[1:]) >= np.array(stops[:-1]))
+    assert all(stop > start for start, stop in zip(starts, stops))
+
+
+def test_selector_slices_and_views_match_mask():
+    x, y = sorted_data()
+    selector = make_selector(x, y, mode='span')
+    ax = selector.ax
+    for x0, x1, key in [(0.1, 0.3, None), (0.3, 0.5, None),
+                        (0.45, 0.8, None), (0.6, 0.65, 'shift')]:
+        drag(ax, x0, 0.5, x1, 0.5, key=key)
+        click(selector.axselect)
+    expected = np.flatnonzero(selector.mask())
+    assert len(expected) > 0
+    slices = selector.slices()
+    assert np.array_equal(flat_slices(slices), expected)
+    views = selector.views(y)
+    assert np.array_equal(np.concatenate(views), y[expected])
+    # views, not copies
+    assert all(np.shares_memory(view, y) for view in views)
+    plt.close(ax.figure)
+
+
+# =============================================================================
+# End of code
+# =============================================================================
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Tests of the spatial index
+
+Version 0.0.1
+"""
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from matplotlib_select.Spatial_index import Grid_Index
+
+from helpers import make_selector
+
+
+# =============================================================================
+# Define functions
+# =============================================================================
+def clustered_data(size=20000, seed=6):
+    rng = np.random.default_rng(seed)
+    x, y = rng.uniform(size=(2, size))
+    # half the points in a tiny clump, some repeated exactly
+    clump = size // 2
+    x[:clump] = 0.5 + rng.normal(scale=1e-5, size=clump)
+    y[:clump] = 0.5 + rng.normal(scale=1e-5, size=clump)
+    x[:100], y[:100] = 0.25, 0.75
+    x[100:110] = np.nan
+    return x, y
+
+
+def brute_force(x, y, x0, x1, y0, y1):
+    x0, x1 = sorted([x0, x1])
+    y0, y1 = sorted([y0, y1])
+    return np.flatnonzero((x > x0) & (x < x1) & (y > y0) & (y < y1))
+
+
+def test_query_matches_brute_force():
+    x, y = clustered_data()
+    index = Grid_Index(x, y)
+    rng = np.random.default_rng(7)
+    boxes = [[0.5 - 1e-5, 0.5 + 1e-5, 0.5, 0.5 + 3e-5], [0, 1, 0, 1],
+             [0.25, 0.3, 0.7, 0.8], [0.2, 0.25, 0.7, 0.8], [2, 3, 0, 1]]
+    boxes += list(rng.uniform(0, 1, (50, 4)))
+    for box in boxes:
+        assert np.array_equal(np.sort(index.query(*box)),
+                              brute_force(x, y, *box))
+
+
+def test_cells_adapt_to_clustered_data():
+    x, y = clustered_data()
+    index = Grid_Index(x, y)
+    # every cell holds about points_per_cell points (not the whole clump)
+    counts = np.diff(index.offsets)
+    assert counts.max() <= 2 * counts.mean() + 1
+    # a tiny query in the clump only scans a few cells
+    box = (0.5, 0.5 + 1e-6, 0.5, 0.5 + 1e-6)
+    rows = np.arange(np.searchsorted(index.row_ymax, box[2], side='right'),
+                     np.searchsorted(index.row_ymin, box[3], side='left'))
+    i0 = np.count_nonzero(index.cell_xmax[rows] <= box[0], axis=1)
+    i1 = np.count_nonzero(index.cell_xmin[rows] < box[1], axis=1)
+    scanned = np.maximum(index.offsets[rows * index.nx + i1] -
+                         index.offsets[rows * index.nx + i0], 0).sum()
+    assert scanned < 200
+
+
+def test_index_built_with_the_data():
+    x, y = clustered_data(1000)
+    selector = make_selector(x, y)
+    # ready before the first drag
+    assert selector._index is not None and selector._sat is not None
+    assert len(selector._index.order) == np.isfinite(x).sum()
+    selector.set_data(x[:500], y[:500])
+    assert len(selector._index.order) == np.isfinite(x[:500]).sum()
+    assert selector._sat.count(0, 1, 0, 1) <= 500
+    selector.set_data(None, None)
+    assert selector.index is None and selector.sat is None
+    plt.close(selector.ax.figure)
+
+
+# =============================================================================
+# End of code
+# =============================================================================
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 18/10/26
+
+@author: neil
+
+Tests of the streamed mask against the in-memory mask
+
+Version 0.0.1
+"""
+
+import numpy as np
+import pytest
+
+from matplotlib_select import Streaming
+from matplotlib_select.Region_mask import region_mask
+from matplotlib_select.Region_store import Region_Store
+
+
+# =============================================================================
+# Define functions
+# =============================================================================
+def make_data(size=5003, seed=5):
+    rng = np.random.default_rng(seed)
+    x, y = rng.uniform(size=(2, size))
+    x[:3] = np.nan
+    return x, y
+
+
+def make_store():
+    store = Region_Store()
+    store.add(0.1, 0.6, 0.1, 0.6)
+    store.add(0.5, 0.9, 0.4, 0.95)
+    store.add(0.2, 0.3, 0.0, 1.0, op='subtract')
+    return store
+
+
+def uneven_chunks(x, y, seed=6):
+    # chunk lengths that are not multiples of 8 (and some empty)
+    rng = np.random.default_rng(seed)
+    start = 0
+    while start < len(x):
+        stop = start + int(rng.integers(0, 300))
+        yield x[start:stop], y[start:stop]
+        start = stop
+
+
+@pytest.mark.parametrize('chunk_size', [1, 13, 1000, 10 ** 6])
+def test_write_mask_chunked_arrays(tmp_path, chunk_size):
+    x, y = make_data()
+    store = make_store()
+    expected = region_mask(x, y, store)
+    filename = str(tmp_path / 'mask.npy')
+    written = Streaming.write_mask(filename, store, (x, y),
+                                   chunk_size=chunk_size)
+    assert len(written) == len(x)
+    assert np.array_equal(written.to_bool(), expected)
+    assert Streaming.count(store, (x, y), chunk_size) == expected.sum()
+
+
+@pytest.mark.parametrize('known_length', [False, True])
+def test_write_mask_iterator(tmp_path, known_length):
+    x, y = make_data()
+    store = make_store()
+    expected = region_mask(x, y, store)
+    filename = str(tmp_path / 'mask.npy')
+    length = len(x) if known_length else None
+    written = Streaming.write_mask(filename, store, uneven_chunks(x, y),
+                                   chunk_size=64, length=length)
+    assert len(written) == len(x)
+    assert np.array_equal(written.to_bool(), expected)
+    indices = np.concatenate(list(Streaming.iter_indices(
+        store, uneven_chunks(x, y))))
+    assert np.array_equal(indices, np.flatnonzero(expected))
+
+
+# =============================================================================
+# End of code
+# =============================================================================